@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    hiddenimports=['native_extractor', 'fake_extractor'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应解压超时
+功能：根据压缩包的解压后大小和本机历史解压吞吐量计算每个任务的超时时间；
+超时到达时只要输出仍在增长就继续延长，超时只用来发现卡死的任务
+"""
+
+import os
+import json
+import time
+import socket
+import threading
+
+# 没有历史数据时假定的吞吐量（字节/秒），取保守值
+DEFAULT_THROUGHPUT = 5 * 1024 * 1024
+
+# 没有历史数据时假定的进程启动开销（秒）
+DEFAULT_STARTUP_SECONDS = 2.0
+
+# 预计耗时的放大系数
+SAFETY_FACTOR = 3.0
+
+# 初始超时的上下限（秒）
+MIN_TIMEOUT = 30
+MAX_TIMEOUT = 6 * 3600
+
+# 超时到达后，输出有进展时每次延长的时间（秒）
+STALL_WINDOW = 60
+
+# 吞吐量指数滑动平均的权重
+EWMA_ALPHA = 0.3
+
+# 参与学习的最小数据量，太小的任务主要反映启动开销
+MIN_LEARN_BYTES = 1024 * 1024
+
+
+class ThroughputModel:
+    """按 主机/解压程序/格式 记录解压吞吐量，并持久化到JSON文件"""
+
+    def __init__(self, stats_file, host=None):
+        self.stats_file = stats_file
+        self.host = host or socket.gethostname()
+        self.stats = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.load()
+
+    def _key(self, backend, fmt):
+        return f"{self.host}|{backend}|{fmt}"
+
+    def load(self):
+        try:
+            if os.path.exists(self.stats_file):
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+        except (OSError, ValueError):
+            self.stats = {}
+
+    def save(self):
+        """保存学习到的吞吐量（仅在有变化时写文件）"""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = dict(self.stats)
+            self._dirty = False
+        tmp_path = self.stats_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.stats_file)
+
+    def throughput(self, backend, fmt):
+        """返回 (吞吐量字节/秒, 启动开销秒, 样本数)"""
+        with self._lock:
+            entry = self.stats.get(self._key(backend, fmt))
+        if not entry:
+            return DEFAULT_THROUGHPUT, DEFAULT_STARTUP_SECONDS, 0
+        return entry['bytes_per_second'], entry['startup_seconds'], entry['samples']
+
+    def record(self, backend, fmt, num_bytes, seconds):
+        """记录一次成功解压的数据量和耗时"""
+        if seconds <= 0:
+            return
+        with self._lock:
+            key = self._key(backend, fmt)
+            entry = self.stats.get(key)
+            if num_bytes < MIN_LEARN_BYTES:
+                # 小任务的耗时基本就是启动开销
+                if entry:
+                    entry['startup_seconds'] += EWMA_ALPHA * (seconds - entry['startup_seconds'])
+                else:
+                    entry = {
+                        'bytes_per_second': DEFAULT_THROUGHPUT,
+                        'startup_seconds': seconds,
+                        'samples': 0,
+                    }
+            else:
+                rate = num_bytes / seconds
+                if entry and entry['samples']:
+                    entry['bytes_per_second'] += EWMA_ALPHA * (rate - entry['bytes_per_second'])
+                    entry['samples'] += 1
+                else:
+                    entry = {
+                        'bytes_per_second': rate,
+                        'startup_seconds': entry['startup_seconds'] if entry else DEFAULT_STARTUP_SECONDS,
+                        'samples': 1,
+                    }
+            entry['updated_at'] = time.time()
+            self.stats[key] = entry
+            self._dirty = True
+
+    def timeout_for(self, backend, fmt, num_bytes):
+        """计算解压任务的初始超时时间（秒）"""
+        rate, startup, samples = self.throughput(backend, fmt)
+        expected = startup + num_bytes / max(rate, 1)
+        return int(min(MAX_TIMEOUT, max(MIN_TIMEOUT, expected * SAFETY_FACTOR)))
+
+
+def member_paths(extract_to, members):
+    """压缩包条目（探测结果中的members）解压后的路径，跳过绝对路径和跳出目标目录的条目"""
+    paths = set()
+    for member in members:
+        parts = member[0].replace('\\', '/').strip('/').split('/')
+        if parts and parts[0] and '..' not in parts:
+            paths.add(os.path.join(extract_to, *parts))
+    return sorted(paths)
+
+
+def member_baseline(paths):
+    """解压前已经存在的条目文件，{路径: (大小, 修改时间)}（每个压缩包只检查一次）"""
+    baseline = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        baseline[path] = (st.st_size, st.st_mtime_ns)
+    return baseline
+
+
+class ProgressWatchdog:
+    """超时到达时检查任务是否仍有进展（输出目录增长或程序仍在输出），有进展则延长"""
+
+    def __init__(self, extract_to, files_before, members=None, baseline=None, stall_window=STALL_WINDOW):
+        self.extract_to = extract_to
+        self.files_before = set(files_before)
+        # 能列出条目时只统计本压缩包的条目（member_paths），不统计同一目录中其他任务（如流水线解压的内层压缩包）的输出；
+        # baseline为解压前已存在的条目（member_baseline），大小和修改时间没有变化的不计入
+        self.members = members
+        self.baseline = baseline or {}
+        self.stall_window = stall_window
+        self.last_output_at = time.monotonic()
+        self.last_bytes = self.output_bytes()
+        self.extensions = 0
+
+    def on_output(self, stream_name, line):
+        """解压程序有新输出时调用"""
+        self.last_output_at = time.monotonic()
+
+    def output_bytes(self):
+        """统计解压新产生的文件总大小"""
+        return self.output_stats()[0]
+
+    def output_stats(self):
+        """统计解压新产生的文件，返回 (总大小, 文件数)"""
+        if self.members is not None:
+            return self._member_stats()
+        total = count = 0
+        try:
+            names = os.listdir(self.extract_to)
+        except OSError:
+            return 0, 0
+        for name in names:
+            if name in self.files_before:
+                continue
+            path = os.path.join(self.extract_to, name)
+            if os.path.isdir(path):
+                for folder, dirs, files in os.walk(path):
+                    for filename in files:
+                        try:
+                            total += os.path.getsize(os.path.join(folder, filename))
+                            count += 1
+                        except OSError:
+                            pass
+            else:
+                try:
+                    total += os.path.getsize(path)
+                    count += 1
+                except OSError:
+                    pass
+        return total, count
+
+    def _member_stats(self):
+        """按条目列表统计已写出的条目（新建的，或与解压前相比大小、修改时间变化的）"""
+        total = count = 0
+        for path in self.members:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if self.baseline.get(path) != (st.st_size, st.st_mtime_ns):
+                total += st.st_size
+                count += 1
+        return total, count
+
+    def extend(self):
+        """超时到达时由任务调度调用：有进展返回延长的秒数，否则返回None表示判定卡死"""
+        current = self.output_bytes()
+        grew = current > self.last_bytes
+        recent_output = time.monotonic() - self.last_output_at < self.stall_window
+        self.last_bytes = current
+        if grew or recent_output:
+            self.extensions += 1
+            return self.stall_window
+        return None
@@ -0,0 +1,613 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包自动处理工具（命令行）
+功能：不依赖图形界面，直接调用处理引擎，适合在服务器、容器或计划任务中运行
+
+退出码：
+    0   全部成功（或没有需要处理的压缩包）
+    1   有压缩包解压失败或完整性校验失败
+    2   参数错误或处理过程中出现错误
+    3   未找到可用的解压程序
+    130 被中断（Ctrl+C）
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import shutil
+import argparse
+import threading
+import unicodedata
+from datetime import datetime
+from archive_engine import ArchiveEngine, APP_DIR, find_bandizip, print_log
+from archive_probe import format_size
+from toc_cache import open_toc_cache
+from rename_planner import RenameJournal, JOURNAL_NAME
+from run_history import open_run_history, DEFAULT_THRESHOLD, DEFAULT_BASELINE_RUNS
+from folder_watcher import FolderWatcher
+from extract_backends import BACKEND_CLASSES
+from job_scheduler import SCHEDULE_POLICIES
+from integrity_check import VERIFY_MODES
+from tree_guard import SYMLINK_POLICIES
+from resource_governor import parse_cpu_list
+from progress_tracker import format_progress
+from lease_coordinator import DEFAULT_LEASE_TTL
+from job_service import JobService, ServiceClient, create_server, DEFAULT_MAX_QUEUE, FINISHED_STATES, JOB_SUCCEEDED
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_ERROR = 2
+EXIT_NO_BACKEND = 3
+EXIT_INTERRUPTED = 130
+
+# 非终端（重定向到文件、计划任务）时进度写入日志的间隔（秒）
+PROGRESS_LOG_INTERVAL = 30
+
+
+class EngineSetupError(Exception):
+    """无法创建处理引擎（exit_code为对应的退出码：参数错误为EXIT_ERROR，找不到解压程序为EXIT_NO_BACKEND）"""
+
+    def __init__(self, message, exit_code=EXIT_ERROR):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def build_parser():
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog='archive_cli',
+        description='检测并修正异常格式的压缩包，自动解压并递归处理（无界面模式）'
+    )
+    parser.add_argument('--config', default='config.json', help='配置文件路径（默认: config.json）')
+    parser.add_argument('--bandizip', help='Bandizip.exe路径（默认自动查找）')
+    parser.add_argument('--backend', choices=sorted(BACKEND_CLASSES),
+                        help='强制使用指定的解压程序（默认按格式自动选择最快的）')
+    parser.add_argument('--backend-path', action='append', default=[], metavar='名称=路径',
+                        help='指定解压程序路径，例如 7z=/opt/7zip/7zz（可重复）')
+    parser.add_argument('--wordlist', action='append', default=[], metavar='文件',
+                        help='额外的密码字典文件（每行一个密码，在常用密码之后尝试，可重复）')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='同时运行的解压任务数，0表示按存储设备自动决定（机械硬盘1个，固态硬盘多个，默认: 1）')
+    parser.add_argument('--schedule', choices=SCHEDULE_POLICIES,
+                        help='解压任务顺序: sjf 小的优先, shallow 浅层优先, fifo 先发现先处理, '
+                             'priority 按配置文件中的路径规则（默认: 配置文件中的设置或sjf）')
+    parser.add_argument('--max-wait', type=float,
+                        help='任务等待超过该秒数后立即处理，防止大压缩包被一直推迟（默认: 300）')
+    parser.add_argument('--verify', choices=VERIFY_MODES,
+                        help='解压成功后在后台校验压缩包完整性: off 不校验, auto 自动选择, native 内置CRC校验, '
+                             'backend 解压程序的测试模式（默认: 配置文件中的设置或off）')
+    parser.add_argument('--symlinks', choices=SYMLINK_POLICIES,
+                        help='指向文件夹的符号链接: follow 跟随, within 只跟随指向处理目录内部的链接, skip 不跟随'
+                             '（已访问过的文件夹不会重复进入，默认: 配置文件中的设置或follow）')
+    parser.add_argument('--background', action='store_true', default=None,
+                        help='低影响后台模式：降低解压程序的CPU和I/O优先级，并按系统负载、内存和I/O等待调节同时解压的任务数'
+                             '（默认: 配置文件中的设置或关闭）')
+    parser.add_argument('--cpus', metavar='列表',
+                        help='后台模式下把解压程序限定在这些CPU上，例如 0-3,6')
+    parser.add_argument('--progress', choices=['auto', 'bar', 'log', 'off'], default='auto',
+                        help='进度显示: bar 终端底部实时状态行, log 每30秒写一行日志, off 不显示'
+                             '（默认: auto，终端中用bar，否则用log）')
+    parser.add_argument('--output-dir', help='运行指标和分析结果的输出目录（默认: 程序所在目录）')
+    parser.add_argument('--log-file', help='同时把日志追加写入该文件')
+    parser.add_argument('--quiet', action='store_true', help='不在终端输出日志')
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='处理一个或多个文件夹后退出')
+    run_parser.add_argument('folders', nargs='+', help='要处理的文件夹')
+    run_parser.add_argument('--has-password', action='store_true',
+                            help='目标文件有密码，跳过无密码尝试')
+    run_parser.add_argument('--bandizip-wait', action='store_true',
+                            help='密码全部失败后打开Bandizip等待手动输入（需要桌面环境）')
+    run_parser.add_argument('--profile', action='store_true',
+                            help='在cProfile和tracemalloc下运行并输出分析结果')
+    run_parser.add_argument('--shard', action='store_true',
+                            help='与处理同一共享目录的其他节点通过租约文件分配文件夹（多台主机或多个进程）')
+    run_parser.add_argument('--lease-dir', help='租约文件目录（默认: 处理目录下的.butter_leases，必须对所有节点共享）')
+    run_parser.add_argument('--lease-ttl', type=float, default=DEFAULT_LEASE_TTL,
+                            help=f'租约超过该秒数没有心跳视为节点已退出，由其他节点接管（默认: {DEFAULT_LEASE_TTL:g}）')
+    run_parser.add_argument('--node-id', help='节点名称（默认: 主机名:进程号）')
+
+    watch_parser = subparsers.add_parser('watch', help='持续监视收件文件夹，新压缩包写入完成后自动处理')
+    watch_parser.add_argument('inboxes', nargs='+', help='要监视的收件文件夹')
+    watch_parser.add_argument('--has-password', action='store_true',
+                              help='目标文件有密码，跳过无密码尝试')
+    watch_parser.add_argument('--stable-seconds', type=float, default=5.0,
+                              help='压缩包大小和修改时间保持不变多少秒后视为写入完成（默认: 5）')
+    watch_parser.add_argument('--poll-interval', type=float, default=2.0,
+                              help='轮询间隔秒数（默认: 2）')
+    watch_parser.add_argument('--watch-backend', choices=['auto', 'inotify', 'poll'], default='auto',
+                              help='文件变化检测方式（默认: auto，Linux下使用inotify）')
+    watch_parser.add_argument('--process-existing', action='store_true',
+                              help='启动时也处理收件文件夹中已存在的压缩包')
+
+    serve_parser = subparsers.add_parser('serve', help='作为本机服务运行，通过HTTP或Unix套接字接收处理任务')
+    serve_parser.add_argument('--listen', default='127.0.0.1:8765', metavar='主机:端口',
+                              help='HTTP监听地址（默认: 127.0.0.1:8765，只接受本机连接）')
+    serve_parser.add_argument('--socket', metavar='路径', help='改为监听Unix套接字')
+    serve_parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                              help=f'最多排队的任务数，超出后拒绝提交（默认: {DEFAULT_MAX_QUEUE}）')
+
+    submit_parser = subparsers.add_parser('submit', help='把文件夹提交给正在运行的服务')
+    submit_parser.add_argument('folders', nargs='+', help='要处理的文件夹')
+    submit_parser.add_argument('--server', default='127.0.0.1:8765', metavar='地址',
+                               help='服务地址，主机:端口 或Unix套接字路径（默认: 127.0.0.1:8765）')
+    submit_parser.add_argument('--has-password', action='store_true',
+                               help='目标文件有密码，跳过无密码尝试')
+    submit_parser.add_argument('--bandizip-wait', action='store_true',
+                               help='密码全部失败后打开Bandizip等待手动输入（需要服务所在的桌面环境）')
+    submit_parser.add_argument('--priority', type=int, default=0, help='任务优先级，数字大的先处理（默认: 0）')
+    submit_parser.add_argument('--wait', action='store_true', help='等待任务全部结束，并按结果设置退出码')
+
+    backends_parser = subparsers.add_parser('backends', help='列出本机可用的解压程序和各格式的选择结果')
+    backends_parser.add_argument('--benchmark', action='store_true',
+                                 help='重新测试各格式的解压速度并更新选择缓存')
+
+    toc_parser = subparsers.add_parser('toc', help='查看或清空压缩包目录缓存')
+    toc_parser.add_argument('--clear', action='store_true', help='清空缓存')
+
+    undo_parser = subparsers.add_parser('undo-renames', help='恢复异常格式压缩包修正前的文件名')
+    undo_parser.add_argument('--run', help='要撤销的运行（默认: 最近一次有未撤销改名的运行）')
+    undo_parser.add_argument('--list', action='store_true', help='列出有未撤销改名的运行')
+
+    report_parser = subparsers.add_parser('report', help='把最近一次运行与之前语料相似的运行对比，标记性能退化和异常的压缩包')
+    report_parser.add_argument('--run', type=int, help='要报告的运行编号（默认: 最近一次解压过压缩包的运行）')
+    report_parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                               help=f'判定退化的变化比例（默认: {DEFAULT_THRESHOLD}）')
+    report_parser.add_argument('--baseline', type=int, default=DEFAULT_BASELINE_RUNS,
+                               help=f'作为对比基准的相似运行数，取中位数（默认: {DEFAULT_BASELINE_RUNS}）')
+    report_parser.add_argument('--list', type=int, nargs='?', const=20, metavar='N',
+                               help='列出最近N次运行（默认: 20）')
+    report_parser.add_argument('--json', action='store_true', help='以JSON格式输出报告')
+    return parser
+
+
+def _display_width(text):
+    return sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+
+
+class StatusLine:
+    """在终端最后一行原地刷新进度（写到标准错误），输出日志前先擦除、输出后再重画"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.text = ''
+        self._width = 0
+        self._lock = threading.RLock()
+
+    def _fit(self, text):
+        # 超出终端宽度会换行，之后就无法用回车擦除
+        limit = shutil.get_terminal_size().columns - 1
+        while text and _display_width(text) > limit:
+            text = text[:-1]
+        return text
+
+    def _erase(self):
+        if self._width:
+            self.stream.write('\r' + ' ' * self._width + '\r')
+            self._width = 0
+
+    def show(self, text):
+        with self._lock:
+            self._erase()
+            self.text = self._fit(text)
+            self.stream.write(self.text)
+            self._width = _display_width(self.text)
+            self.stream.flush()
+
+    def finish(self, text):
+        """输出最终进度并换行，之后不再重画"""
+        with self._lock:
+            self._erase()
+            self.stream.write(text + '\n')
+            self.stream.flush()
+            self.text = ''
+
+    def hide(self):
+        self._lock.acquire()
+        self._erase()
+        self.stream.flush()
+
+    def restore(self):
+        if self.text:
+            self.stream.write(self.text)
+            self._width = _display_width(self.text)
+            self.stream.flush()
+        self._lock.release()
+
+
+def progress_mode(args):
+    if args.progress != 'auto':
+        return args.progress
+    if args.quiet:
+        return 'off'
+    return 'bar' if sys.stderr.isatty() else 'log'
+
+
+def make_progress_callback(args, log, status):
+    """根据参数构造进度回调，不显示进度时返回None"""
+    mode = progress_mode(args)
+    if mode == 'bar':
+        def show(snapshot):
+            text = f"⏳ {format_progress(snapshot)}"
+            if snapshot['finished']:
+                status.finish(text)
+            else:
+                status.show(text)
+        return show
+    if mode == 'log':
+        last = [0.0]
+
+        def write(snapshot):
+            now = time.monotonic()
+            if snapshot['finished'] or now - last[0] >= PROGRESS_LOG_INTERVAL:
+                last[0] = now
+                log(f"⏳ 进度: {format_progress(snapshot)}")
+        return write
+    return None
+
+
+def make_log_callback(args, status=None):
+    """根据参数构造日志回调（status为终端进度状态行，输出日志时先擦除）"""
+    log_file = open(args.log_file, 'a', encoding='utf-8') if args.log_file else None
+
+    def log(message):
+        if not args.quiet:
+            if status is not None:
+                status.hide()
+                try:
+                    print_log(message)
+                finally:
+                    status.restore()
+            else:
+                print_log(message)
+        if log_file:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            log_file.write(f"[{timestamp}] {message}\n")
+            log_file.flush()
+
+    return log
+
+
+def parse_backend_paths(values):
+    """解析 --backend-path 名称=路径 参数"""
+    paths = {}
+    for value in values:
+        name, sep, path = value.partition('=')
+        if not sep or name not in BACKEND_CLASSES:
+            raise ValueError(f"无效的 --backend-path: {value}")
+        paths[name] = path
+    return paths
+
+
+def create_engine(args, log, progress_callback=None):
+    """根据命令行参数创建处理引擎；参数错误或找不到可用的解压程序时抛出EngineSetupError"""
+    try:
+        backend_paths = parse_backend_paths(args.backend_path)
+    except ValueError as e:
+        raise EngineSetupError(str(e))
+    try:
+        cpus = parse_cpu_list(args.cpus) if args.cpus else None
+    except ValueError as e:
+        raise EngineSetupError(f"无效的 --cpus: {e}")
+    output_dir = args.output_dir or APP_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    engine = ArchiveEngine(
+        bandizip_path=args.bandizip or find_bandizip(),
+        config_file=args.config,
+        log_callback=log,
+        output_dir=output_dir,
+        backend_paths=backend_paths,
+        forced_backend=args.backend,
+        workers=args.workers,
+        schedule_policy=args.schedule,
+        max_wait=args.max_wait,
+        verify_mode=args.verify,
+        progress_callback=progress_callback,
+        symlink_policy=args.symlinks,
+        background=args.background,
+        cpu_affinity=cpus,
+    )
+    engine.password_store.extra_wordlists.extend(args.wordlist)
+    backends = engine.prepare_backends()
+    if not backends:
+        raise EngineSetupError("未找到任何解压程序（Bandizip、7z、unrar、bsdtar），请使用 --bandizip 或 --backend-path 指定路径",
+                               EXIT_NO_BACKEND)
+    if args.backend and args.backend not in backends:
+        raise EngineSetupError(f"未找到指定的解压程序: {args.backend}", EXIT_NO_BACKEND)
+    return engine
+
+
+def install_stop_handler(log, stop):
+    """收到SIGINT/SIGTERM时调用stop()请求停止，第二次收到时直接退出"""
+    state = {'interrupted': False}
+
+    def handler(signum, frame):
+        if state['interrupted']:
+            sys.exit(EXIT_INTERRUPTED)
+        state['interrupted'] = True
+        log("⏹️ 收到中断信号，当前文件处理完后停止...")
+        stop()
+
+    signal.signal(signal.SIGINT, handler)
+    if hasattr(signal, 'SIGTERM'):
+        signal.signal(signal.SIGTERM, handler)
+    return state
+
+
+def cmd_run(args, log, progress=None):
+    """run子命令：依次处理每个文件夹"""
+    for folder in args.folders:
+        if not os.path.isdir(folder):
+            log(f"❌ 文件夹不存在: {folder}")
+            return EXIT_ERROR
+
+    try:
+        engine = create_engine(args, log, progress)
+    except EngineSetupError as e:
+        log(f"❌ {e}")
+        return e.exit_code
+    engine.has_password = args.has_password
+    engine.use_bandizip_wait = args.bandizip_wait
+    if args.shard:
+        engine.lease_settings = {'lease_dir': args.lease_dir, 'ttl': args.lease_ttl, 'node_id': args.node_id}
+    state = install_stop_handler(log, engine.request_stop)
+
+    exit_code = EXIT_OK
+    for folder in args.folders:
+        result = engine.process_folder(folder, profile=args.profile)
+        log(f"📊 {folder}: 成功 {result['succeeded']} 个, 失败 {result['failed']} 个")
+        if result['integrity_failed']:
+            log(f"⚠️ {folder}: {result['integrity_failed']} 个压缩包完整性校验失败")
+        if result['stopped'] or state['interrupted']:
+            return EXIT_INTERRUPTED
+        if result['error']:
+            exit_code = EXIT_ERROR
+        elif (result['failed'] or result['integrity_failed']) and exit_code == EXIT_OK:
+            exit_code = EXIT_FAILURES
+    return exit_code
+
+
+def cmd_watch(args, log, progress=None):
+    """watch子命令：持续监视收件文件夹，直到收到中断信号"""
+    for folder in args.inboxes:
+        if not os.path.isdir(folder):
+            log(f"❌ 文件夹不存在: {folder}")
+            return EXIT_ERROR
+
+    try:
+        engine = create_engine(args, log, progress)
+    except EngineSetupError as e:
+        log(f"❌ {e}")
+        return e.exit_code
+    engine.has_password = args.has_password
+    watcher = FolderWatcher(
+        engine,
+        args.inboxes,
+        stable_seconds=args.stable_seconds,
+        poll_interval=args.poll_interval,
+        backend=args.watch_backend,
+        process_existing=args.process_existing,
+    )
+    install_stop_handler(log, watcher.stop)
+    try:
+        watcher.run()
+    except OSError as e:
+        log(f"❌ 无法监视文件夹: {e}")
+        return EXIT_ERROR
+    return EXIT_INTERRUPTED
+
+
+def cmd_serve(args, log, progress=None):
+    """serve子命令：运行任务服务，直到收到中断信号"""
+    try:
+        engine = create_engine(args, log, progress)
+    except EngineSetupError as e:
+        log(f"❌ {e}")
+        return e.exit_code
+    service = JobService(engine, max_queue=args.max_queue)
+    try:
+        if args.socket:
+            server = create_server(service, socket_path=args.socket)
+            address = args.socket
+        else:
+            host, _, port = args.listen.rpartition(':')
+            server = create_server(service, host or '127.0.0.1', int(port))
+            address = f"http://{host or '127.0.0.1'}:{port}"
+    except (OSError, ValueError) as e:
+        log(f"❌ 无法启动服务: {e}")
+        return EXIT_ERROR
+    service.start()
+
+    def stop():
+        service.stop()
+        # shutdown()会等待serve_forever退出，不能在信号处理函数所在的主线程中直接调用
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    install_stop_handler(log, stop)
+    log(f"🛰️ 任务服务已启动: {address}（最多排队 {args.max_queue} 个任务，解压线程 {engine.workers} 个）")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if args.socket:
+            try:
+                os.unlink(args.socket)
+            except OSError:
+                pass
+        service.join(timeout=30)
+    log("👋 任务服务已停止")
+    return EXIT_INTERRUPTED
+
+
+def cmd_submit(args, log, progress=None):
+    """submit子命令：提交任务，--wait时等待结束"""
+    client = ServiceClient(args.server)
+    job_ids = []
+    for folder in args.folders:
+        try:
+            status, data = client.submit(folder, args.has_password, args.bandizip_wait, args.priority)
+        except (OSError, ValueError) as e:
+            log(f"❌ 无法连接服务 {args.server}: {e}")
+            return EXIT_ERROR
+        if status != 201:
+            log(f"❌ 提交失败: {folder}: {data.get('error') if isinstance(data, dict) else status}")
+            return EXIT_ERROR
+        log(f"📨 已提交任务 #{data['id']}: {data['folder']}")
+        job_ids.append(data['id'])
+    if not args.wait:
+        return EXIT_OK
+
+    exit_code = EXIT_OK
+    for job_id in job_ids:
+        while True:
+            try:
+                status, data = client.job(job_id)
+            except (OSError, ValueError) as e:
+                log(f"❌ 无法连接服务 {args.server}: {e}")
+                return EXIT_ERROR
+            if status != 200:
+                log(f"❌ 无法查询任务 #{job_id}: {data.get('error') if isinstance(data, dict) else status}")
+                return EXIT_ERROR
+            if data['progress'] and progress:
+                progress(data['progress'])
+            if data['state'] in FINISHED_STATES:
+                break
+            time.sleep(1)
+        result = data['result'] or {}
+        log(f"📊 任务 #{job_id} {data['state']}: 成功 {result.get('succeeded', 0)} 个, 失败 {result.get('failed', 0)} 个")
+        if data['state'] != JOB_SUCCEEDED and exit_code == EXIT_OK:
+            exit_code = EXIT_FAILURES
+    return exit_code
+
+
+def cmd_backends(args, log, progress=None):
+    """backends子命令：列出可用的解压程序和各格式的选择结果"""
+    try:
+        engine = create_engine(args, log)
+    except EngineSetupError as e:
+        log(f"❌ {e}")
+        return e.exit_code
+    for name, backend in sorted(engine.backends.items()):
+        log(f"🧰 {name}: {backend.executable}")
+    if args.benchmark:
+        engine.selector.benchmark_all()
+    for fmt, choice in sorted(engine.selector.cache['formats'].items()):
+        rates = ', '.join(f"{name} {rate / 1024 / 1024:.1f}MB/s" for name, rate in choice['bytes_per_second'].items())
+        log(f"📊 {fmt}: {choice['backend']}（{rates}）")
+    return EXIT_OK
+
+
+def cmd_toc(args, log, progress=None):
+    """toc子命令：显示压缩包目录缓存的占用情况，--clear时清空"""
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            settings = json.load(f).get('toc_cache', {})
+    except (OSError, ValueError):
+        settings = {}
+    cache = open_toc_cache(dict(settings, enabled=True), args.output_dir or APP_DIR, log_callback=log)
+    if cache is None:
+        return EXIT_ERROR
+    try:
+        if args.clear:
+            cache.clear()
+            log("🧹 已清空压缩包目录缓存")
+        stats = cache.stats()
+        log(f"📇 {cache.db_path}: {stats['archives']}/{stats['max_archives']} 个压缩包，"
+            f"{format_size(stats['bytes'])}/{format_size(stats['max_bytes'])}，文件大小 {format_size(stats['file_size'])}")
+    finally:
+        cache.close()
+    return EXIT_OK
+
+
+def cmd_undo_renames(args, log, progress=None):
+    """undo-renames子命令：按改名日志恢复一次运行中修正过的文件名"""
+    journal = RenameJournal(os.path.join(args.output_dir or APP_DIR, JOURNAL_NAME))
+    runs = journal.runs()
+    if args.list:
+        for run_id, count in runs:
+            log(f"📝 {run_id}: {count} 个文件名")
+        if not runs:
+            log("没有改名记录")
+        return EXIT_OK
+    run_id = args.run or (runs[-1][0] if runs else None)
+    if run_id is None or run_id not in dict(runs):
+        log(f"❌ 没有找到改名记录: {run_id or journal.path}")
+        return EXIT_ERROR
+    restored, skipped = journal.undo(run_id, log_callback=log)
+    log(f"↩️ 运行 {run_id}: 已恢复 {restored} 个文件名，跳过 {skipped} 个")
+    return EXIT_OK if not skipped else EXIT_FAILURES
+
+
+def cmd_report(args, log, progress=None):
+    """report子命令：对比历史运行，有退化或异常的压缩包时退出码为1"""
+    try:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            settings = json.load(f).get('history', {})
+    except (OSError, ValueError):
+        settings = {}
+    history = open_run_history(dict(settings, enabled=True), args.output_dir or APP_DIR, log_callback=log)
+    if history is None:
+        return EXIT_ERROR
+    try:
+        if args.list:
+            for run in history.runs(args.list):
+                started = datetime.fromtimestamp(run['started_at']).strftime('%Y-%m-%d %H:%M:%S')
+                log(f"🗃️ #{run['id']} {started} {run['host']} {run['folder']}: {run['archives']} 个压缩包"
+                    f"（失败 {run['failed']}），{format_size(run['archive_bytes'])}，{format_size(run['bytes_per_second'])}/s")
+            return EXIT_OK
+        report = history.report(args.run, threshold=args.threshold, baseline_runs=args.baseline)
+    finally:
+        history.close()
+    if report is None:
+        log(f"❌ 没有找到运行记录: {args.run if args.run is not None else history.db_path}")
+        return EXIT_ERROR
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        run = report['run']
+        log(f"🗃️ 运行 #{run['id']} {run['folder']}: {run['archives']} 个压缩包（失败 {run['failed']}），"
+            f"{format_size(run['archive_bytes'])}，{format_size(run['bytes_per_second'])}/s")
+        if report['baseline']:
+            log(f"📊 对比基准: 语料相似的运行 {', '.join('#' + str(i) for i in report['baseline'])}（取中位数）")
+        else:
+            log("📊 没有语料相似的历史运行，只检查失败的压缩包")
+        for metric, old, new, change in report['regressions']:
+            if metric.endswith('.p95'):
+                values = f"{old:.3f}s -> {new:.3f}s"
+            else:
+                values = f"{format_size(old)}/s -> {format_size(new)}/s"
+            log(f"⚠️ 退化 {metric}: {values}（{change:+.1%}）")
+        for path, reason in report['anomalies']:
+            log(f"⚠️ 异常压缩包 {path}: {reason}")
+        for change in report['changes']:
+            log(f"🔧 {change}")
+        if not report['regressions'] and not report['anomalies']:
+            log("✅ 没有发现性能退化或异常的压缩包")
+    return EXIT_FAILURES if report['regressions'] or report['anomalies'] else EXIT_OK
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    status = StatusLine() if progress_mode(args) == 'bar' else None
+    log = make_log_callback(args, status)
+    progress = make_progress_callback(args, log, status)
+    commands = {
+        'run': cmd_run,
+        'watch': cmd_watch,
+        'serve': cmd_serve,
+        'submit': cmd_submit,
+        'backends': cmd_backends,
+        'toc': cmd_toc,
+        'undo-renames': cmd_undo_renames,
+        'report': cmd_report,
+    }
+    return commands[args.command](args, log, progress)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
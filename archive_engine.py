@@ -0,0 +1,1281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包处理引擎（无界面）
+功能：扫描、分类、修正并解压压缩包，递归处理子文件夹。
+图形界面和命令行都只是这个引擎的调用方，引擎本身不依赖tkinter。
+解压程序由 extract_backends 按格式选择（Bandizip、7-Zip、unrar、bsdtar或内置解压程序）。
+"""
+
+import os
+import subprocess
+import json
+import time
+import threading
+from datetime import datetime
+from run_metrics import (
+    RunMetrics, STAGE_SCAN, STAGE_CLASSIFY, STAGE_RENAME, STAGE_PASSWORD_ATTEMPT,
+    STAGE_BACKEND, STAGE_VERIFY, STAGE_GUI_WAIT
+)
+from run_profiler import RunProfiler
+from extractor_runner import ExtractorJobRunner
+from archive_probe import probe_archive, format_size
+from toc_cache import open_toc_cache
+from run_history import open_run_history, backend_identity, file_hash
+from rename_planner import RenameJournal, corrected_name, plan_renames, JOURNAL_NAME
+from extract_policy import ExtractionPolicy, ACTION_STOP, ACTION_SKIP, ACTION_EXTRACT, CLASS_ARCHIVE, CLASS_MALFORMED
+from nested_pipeline import NestedPipeline, PipelinedEntry
+from tree_guard import TreeGuard, DEFAULT_SYMLINK_POLICY, ENTER_OK, ENTER_VISITED, ENTER_LINK
+from adaptive_timeout import ThroughputModel, ProgressWatchdog, member_paths, member_baseline
+from password_store import PasswordStore
+from job_scheduler import JobScheduler, ExtractionJob, DEFAULT_POLICY, DEFAULT_MAX_WAIT
+from io_limits import DeviceLimiter
+from bomb_guard import BombGuard, GuardLimits
+from resource_governor import ProcessPriority, LoadGovernor
+from progress_tracker import ProgressTracker
+from lease_coordinator import LeaseCoordinator, LEASE_DONE, LEASE_HELD, POLL_INTERVAL as LEASE_POLL_INTERVAL
+from integrity_check import IntegrityVerifier, VERIFY_OFF, RESULT_PASSED, RESULT_FAILED, RESULT_SKIPPED
+from extract_backends import (
+    BandizipBackend, BackendSelector, discover_backends, SUCCESS_INDICATORS,
+    STATUS_WRONG_PASSWORD, STATUS_CORRUPT
+)
+
+# 支持的压缩包格式
+ARCHIVE_EXTENSIONS = ['.7z', '.zip', '.rar', '.tar', '.gz', '.bz2', '.xz']
+
+
+# 自动并发时的工作线程数（解压在子进程中进行，线程只是等待；实际并发由各存储设备的并发上限决定）
+AUTO_WORKERS = 16
+
+# 每个文件夹最多处理的轮数（防止无限循环）
+MAX_ROUNDS = 5
+
+# 前几次密码尝试逐条记录日志，之后每尝试这么多个密码记录一行汇总（密码字典可能有上百万个候选）
+PASSWORD_LOG_DETAIL = 10
+PASSWORD_LOG_EVERY = 1000
+
+# 程序所在目录（配置文件、运行日志、指标和分析结果默认放在这里）
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def find_bandizip():
+    """查找Bandizip安装路径"""
+    # 如果找不到，由调用方决定如何处理（图形界面提示手动选择，命令行改用其他解压程序）
+    return BandizipBackend.locate()
+
+
+def print_log(message):
+    """默认日志输出：带时间戳打印到标准输出"""
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] {message}", flush=True)
+
+
+class _FolderState:
+    """一个文件夹的多轮处理状态"""
+
+    def __init__(self, path, depth):
+        self.path = path
+        self.depth = depth
+        self.round_count = 0
+        self.processed = set()  # 记录已处理的压缩包，避免重复处理
+        self.candidates = []    # 本轮尚未尝试的压缩包
+        self.leased = False     # 分片模式下是否已获得该文件夹的租约
+        self.abandoned = False  # 分片模式下租约已被其他节点接管，不再处理
+        self.pipelined = 0      # 提前提交、尚未结束的内层压缩包任务数
+        self.resume = None      # 内层任务全部结束后继续处理该文件夹的方法
+        self.decisions = {}     # 压缩包 -> 最近一次不解压的原因（原因变化时才写日志）
+        self.renamed = {}       # 修正后的文件名 -> 原文件名（已决定解压、等待后续轮次的异常格式压缩包）
+
+
+class ArchiveEngine:
+    def __init__(self, bandizip_path=None, config_file="config.json", log_callback=None,
+                 has_password=False, use_bandizip_wait=False, output_dir=APP_DIR,
+                 backend_paths=None, forced_backend=None, workers=1, schedule_policy=None, max_wait=None,
+                 verify_mode=None, progress_callback=None, symlink_policy=None, background=None, cpu_affinity=None):
+        # 日志回调（图形界面写入日志区域，命令行打印到终端）
+        self.log_callback = log_callback or print_log
+        # 进度回调（在后台线程中按间隔调用，参数为 ProgressTracker.snapshot() 的结果）
+        self.progress_callback = progress_callback
+
+        # 配置文件路径
+        self.config_file = config_file
+        # 常用密码和外部密码字典（self.passwords就是密码库中的常用密码列表）
+        self.password_store = PasswordStore(config_file, log_callback=self.log)
+        self.passwords = self.password_store.passwords
+
+        # 支持的压缩包格式
+        self.archive_extensions = list(ARCHIVE_EXTENSIONS)
+
+        # 文件夹和压缩包的处理规则（配置文件中的policy，未设置时与之前固定的判断相同）
+        self.policy = self._load_policy()
+
+        # Bandizip路径
+        self.bandizip_path = bandizip_path
+
+        # 解压程序后端（每次处理开始时重新查找）
+        self.backend_paths = backend_paths or {}  # 手动指定的 {后端名称: 路径}
+        self.forced_backend = forced_backend  # 强制使用的后端名称，None表示按格式自动选择
+        self.backends = {}
+        self.selector = None
+
+        # 密码选项
+        self.has_password = has_password  # 是否跳过无密码尝试
+        self.use_bandizip_wait = use_bandizip_wait  # 是否在密码全部失败后等待Bandizip手动输入
+
+        # 指标和分析结果的输出目录
+        self.output_dir = output_dir
+
+        # 解压任务调度（参数未指定时使用配置文件中schedule的设置）
+        schedule = self._load_config_section('schedule')
+        # 同时运行的解压任务数，0表示由各存储设备的并发上限决定
+        self.workers = int(workers) if int(workers) > 0 else AUTO_WORKERS
+        self.schedule_policy = schedule_policy or schedule.get('policy', DEFAULT_POLICY)
+        self.schedule_rules = schedule.get('rules', [])  # [{'pattern': 路径通配符, 'priority': 数字}]
+        self.max_wait = max_wait if max_wait is not None else schedule.get('max_wait', DEFAULT_MAX_WAIT)
+        # 外层压缩包解压过程中提前解压已写出的内层压缩包（需要解压程序逐个报告写出的条目，且工作线程多于1个）
+        self.pipeline_nested = schedule.get('pipeline_nested', True)
+        self._pipeline_lock = threading.Lock()
+        self._running_targets = {}  # 正在运行的解压程序任务编号 -> 目标目录（租约丢失时结束该文件夹中的解压）
+        self._pipelined_done = set()  # 本次运行中已由流水线解压成功的内层压缩包路径
+        self.io_settings = self._load_config_section('io_limits')  # 按存储设备的并发上限和带宽预算
+        self._scheduler = None
+        self._local = threading.local()  # 每个工作线程当前压缩包的密码尝试次数
+
+        # 解压后的完整性校验（参数未指定时使用配置文件中integrity的设置，默认不校验）
+        integrity = self._load_config_section('integrity')
+        self.verify_mode = verify_mode or integrity.get('mode', VERIFY_OFF)
+        self.verify_workers = integrity.get('workers', 1)
+        self._verifier = None
+
+        # 符号链接策略（参数未指定时使用配置文件中traversal的设置，默认跟随），已访问的文件夹每次处理开始时重新记录
+        traversal = self._load_config_section('traversal')
+        self.symlink_policy = symlink_policy or traversal.get('symlinks', DEFAULT_SYMLINK_POLICY)
+        self._guard = None
+
+        # 低影响后台模式（参数未指定时使用配置文件中background的设置，默认关闭）：
+        # 降低解压程序和工作线程的CPU/I/O优先级，并按系统负载调节同时解压的任务数
+        self.background_settings = self._load_config_section('background')
+        self.background = self.background_settings.get('enabled', False) if background is None else background
+        try:
+            self.priority = ProcessPriority.from_settings(self.background_settings, cpus=cpu_affinity,
+                                                          log_callback=self.log)
+        except (ValueError, TypeError) as e:
+            self.log(f"⚠️ 后台模式配置无效，使用默认优先级: {e}")
+            self.priority = ProcessPriority(cpus=cpu_affinity, log_callback=self.log)
+        self._governor = None
+
+        # 解压炸弹防护（配置文件中bomb_guard可以调整或关闭各项限制，每次处理开始时重新统计）
+        try:
+            self.guard_limits = GuardLimits(self._load_config_section('bomb_guard'))
+        except (ValueError, TypeError) as e:
+            self.log(f"⚠️ 解压限制配置无效，使用默认限制: {e}")
+            self.guard_limits = GuardLimits()
+        self.guard = BombGuard(self.guard_limits)
+
+        # 本次运行的进度（每次处理开始时重新创建）
+        self.progress = ProgressTracker()
+
+        # 多节点分片设置（None表示不与其他节点协调），{'lease_dir': 路径, 'ttl': 秒, 'node_id': 名称}
+        self.lease_settings = None
+        self._coordinator = None
+
+        # 处理状态
+        self.stop_processing = False  # 手动停止标志
+        self._stop_event = threading.Event()  # 用于可中断的等待
+
+        # 解压程序子进程调度（停止时立即结束正在运行的解压进程）
+        self.runner = ExtractorJobRunner()
+
+        # 本机历史解压吞吐量（用于计算每个任务的超时时间）
+        self.throughput = ThroughputModel(os.path.join(output_dir, 'throughput_stats.json'))
+
+        # 压缩包目录缓存（压缩包没有变化时不再重新读取文件头，配置文件中toc_cache可以关闭或调整上限）
+        self.toc_cache = open_toc_cache(self._load_config_section('toc_cache'), output_dir, log_callback=self.log)
+
+        # 改名日志（异常格式压缩包的文件名修正，可以用 undo-renames 撤销）
+        self.rename_journal = RenameJournal(os.path.join(output_dir, JOURNAL_NAME))
+
+        # 历史运行数据库（每次运行的摘要，供 report 子命令对比退化，配置文件中history可以关闭或调整保留数量）
+        self.history = open_run_history(self._load_config_section('history'), output_dir, log_callback=self.log)
+
+        # 运行指标（每次处理开始时重新创建）
+        self.metrics = RunMetrics()
+
+    def log(self, message):
+        """输出日志信息"""
+        self.log_callback(message)
+
+    def request_stop(self):
+        """请求停止处理，并立即结束正在运行的解压进程"""
+        self.stop_processing = True
+        self._stop_event.set()
+        if self._scheduler is not None:
+            self._scheduler.close()
+        if self._verifier is not None:
+            self._verifier.cancel()
+        cancelled = self.runner.cancel_all()
+        if cancelled:
+            self.log(f"⏹️ 已结束 {cancelled} 个正在运行的解压进程")
+
+    def _wait(self, seconds):
+        """可被停止请求打断的等待，返回True表示已请求停止"""
+        return self._stop_event.wait(seconds)
+
+    def _load_config_section(self, name):
+        """读取配置文件中的一节设置"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get(name, {})
+        except Exception as e:
+            self.log(f"加载{name}设置失败: {e}")
+        return {}
+
+    def probe(self, archive_path):
+        """探测压缩包信息（优先读取目录缓存）"""
+        info = probe_archive(archive_path, cache=self.toc_cache)
+        if self.toc_cache is not None:
+            self.metrics.incr('toc_cache_hits_total' if info['cached'] else 'toc_cache_misses_total')
+        return info
+
+    def _load_policy(self):
+        settings = self._load_config_section('policy')
+        try:
+            return ExtractionPolicy(self.archive_extensions, self.is_malformed_archive, settings)
+        except (ValueError, TypeError) as e:
+            self.log(f"⚠️ 解压策略配置无效，使用默认规则: {e}")
+            return ExtractionPolicy(self.archive_extensions, self.is_malformed_archive)
+
+    def load_passwords(self):
+        """重新加载保存的密码"""
+        return self.password_store.load()
+
+    def save_passwords(self):
+        """保存密码到配置文件（保留配置文件中的其他设置）"""
+        self.password_store.save()
+
+    def prepare_backends(self):
+        """查找本机可用的解压程序，返回 {名称: 后端}"""
+        self.backends = discover_backends(self.bandizip_path, self.backend_paths, self.forced_backend)
+        self.selector = BackendSelector(
+            self.backends,
+            os.path.join(self.output_dir, 'backend_selection.json'),
+            throughput_model=self.throughput,
+            log_callback=self.log,
+            forced=self.forced_backend
+        )
+        return self.backends
+
+    def process_folder(self, folder_path, profile=False, cancelled=None):
+        """处理文件夹中的压缩包，返回本次运行的结果摘要（integrity_failed为完整性校验失败的压缩包数）
+
+        cancelled: 可选回调，重置停止标志后调用，返回True表示处理开始前已被取消（不会丢失此前到达的停止请求）
+        """
+        self.prepare_backends()
+        self.stop_processing = False
+        self._stop_event.clear()
+        if cancelled is not None and cancelled():
+            self.stop_processing = True
+            self._stop_event.set()
+        self.metrics = RunMetrics()
+        error = None
+        try:
+            self.log(f"开始处理文件夹: {folder_path}")
+            if profile:
+                self._run_profiled(folder_path)
+            else:
+                self._process_tree(folder_path)
+            self.log("处理完成！")
+        except Exception as e:
+            error = str(e)
+            self.log(f"处理过程中出现错误: {e}")
+        finally:
+            self.export_metrics()
+            self.record_history(folder_path, error)
+            try:
+                self.throughput.save()
+            except Exception as e:
+                self.log(f"⚠️ 保存吞吐量统计失败: {e}")
+        counters = self.metrics.summary()['counters']
+        return {
+            'folder': folder_path,
+            'stopped': self.stop_processing,
+            'error': error,
+            'succeeded': counters.get('archives_succeeded_total', 0),
+            'failed': counters.get('archives_failed_total', 0),
+            'integrity_failed': counters.get('integrity_failed_total', 0),
+        }
+
+    def _run_profiled(self, folder_path):
+        """在cProfile和tracemalloc下处理文件夹，分析结果写到运行日志所在目录"""
+        profiler = RunProfiler(self.output_dir, context_provider=self.metrics.current_context)
+        try:
+            profiler.run(self._process_tree, folder_path)
+        finally:
+            if profiler.output_files:
+                self.log(f"🧪 性能分析结果已保存: {', '.join(os.path.basename(p) for p in profiler.output_files)}")
+
+    def export_metrics(self):
+        """导出本次运行的指标（JSON和Prometheus文本格式，与运行日志放在同一目录）"""
+        try:
+            self.metrics.finish()
+            json_path, prom_path = self.metrics.export(self.output_dir)
+            summary = self.metrics.summary()
+            self.log(f"📈 运行指标已导出: {os.path.basename(json_path)}, {os.path.basename(prom_path)}")
+            for name, stats in sorted(summary['stages'].items()):
+                self.log(f"📈 阶段 {name}: {stats['count']}次, p50={stats['p50']:.3f}s, p95={stats['p95']:.3f}s")
+        except Exception as e:
+            # 避免指标导出错误影响主程序运行
+            self.log(f"⚠️ 导出运行指标失败: {e}")
+
+    def record_history(self, folder_path, error=None):
+        """把本次运行的摘要写入历史运行数据库（没有处理任何压缩包的运行不记录）"""
+        archives = self.metrics.archive_records()
+        if self.history is None or not archives:
+            return
+        settings = {
+            'workers': self.workers,
+            'schedule': self.schedule_policy,
+            'verify': self.verify_mode,
+            'forced_backend': self.forced_backend,
+            'has_password': self.has_password,
+            'background': self.background,
+        }
+        try:
+            run_id = self.history.record_run(folder_path, self.metrics.summary(), archives,
+                                             config_hash=file_hash(self.config_file),
+                                             backends=backend_identity(self.backends), settings=settings, error=error)
+            self.log(f"🗃️ 本次运行已记录到历史数据库: #{run_id}")
+        except Exception as e:
+            self.log(f"⚠️ 写入历史运行数据库失败: {e}")
+
+    def _process_tree(self, root):
+        """处理文件夹树：遍历文件夹生成解压任务，由调度器按策略排序后交给工作线程执行"""
+        limiter = DeviceLimiter(self.io_settings, log_callback=self.log)
+        scheduler = JobScheduler(self.schedule_policy, self.schedule_rules, self.max_wait, prepare=limiter.prepare)
+        self._scheduler = scheduler
+        self._guard = TreeGuard(root, self.symlink_policy)
+        self._pipelined_done = set()
+        self.guard = BombGuard(self.guard_limits)
+        self.rename_journal.new_run()
+        self._guard.enter(root)
+        self.runner.priority = self.priority if self.background else None
+        if self.background:
+            self._governor = LoadGovernor(self.workers, self.background_settings.get('governor'), log_callback=self.log)
+            self._governor.start()
+            self.log(f"🌙 后台模式: {self.priority.describe()}，同时解压的任务数按系统负载在 "
+                     f"{self._governor.min_workers}~{self._governor.max_workers} 之间调整")
+        self.progress = ProgressTracker(self.progress_callback)
+        self.progress.start_reporting()
+        if self.verify_mode != VERIFY_OFF:
+            # 校验在后台线程进行，工作线程提交后直接处理下一个压缩包
+            self._verifier = IntegrityVerifier(self.verify_mode, self.runner, self.metrics,
+                                               log_callback=self.log, workers=self.verify_workers,
+                                               thread_init=self.priority.apply_to_current_thread if self.background else None)
+        if self.lease_settings is not None:
+            # 与处理同一共享目录的其他节点按文件夹分配任务
+            self._coordinator = LeaseCoordinator(root, log_callback=self.log, **self.lease_settings)
+            self._coordinator.on_lost = self._on_lease_lost
+            self._coordinator.start_heartbeat()
+            self.log(f"🤝 分片模式: 节点 {self._coordinator.node_id}，租约目录 {self._coordinator.lease_dir}")
+        if self.stop_processing:
+            scheduler.close()
+        try:
+            self._visit_folder(root, 0)
+            self._run_workers(scheduler, limiter)
+            if self._coordinator is not None:
+                self._rebalance(scheduler, limiter)
+            if scheduler.promoted:
+                self.log(f"⏳ {scheduler.promoted} 个等待超过{self.max_wait}秒的任务已提前处理")
+            guard = self._guard
+            if guard.skipped_visited or guard.skipped_links or guard.skipped_files:
+                self.log(f"🔗 跳过 {guard.skipped_visited} 个重复的文件夹（链接循环、硬链接或重复挂载）、"
+                         f"{guard.skipped_links} 个符号链接、{guard.skipped_files} 个硬链接的重复压缩包")
+            if self.guard.rejected or self.guard.aborted:
+                self.log(f"💣 解压限制: 解压前拒绝 {self.guard.rejected} 个压缩包，解压中中止 {self.guard.aborted} 个")
+            hits = self.metrics.counters.get('toc_cache_hits_total', 0)
+            if hits:
+                self.log(f"📇 {hits} 次压缩包信息读取自目录缓存（共 {hits + self.metrics.counters.get('toc_cache_misses_total', 0)} 次）")
+        finally:
+            if self.toc_cache is not None:
+                # 把本次运行中命中记录的最近使用时间写入数据库
+                self.toc_cache.flush()
+            if self._coordinator is not None:
+                self._coordinator.close()
+                if self._coordinator.stolen:
+                    self.log(f"🤝 本节点接管了 {self._coordinator.stolen} 个其他节点的过期租约")
+                self._coordinator = None
+            if self._verifier is not None:
+                self._finish_verification()
+            if self._governor is not None:
+                self._governor.stop()
+                self.log(f"⚖️ 负载调节: 同时解压的任务数最低 {self._governor.lowest}，结束时 {self._governor.limit}")
+                self._governor = None
+            self.progress.stop_reporting()
+
+    def _run_workers(self, scheduler, limiter):
+        """运行工作线程，直到没有排队和正在运行的解压任务"""
+        # 当前线程也作为一个工作线程（性能分析只能采集当前线程的调用）
+        threads = [
+            threading.Thread(target=self._worker_loop, args=(scheduler, limiter), name=f'extract-worker-{i}', daemon=True)
+            for i in range(1, self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        self._worker_loop(scheduler, limiter)
+        for thread in threads:
+            thread.join()
+
+    def _rebalance(self, scheduler, limiter):
+        """本节点的任务完成后，等待其他节点持有的文件夹：完成后争抢其子文件夹，租约过期（节点退出）时接管"""
+        coordinator = self._coordinator
+        if coordinator.has_deferred():
+            self.log("🤝 本节点的文件夹已处理完，等待其他节点...")
+        while coordinator.has_deferred() and not self.stop_processing:
+            if self._wait(LEASE_POLL_INTERVAL):
+                return
+            finished, expired = coordinator.poll_deferred()
+            for folder, depth in finished:
+                self._visit_subfolders(folder, depth)
+            for folder, depth in expired:
+                self._visit_folder(folder, depth)
+            if finished or expired:
+                self._run_workers(scheduler, limiter)
+
+    def _on_lease_lost(self, folder):
+        """文件夹的租约被其他节点接管（心跳线程中调用）：结束该文件夹中正在运行的解压程序"""
+        prefix = os.path.join(folder, '')
+        with self._pipeline_lock:
+            job_ids = [job_id for job_id, target in self._running_targets.items()
+                       if target == folder or target.startswith(prefix)]
+        for job_id in job_ids:
+            self.runner.cancel(job_id)
+
+    def _abandon_if_lost(self, state):
+        """分片模式：租约已被其他节点接管时放弃该文件夹（不写完成标记，子文件夹由接管的节点处理）"""
+        if state.abandoned:
+            return True
+        if not state.leased or self._coordinator is None or self._coordinator.owns(state.path):
+            return False
+        state.abandoned = True
+        self._drop_candidates(state)
+        self.progress.close_folder()
+        self.log(f"🤝 文件夹 {os.path.basename(state.path)} 的租约已被其他节点接管，放弃处理")
+        return True
+
+    def _finish_verification(self):
+        """等待后台校验全部完成并输出汇总"""
+        verifier, self._verifier = self._verifier, None
+        pending = verifier.pending()
+        if pending and not self.stop_processing:
+            self.log(f"🧪 等待 {pending} 个压缩包完成完整性校验...")
+        counts = verifier.drain()
+        if counts:
+            self.log(f"🧪 完整性校验: 通过 {counts.get(RESULT_PASSED, 0)} 个, 失败 {counts.get(RESULT_FAILED, 0)} 个, "
+                     f"跳过 {counts.get(RESULT_SKIPPED, 0)} 个")
+
+    def _worker_loop(self, scheduler, limiter):
+        admit, retry_after = limiter.try_acquire, limiter.retry_after
+        governor = self._governor
+        if governor is not None:
+            # 后台模式：先检查负载调节器的名额，再检查存储设备的并发
+            self.priority.apply_to_current_thread()
+            admit, retry_after = governor.admission(admit, retry_after)
+        while True:
+            # 任务所在的存储设备并发已满时先处理其他设备上的任务
+            job = scheduler.get(admit=admit, retry_after=retry_after)
+            if job is None:
+                return
+            try:
+                self._run_job(job)
+            except Exception as e:
+                self.log(f"💥 处理文件夹时出错: {e}")
+            finally:
+                limiter.release(job)
+                if governor is not None:
+                    governor.release()
+                scheduler.done(job)
+
+    def _visit_folder(self, folder_path, depth):
+        """检查文件夹：有可执行文件时停止，没有压缩包时直接检查子文件夹，否则开始第一轮解压"""
+        try:
+            # 检查是否需要停止处理
+            if self.stop_processing:
+                self.log("⏹️ 处理已被用户停止")
+                return
+                
+            # 扫描一次文件夹，按规则决定：停止（例如出现exe等可执行文件）、跳过（例如没有压缩包）或处理
+            with self.metrics.stage(STAGE_SCAN):
+                summary = self.policy.summarize(folder_path, depth)
+            self.metrics.incr('folders_scanned_total')
+            
+            with self.metrics.stage(STAGE_CLASSIFY):
+                action, reason = self.policy.decide_folder(summary)
+            
+            if action == ACTION_STOP:
+                self.log(f"🎯 文件夹 {os.path.basename(folder_path)}: {reason}，停止处理")
+                return
+            elif action == ACTION_SKIP:
+                self.log(f"📁 文件夹 {os.path.basename(folder_path)}: {reason}，跳过当前文件夹但继续递归子文件夹")
+                # 不直接返回，而是跳过当前文件夹的处理，但仍然递归处理子文件夹
+                self._visit_subfolders(folder_path, depth)
+                return
+                
+            self.log(f"🔍 检查文件夹: {os.path.basename(folder_path)}")
+            # 第一轮直接使用刚才的扫描结果
+            self.progress.open_folder()
+            self._start_round(_FolderState(folder_path, depth), summary)
+                
+        except Exception as e:
+            self.log(f"💥 处理文件夹时出错: {e}")
+
+    def _visit_subfolders(self, folder_path, depth):
+        """递归处理子文件夹"""
+        try:
+            for item in os.listdir(folder_path):
+                item_path = os.path.join(folder_path, item)
+                if self._coordinator is not None and self._coordinator.is_lease_dir(item_path):
+                    continue
+                if not os.path.isdir(item_path):
+                    continue
+                # 同一个目录（按设备号和inode识别）只进入一次，符号链接按策略处理
+                result = self._guard.enter(item_path)
+                if result == ENTER_VISITED:
+                    self.log(f"🔁 跳过已访问过的文件夹（链接循环或重复挂载）: {item_path}")
+                elif result == ENTER_LINK:
+                    self.log(f"🔗 按符号链接策略（{self.symlink_policy}）跳过: {item_path}")
+                elif result == ENTER_OK:
+                    self._visit_folder(item_path, depth + 1)
+                else:
+                    self.log(f"⚠️ 无法读取文件夹信息，跳过: {item_path}")
+        except OSError as e:
+            self.log(f"⚠️ 无法读取子文件夹: {e}")
+
+    def _start_round(self, state, summary=None):
+        """开始文件夹的下一轮处理：重新扫描并提交一个解压任务，没有可处理的压缩包时结束该文件夹"""
+        # 多轮处理，直到没有新的压缩包可处理（防止无限循环）
+        if self.stop_processing:
+            self.log("⏹️ 处理已被用户停止")
+            self._drop_candidates(state)
+            return
+        if self._abandon_if_lost(state):
+            return
+        # 批量修正文件名的压缩包每个都已决定解压，各自增加一轮
+        if state.round_count >= MAX_ROUNDS + len(state.renamed):
+            self._finish_folder(state)
+            return
+        state.round_count += 1
+        
+        # 重新获取当前文件夹内容（因为解压可能产生新文件），本轮所有候选都按这一次的扫描结果判断
+        if summary is None:
+            try:
+                with self.metrics.stage(STAGE_SCAN):
+                    summary = self.policy.summarize(state.path, state.depth)
+            except OSError as e:
+                self.log(f"⚠️ 无法读取文件夹 {state.path}: {e}")
+                self._finish_folder(state)
+                return
+        
+        # 上一轮未提交的候选不再计入进度（本轮按新的扫描结果重新登记）
+        self._drop_candidates(state)
+        selected = []
+        for filename, cls in summary.classes.items():
+            file_path = os.path.join(state.path, filename)
+            # 跳过已处理的压缩包
+            if filename in state.processed or cls not in (CLASS_ARCHIVE, CLASS_MALFORMED):
+                continue
+            if file_path in self._pipelined_done:
+                # 外层解压过程中已经提前解压
+                state.processed.add(filename)
+                continue
+            if filename in state.renamed:
+                # 之前的轮次已修正文件名，按修正前的判断解压
+                selected.append((filename, 'malformed'))
+                continue
+            action, reason = self.policy.decide_archive(summary, filename)
+            if action != ACTION_EXTRACT:
+                if state.decisions.get(filename) != reason:
+                    state.decisions[filename] = reason
+                    self.log(f"⏭️ 不解压: {filename}（{reason}）")
+                continue
+            selected.append((filename, 'malformed' if cls == CLASS_MALFORMED else 'normal'))
+        
+        # 本轮要解压的异常格式压缩包一次全部修正文件名（按本轮的扫描结果在内存中解决重名）
+        renamed = self._rename_malformed(state.path, summary.files,
+                                         [f for f, kind in selected if kind == 'malformed' and f not in state.renamed])
+        for filename, new_name in renamed.items():
+            state.renamed[new_name] = filename
+        for filename, kind in selected:
+            filename = renamed.get(filename, filename)
+            file_path = os.path.join(state.path, filename)
+            if not self._guard.claim_file(file_path):
+                self.log(f"🔗 跳过硬链接的重复压缩包（已在其他位置处理）: {filename}")
+                state.processed.add(filename)
+                continue
+            job = ExtractionJob(file_path, self.probe(file_path)['uncompressed_size'], state.depth,
+                                context=(state, kind), target=state.path)
+            state.candidates.append(job)
+            self.progress.add(job.path, job.size)
+        self._submit_next(state)
+
+    def _submit_next(self, state):
+        """提交本轮中下一个候选压缩包；本轮全部失败时结束该文件夹"""
+        if self._abandon_if_lost(state):
+            return
+        if not state.candidates or self.stop_processing:
+            self._finish_folder(state)
+            return
+        job = self._scheduler.best(state.candidates)
+        state.candidates.remove(job)
+        self._scheduler.submit(job)
+
+    def _drop_candidates(self, state):
+        """放弃本轮尚未提交的候选压缩包，从进度统计中移除"""
+        for job in state.candidates:
+            self.progress.discard(job.path)
+        state.candidates = []
+
+    def _finish_folder(self, state):
+        self._drop_candidates(state)
+        if self._coordinator is not None:
+            # 写入完成标记后其他节点也可以争抢该文件夹的子文件夹
+            self._coordinator.release(state.path, done=not self.stop_processing)
+        # 当前文件夹处理完后再处理子文件夹（解压可能产生新的子文件夹）
+        if not self.stop_processing:
+            self._visit_subfolders(state.path, state.depth)
+        self.progress.close_folder()
+
+    def _run_job(self, job):
+        """执行一个解压任务，然后继续该文件夹的处理"""
+        if isinstance(job.context, PipelinedEntry):
+            self._run_pipelined(job)
+            return
+        state, kind = job.context
+        if self.stop_processing:
+            self.log("⏹️ 处理已被用户停止")
+            self.progress.discard(job.path)
+            self._drop_candidates(state)
+            return
+        if self._coordinator is not None and not state.leased and not self._claim_folder(job, state):
+            return
+        if self._abandon_if_lost(state):
+            self.progress.discard(job.path)
+            return
+        filename = os.path.basename(job.path)
+        # 修正文件名后压缩包路径会变化，进度按任务的原始路径记录
+        self._local.progress_key = job.path
+        self.progress.start(job.path)
+        success = False
+        try:
+            success = self._extract_job(job, state, kind, filename)
+        finally:
+            self.progress.finish(job.path, success)
+        
+        if success:
+            self.log(f"✅ 第{state.round_count}轮处理完成: {filename}")
+            self.log(f"🔄 第{state.round_count}轮处理完成，继续检查...")
+            self._continue_folder(state, self._start_round)
+        else:
+            self._continue_folder(state, self._submit_next)
+
+    def _continue_folder(self, state, step):
+        """继续文件夹的处理；还有提前提交的内层任务时等它们全部结束后再继续（下一轮扫描需要看到它们的结果）"""
+        with self._pipeline_lock:
+            if state.pipelined:
+                state.resume = step
+                return
+        step(state)
+
+    def _submit_pipelined(self, state, path, kind, level):
+        """外层解压中某个内层压缩包已写出：提前提交解压任务（level为内层压缩包的嵌套层数）"""
+        if self.stop_processing:
+            return None
+        self.guard.mark_path(path, level)
+        entry = PipelinedEntry(state, kind)
+        relative = os.path.relpath(path, state.path)
+        depth = state.depth + relative.count(os.sep)
+        job = ExtractionJob(path, self.probe(path)['uncompressed_size'], depth, context=entry,
+                            target=os.path.dirname(path))
+        with self._pipeline_lock:
+            state.pipelined += 1
+        self.progress.add(job.path, job.size)
+        self._scheduler.submit(job)
+        self.log(f"🚀 内层压缩包已写出，提前加入解压队列: {relative}")
+        return entry
+
+    def _run_pipelined(self, job):
+        """执行提前提交的内层压缩包任务，全部结束后继续外层文件夹的处理"""
+        entry = job.context
+        try:
+            if not entry.start() or self.stop_processing:
+                self.progress.discard(job.path)
+                return
+            filename = os.path.basename(job.path)
+            self._local.progress_key = job.path
+            self._local.folder_state = None  # 内层压缩包不再继续流水线，其中的压缩包由下一轮处理
+            self.progress.start(job.path)
+            success = False
+            try:
+                done_paths = {job.path}
+                if entry.kind == 'malformed':
+                    self.log(f"🗜️ 发现异常格式压缩包（流水线）: {filename}")
+                    corrected_path = self.correct_archive_name(job.path)
+                    if corrected_path:
+                        done_paths.add(corrected_path)
+                        success = self.extract_archive(corrected_path, job.target)
+                else:
+                    self.log(f"🗜️ 解压内层压缩包（流水线）: {filename}")
+                    success = self.extract_archive(job.path, job.target)
+                if success:
+                    with self._pipeline_lock:
+                        self._pipelined_done.update(done_paths)
+                    self.log(f"✅ 内层压缩包处理完成（流水线）: {filename}")
+            finally:
+                self.progress.finish(job.path, success)
+        finally:
+            entry.finished.set()
+            state = entry.owner
+            with self._pipeline_lock:
+                state.pipelined -= 1
+                resume = state.resume if not state.pipelined else None
+                if resume is not None:
+                    state.resume = None
+            if resume is not None:
+                resume(state)
+
+    def _plan_pipeline(self, extract_to, backend, probe, files_before, level):
+        """按外层压缩包的条目列表预先判断下一轮扫描会解压哪些内层压缩包，返回NestedPipeline，不适用时返回None"""
+        state = getattr(self._local, 'folder_state', None)
+        if (not self.pipeline_nested or state is None or self.workers < 2 or not backend.reports_entries
+                or not probe.get('members') or probe.get('members_truncated')
+                or os.path.abspath(extract_to) != os.path.abspath(state.path)):
+            return None
+        # 外层解压完成后各文件夹中的文件：已有的文件 + 外层压缩包的条目（键为相对路径，''表示目标目录本身）
+        listing = {}
+        for name, size, *_ in probe['members']:
+            relative = name.replace('\\', '/').strip('/')
+            if relative:
+                folder, _, filename = relative.rpartition('/')
+                listing.setdefault(folder, {})[filename] = size
+        summaries = {}
+        for folder, files in listing.items():
+            path = os.path.join(extract_to, *folder.split('/')) if folder else extract_to
+            try:
+                existing = self.policy.summarize(path, 0).files if os.path.isdir(path) else {}
+            except OSError:
+                existing = {}
+            if folder == '':
+                existing = {f: size for f, size in existing.items() if f in files_before}
+            summaries[folder] = self.policy.summary_of(
+                path, state.depth + (folder.count('/') + 1 if folder else 0), dict(existing, **files))
+        plan = {}
+        for folder, summary in summaries.items():
+            if folder and (self._coordinator is not None or self._folder_blocked(folder, summaries)):
+                # 分片模式下子文件夹由各节点争抢，不提前处理；按规则遍历不会处理的子文件夹也不提前处理
+                continue
+            kinds = {}
+            for f in listing[folder]:
+                cls = summary.classes[f]
+                if cls in (CLASS_ARCHIVE, CLASS_MALFORMED) and not (folder == '' and f in state.processed):
+                    if self.policy.decide_archive(summary, f)[0] == ACTION_EXTRACT:
+                        kinds[f] = 'malformed' if cls == CLASS_MALFORMED else 'normal'
+            # 同一文件夹中有多个正常格式的压缩包时，逐轮处理的结果与顺序有关（每轮重新判断），不提前处理
+            if sum(1 for kind in kinds.values() if kind == 'normal') > 1:
+                kinds = {f: kind for f, kind in kinds.items() if kind != 'normal'}
+            for f, kind in kinds.items():
+                plan[f'{folder}/{f}' if folder else f] = kind
+        if not plan:
+            return None
+        return NestedPipeline(extract_to, plan, lambda path, kind: self._submit_pipelined(state, path, kind, level + 1))
+
+    def _folder_blocked(self, folder, summaries):
+        """按文件夹规则，遍历时不会处理该子文件夹（自身不是process，或上级文件夹是stop）"""
+        parts = folder.split('/')
+        for i in range(1, len(parts) + 1):
+            summary = summaries.get('/'.join(parts[:i]))
+            if summary is None:
+                continue
+            action = self.policy.decide_folder(summary)[0]
+            if action == ACTION_STOP or (i == len(parts) and action == ACTION_SKIP):
+                return True
+        return False
+
+    def _claim_folder(self, job, state):
+        """分片模式：文件夹的第一个任务开始前获得租约（开始时才争抢，各节点按实际处理速度分到文件夹）"""
+        lease = self._coordinator.claim(state.path, state.depth)
+        if lease == LEASE_DONE:
+            self.progress.discard(job.path)
+            self._drop_candidates(state)
+            self.log(f"🤝 文件夹 {os.path.basename(state.path)} 已由其他节点处理完成")
+            self._visit_subfolders(state.path, state.depth)
+            self.progress.close_folder()
+            return False
+        if lease == LEASE_HELD:
+            self.progress.discard(job.path)
+            self._drop_candidates(state)
+            self.log(f"🤝 文件夹 {os.path.basename(state.path)} 正由其他节点处理，稍后再检查")
+            self.progress.close_folder()
+            return False
+        state.leased = True
+        return True
+
+    def _extract_job(self, job, state, kind, filename):
+        """修正文件名（异常格式）并解压，返回是否成功"""
+        self._local.folder_state = state
+        try:
+            return self._extract_folder_job(job, state, kind, filename)
+        finally:
+            self._local.folder_state = None
+
+    def _extract_folder_job(self, job, state, kind, filename):
+        success = False
+        if kind == 'malformed':
+            original = state.renamed.get(filename, filename)
+            self.log(f"🗜️ 发现异常格式压缩包: {original}")
+            # 文件名通常在本轮开始时已批量修正，修正失败的压缩包在这里再尝试一次
+            corrected_path = job.path if filename in state.renamed else self.correct_archive_name(job.path)
+            if corrected_path and self.extract_archive(corrected_path, state.path):
+                # 不删除源压缩文件，保留原始文件
+                self.log(f"💾 保留原压缩包: {original}")
+                state.processed.add(original)  # 标记原始文件名为已处理
+                # 同时标记修正后的文件名为已处理，避免重复解压
+                state.processed.add(os.path.basename(corrected_path))
+                success = True
+        else:
+            self.log(f"🗜️ 发现需要解压的压缩包: {filename}")
+            if self.extract_archive(job.path, state.path):
+                # 不删除源压缩文件，保留原始文件
+                self.log(f"💾 保留原压缩包: {filename}")
+                state.processed.add(filename)  # 标记为已处理
+                success = True
+        return success
+    
+    def is_malformed_archive(self, filename):
+        """检查是否为异常格式的压缩包"""
+        filename_lower = filename.lower()
+        
+        # 检查是否包含压缩包扩展名但格式异常
+        for ext in self.archive_extensions:
+            if ext in filename_lower:
+                # 如果文件名包含扩展名但不以该扩展名结尾，则认为是异常格式
+                if not filename_lower.endswith(ext):
+                    # 进一步检查，确保不是复合扩展名（如.tar.gz）
+                    if ext == '.gz' and filename_lower.endswith('.tar.gz'):
+                        continue
+                    if ext == '.bz2' and filename_lower.endswith('.tar.bz2'):
+                        continue
+                    if ext == '.xz' and filename_lower.endswith('.tar.xz'):
+                        continue
+                    return True
+        return False
+        
+    def correct_archive_name(self, file_path):
+        """修正单个压缩包的文件名，返回修正后的路径，失败时返回None"""
+        directory = os.path.dirname(file_path)
+        filename = os.path.basename(file_path)
+        if corrected_name(filename, self.archive_extensions) == filename:
+            return file_path
+        try:
+            snapshot = os.listdir(directory)
+        except OSError as e:
+            self.log(f"修正文件名失败: {e}")
+            return None
+        renamed = self._rename_malformed(directory, snapshot, [filename])
+        return os.path.join(directory, renamed[filename]) if filename in renamed else None
+
+    def _rename_malformed(self, directory, snapshot, filenames):
+        """按一次目录快照修正一批异常格式压缩包的文件名，返回 {原文件名: 修正后的文件名}"""
+        if not filenames:
+            return {}
+        renamed = {}
+        with self.metrics.stage(STAGE_RENAME):
+            for filename, new_name in plan_renames(snapshot, filenames, self.archive_extensions):
+                new_path = os.path.join(directory, new_name)
+                try:
+                    # 快照之后出现的同名文件不覆盖（下一轮按新的扫描结果重新计算）
+                    if os.path.lexists(new_path):
+                        raise FileExistsError(f"目标文件已存在: {new_name}")
+                    os.rename(os.path.join(directory, filename), new_path)
+                    self.guard.moved(os.path.join(directory, filename), new_path)
+                except OSError as e:
+                    self.log(f"修正文件名失败: {filename}: {e}")
+                    continue
+                renamed[filename] = new_name
+                self.metrics.incr('renames_total')
+                self.log(f"文件名已修正: {filename} -> {new_name}")
+                try:
+                    self.rename_journal.record(directory, filename, new_name)
+                except OSError as e:
+                    self.log(f"⚠️ 写入改名日志失败: {e}")
+        return renamed
+
+    def extract_archive(self, archive_path, extract_to):
+        """使用Bandizip解压文件"""
+        start = time.perf_counter()
+        self._local.attempts = 0
+        self._local.archive_info = None
+        self.metrics.set_current_archive(os.path.basename(archive_path))
+        success = self._extract_archive(archive_path, extract_to)
+        try:
+            archive_bytes = os.path.getsize(archive_path)
+        except OSError:
+            archive_bytes = 0
+        seconds = time.perf_counter() - start
+        self.metrics.record_extraction(archive_bytes, seconds, self._local.attempts, success)
+        info = getattr(self._local, 'archive_info', None) or {}
+        self.metrics.record_archive({
+            'path': os.path.abspath(archive_path),
+            'size': archive_bytes,
+            'uncompressed': info.get('uncompressed', 0),
+            'format': info.get('format'),
+            'backend': info.get('backend'),
+            'attempts': self._local.attempts,
+            'success': success,
+            'seconds': round(seconds, 6),
+            'stages': self.metrics.archive_stages(),
+        })
+        self.metrics.set_current_archive(None)
+        return success
+        
+    def _extract_archive(self, archive_path, extract_to):
+        """使用Bandizip解压文件（实际实现）"""
+        budget = None
+        try:
+            self.log(f"📦 开始解压: {os.path.basename(archive_path)}")
+            self.log(f"📁 目标路径: {extract_to}")
+            
+            # 检查源文件是否存在
+            if not os.path.exists(archive_path):
+                self.log(f"❌ 源文件不存在: {archive_path}")
+                return False
+                
+            # 检查目标路径是否存在，不存在则创建
+            if not os.path.exists(extract_to):
+                try:
+                    os.makedirs(extract_to, exist_ok=True)
+                    self.log(f"📁 创建目标目录: {extract_to}")
+                except Exception as e:
+                    self.log(f"❌ 无法创建目标目录: {e}")
+                    return False
+            
+            # 记录解压前的文件列表
+            files_before = set()
+            try:
+                files_before = set(os.listdir(extract_to))
+                self.log(f"📋 解压前目标目录文件数: {len(files_before)}")
+            except Exception as e:
+                self.log(f"⚠️ 无法读取目标目录: {e}")
+            
+            # 按格式选择解压程序
+            if self.selector is None:
+                self.prepare_backends()
+            backend = self.selector.select(archive_path)
+            if backend is None:
+                self.log(f"❌ 没有可以解压该格式的程序: {os.path.basename(archive_path)}")
+                return False
+            self.log(f"🧰 使用解压程序: {backend.name}")
+            
+            # 根据解压后大小和本机历史吞吐量计算超时时间
+            probe = self.probe(archive_path)
+            self._local.archive_info = {'backend': backend.name, 'format': probe['format'],
+                                        'uncompressed': probe['uncompressed_size']}
+            # 能列出全部条目时只按本压缩包的条目统计写出的数据（解压前已存在的条目记录一次大小和修改时间）
+            members = baseline = None
+            if probe.get('members') and not probe.get('members_truncated'):
+                members = member_paths(extract_to, probe['members'])
+                baseline = member_baseline(members)
+            
+            # 解压炸弹防护：按文件头能确定超过限制时不解压
+            budget, reason = self.guard.begin(archive_path, probe)
+            if budget is None:
+                self.metrics.incr('bomb_guard_rejected_total')
+                self.log(f"💣 拒绝解压: {os.path.basename(archive_path)}（{reason}）")
+                return False
+            timeout = self.throughput.timeout_for(backend.name, probe['format'], probe['uncompressed_size'])
+            self.log(f"⏱️ 解压后大小{'' if probe['exact'] else '(估算)'}: {format_size(probe['uncompressed_size'])}，超时: {timeout}秒（输出仍在增长时自动延长）")
+            
+            # 内层压缩包写出后提前解压
+            pipeline = self._plan_pipeline(extract_to, backend, probe, files_before, budget.level)
+            self._local.pipeline = pipeline
+            if pipeline is not None:
+                self.log(f"🚀 流水线解压: {len(pipeline)} 个内层压缩包写出后立即开始解压")
+            
+            # 根据密码选项决定密码尝试策略（常用密码之后依次尝试密码字典，按需流式读取）
+            if self.has_password:
+                # 如果选择了有密码模式，跳过无密码尝试
+                self.log("🔐 密码模式：跳过无密码尝试，直接使用密码列表")
+            # 默认模式：先尝试无密码，再尝试密码列表
+            include_empty = not self.has_password
+            passwords_to_try = self.password_store.candidates(include_empty=include_empty)
+            total_passwords = self.password_store.estimate_total(include_empty=include_empty)
+            
+            attempts_start = time.perf_counter()
+            for i, password in enumerate(passwords_to_try):
+                if self.stop_processing:
+                    return False
+                if i:
+                    self._abort_pipeline()
+                self._local.attempts += 1
+                attempt_start = time.perf_counter()
+                # 前几次尝试逐条记录，之后只定期记录汇总
+                verbose = i < PASSWORD_LOG_DETAIL
+                try:
+                    # 构建命令行参数（由后端决定参数格式）
+                    cmd = backend.build_command(archive_path, extract_to, password)
+                    if verbose:
+                        if password:
+                            self.log(f"🔑 尝试密码 {i+1}/{total_passwords}: ***")
+                        else:
+                            self.log("🔓 尝试无密码解压...")
+                        # 记录实际执行的命令（用于调试，密码以***代替）
+                        cmd_str = ' '.join([f'"{arg}"' if ' ' in arg else arg
+                                            for arg in (a.replace(password, '***') if password else a for a in cmd)])
+                        self.log(f"💻 执行命令: {cmd_str}")
+                    elif i % PASSWORD_LOG_EVERY == 0:
+                        elapsed = time.perf_counter() - attempts_start
+                        self.log(f"🔑 已尝试 {i}/{total_passwords} 个密码（每秒 {i / max(elapsed, 1e-6):.1f} 个）...")
+                        
+                    watchdog = ProgressWatchdog(extract_to, files_before, members, baseline)
+                    on_output = self._progress_listener(backend, watchdog, budget)
+                    with self.metrics.stage(STAGE_BACKEND):
+                        job_id, future = self.runner.submit(
+                            cmd,
+                            timeout=timeout,
+                            on_output=on_output,
+                            deadline_extender=watchdog.extend
+                        )
+                        with self._pipeline_lock:
+                            self._running_targets[job_id] = os.path.abspath(extract_to)
+                        # 解压过程中按输出目录的实际增长检查限制，超限时立即结束解压程序
+                        budget.watch(watchdog.output_stats, lambda: self.runner.cancel(job_id))
+                        try:
+                            result = future.result()
+                        finally:
+                            budget.unwatch()
+                            with self._pipeline_lock:
+                                self._running_targets.pop(job_id, None)
+                    if watchdog.extensions:
+                        self.log(f"⏱️ 解压仍有进展，超时已延长 {watchdog.extensions} 次")
+                    
+                    if budget.reason is not None:
+                        self.metrics.observe_stage(STAGE_PASSWORD_ATTEMPT, time.perf_counter() - attempt_start)
+                        self.metrics.incr('bomb_guard_aborted_total')
+                        self.log(f"💣 已中止解压: {os.path.basename(archive_path)}（{budget.reason}），"
+                                 f"已写出 {format_size(budget.bytes)}、{budget.entries} 个文件")
+                        self._abort_pipeline()
+                        return False
+                    if result.cancelled:
+                        self.metrics.observe_stage(STAGE_PASSWORD_ATTEMPT, time.perf_counter() - attempt_start)
+                        self.log(f"⏹️ 解压已取消: {os.path.basename(archive_path)}")
+                        return False
+                    if result.timed_out:
+                        self.metrics.observe_stage(STAGE_PASSWORD_ATTEMPT, time.perf_counter() - attempt_start)
+                        self.metrics.incr('extraction_timeouts_total')
+                        self.log(f"⏰ 解压超时（{watchdog.stall_window}秒内没有任何进展）: {os.path.basename(archive_path)}")
+                        break
+                    
+                    # 分析解压程序的输出信息
+                    output_text = result.stdout + result.stderr
+                    status = backend.classify_output(result.returncode, output_text)
+                    if status == STATUS_WRONG_PASSWORD and result.returncode != 0:
+                        # 密码错误：解压程序已经结束，不需要等待文件系统，直接尝试下一个密码
+                        self.metrics.observe_stage(STAGE_PASSWORD_ATTEMPT, time.perf_counter() - attempt_start)
+                        if verbose:
+                            self.log(f"❌ 密码错误 (返回码: {result.returncode})")
+                        continue
+                    
+                    # 详细记录命令执行结果
+                    self.log(f"📊 命令返回码: {result.returncode}")
+                    if result.stdout:
+                        stdout_lines = result.stdout.strip().split('\n')
+                        for line in stdout_lines:
+                            # 逐个条目的完成信息不写入日志
+                            if line.strip() and backend.parse_entry_done(line) is None:
+                                self.log(f"📤 标准输出: {line.strip()}")
+                    if result.stderr:
+                        stderr_lines = result.stderr.strip().split('\n')
+                        for line in stderr_lines:
+                            if line.strip():
+                                self.log(f"📥 错误输出: {line.strip()}")
+                    
+                    has_success_indicator = backend.has_indicator(output_text, SUCCESS_INDICATORS)
+                    has_error_indicator = status in (STATUS_WRONG_PASSWORD, STATUS_CORRUPT)
+                    
+                    if has_error_indicator:
+                        self.log(f"🔍 检测到错误指示符，可能是密码错误或文件损坏")
+                    elif has_success_indicator:
+                        self.log(f"🔍 检测到成功指示符，解压可能成功")
+                    
+                    verify_start = time.perf_counter()
+                    # 等待解压操作完全完成
+                    if self._wait(2):  # 等待2秒确保文件系统操作完成
+                        return False
+                    self.log("⏳ 等待解压操作完成...")
+                    
+                    # 检查解压后的文件变化（多次检查确保准确性）
+                    files_after = set()
+                    new_files = set()
+                    
+                    for check_attempt in range(3):  # 最多检查3次
+                        try:
+                            files_after = set(os.listdir(extract_to))
+                            new_files = files_after - files_before
+                            
+                            if new_files:
+                                break  # 发现新文件，退出检查循环
+                            elif check_attempt < 2:  # 如果还有检查机会
+                                if self._wait(1):  # 再等待1秒
+                                    return False
+                                self.log(f"🔄 第{check_attempt + 2}次检查文件变化...")
+                        except Exception as e:
+                            self.log(f"⚠️ 第{check_attempt + 1}次检查失败: {e}")
+                            if check_attempt < 2:
+                                self._wait(1)
+                    self.metrics.observe_stage(STAGE_VERIFY, time.perf_counter() - verify_start)
+                    
+                    try:
+                        self.log(f"📋 解压后目标目录文件数: {len(files_after)}")
+                        if new_files:
+                            self.log(f"📄 新增文件: {', '.join(list(new_files)[:5])}{'...' if len(new_files) > 5 else ''}")
+                        else:
+                            self.log(f"⚠️ 未发现新文件")
+                    except Exception as e:
+                        self.log(f"⚠️ 无法检查解压结果: {e}")
+                    
+                    self.metrics.observe_stage(STAGE_PASSWORD_ATTEMPT, time.perf_counter() - attempt_start)
+                    if result.returncode == 0 and len(files_after) > len(files_before):
+                        self.log(f"✅ 解压成功: {os.path.basename(archive_path)}")
+                        # 解压出的文件和文件夹中的压缩包属于下一层
+                        self.guard.mark_outputs(extract_to, new_files, budget.level)
+                        budget.succeeded = True
+                        self.throughput.record(backend.name, probe['format'], probe['uncompressed_size'], result.duration)
+                        if self._verifier is not None:
+                            self._verifier.submit(archive_path, backend, password, timeout)
+                        return True
+                    else:
+                        if password:
+                            self.log(f"❌ 密码错误或文件损坏 (返回码: {result.returncode})")
+                        else:
+                            self.log(f"❌ 无密码解压失败 (返回码: {result.returncode})")
+                        
+                except Exception as e:
+                    self.log(f"⚠️ 解压过程出错: {e}")
+                    continue
+                    
+            self._abort_pipeline()
+            # 根据用户设置决定是否使用Bandizip内置密码管理器
+            if self.use_bandizip_wait and self.bandizip_path:
+                self.log(f"🔑 尝试使用Bandizip内置密码管理器...")
+                if self.try_bandizip_password_manager(archive_path, extract_to):
+                    budget.succeeded = True
+                    return True
+            else:
+                self.log(f"⏭️ 已跳过Bandizip手动密码输入（用户未启用）")
+                
+            self.log(f"❌ 解压失败: {os.path.basename(archive_path)} (已尝试所有密码和密码管理器)")
+            return False
+            
+        except Exception as e:
+            self.log(f"💥 解压文件时出错: {e}")
+            return False
+        finally:
+            self._local.pipeline = None
+            if budget is not None:
+                self.guard.finish(budget)
+
+    def _abort_pipeline(self):
+        """外层的一次尝试失败后停止流水线（之后的尝试会重新写出条目，不能与内层任务同时读写）"""
+        pipeline = getattr(self._local, 'pipeline', None)
+        if pipeline is None:
+            return
+        self._local.pipeline = None
+        cancelled = pipeline.abort()
+        if cancelled:
+            self.log(f"🚀 外层解压未成功，已取消 {cancelled} 个尚未开始的内层任务（由下一轮处理）")
+            
+    def _progress_listener(self, backend, watchdog, budget=None):
+        """解压程序输出回调：记录进展（用于超时延长）并把解压程序报告的进度交给进度统计和解压限制检查"""
+        key = getattr(self._local, 'progress_key', None)
+        pipeline = getattr(self._local, 'pipeline', None)
+        progress = self.progress
+        entries_done = [0]
+
+        def on_output(stream_name, line):
+            watchdog.on_output(stream_name, line)
+            name = backend.parse_entry_done(line)
+            if name is not None:
+                if pipeline is not None:
+                    pipeline.on_entry_done(name)
+                if budget is not None:
+                    entries_done[0] += 1
+                    budget.update(entries=entries_done[0])
+            if budget is not None:
+                num_bytes = backend.parse_bytes_done(line)
+                if num_bytes is not None:
+                    budget.update(num_bytes=num_bytes)
+            if key is not None:
+                fraction = backend.parse_progress(line)
+                if fraction is not None:
+                    progress.update(key, fraction)
+
+        return on_output
+
+    def try_bandizip_password_manager(self, archive_path, extract_to):
+        """尝试使用Bandizip内置密码管理器解压文件"""
+        with self.metrics.stage(STAGE_GUI_WAIT):
+            return self._try_bandizip_password_manager(archive_path, extract_to)
+            
+    def _try_bandizip_password_manager(self, archive_path, extract_to):
+        """尝试使用Bandizip内置密码管理器解压文件（实际实现）"""
+        try:
+            # 记录解压前的文件列表
+            files_before = set()
+            try:
+                files_before = set(os.listdir(extract_to))
+            except Exception:
+                files_before = set()
+            
+            # 使用Bandizip GUI模式打开文件，让用户手动输入密码
+            # 这会调用Bandizip的密码管理器
+            cmd = [self.bandizip_path, archive_path]
+            self.log(f"💻 启动Bandizip GUI: {' '.join(cmd)}")
+            
+            # 启动Bandizip GUI（非阻塞）
+            process = subprocess.Popen(cmd, shell=False)
+            
+            # 等待用户操作（最多等待60秒）
+            self.log(f"⏳ 等待用户在Bandizip中输入密码并解压（最多60秒）...")
+            
+            # 检查文件变化
+            for i in range(60):  # 检查60次，每次等待1秒
+                if self._wait(1):
+                    process.terminate()
+                    self.log("⏹️ 处理已被用户停止，已关闭Bandizip")
+                    return False
+                try:
+                    files_after = set(os.listdir(extract_to))
+                    new_files = files_after - files_before
+                    
+                    if new_files:
+                        self.log(f"✅ 检测到新文件，解压成功: {', '.join(list(new_files)[:3])}{'...' if len(new_files) > 3 else ''}")
+                        # 尝试终止Bandizip进程
+                        try:
+                            process.terminate()
+                        except Exception:
+                            pass
+                        return True
+                except Exception:
+                    continue
+            
+            # 超时后终止进程
+            try:
+                process.terminate()
+                self.log(f"⏰ 等待超时，已终止Bandizip进程")
+            except Exception:
+                pass
+                
+            return False
+            
+        except Exception as e:
+            self.log(f"⚠️ 使用密码管理器时出错: {e}")
+            return False
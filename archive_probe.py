@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包信息探测
+功能：不解压，只读取文件头获取压缩包的格式、条目列表、解压后大小和是否加密。
+zip和tar可以精确读取；gz读取尾部记录的原始大小；其他格式按压缩率估算。
+探测结果可以保存到压缩包目录缓存（toc_cache），压缩包没有变化时不再重新读取。
+"""
+
+import os
+import struct
+import tarfile
+import zipfile
+
+# 无法读取文件头时假定的压缩率（解压后大小 / 压缩包大小）
+DEFAULT_EXPANSION_RATIO = 1.5
+
+# 探测结果中最多保留的条目数（条目极多的压缩包只保留前面的部分，members_truncated为True）
+MAX_LISTED_MEMBERS = 10000
+
+# 复合扩展名优先匹配
+_FORMATS = [
+    ('.tar.gz', 'tar.gz'), ('.tgz', 'tar.gz'),
+    ('.tar.bz2', 'tar.bz2'), ('.tar.xz', 'tar.xz'),
+    ('.7z', '7z'), ('.zip', 'zip'), ('.rar', 'rar'), ('.tar', 'tar'),
+    ('.gz', 'gz'), ('.bz2', 'bz2'), ('.xz', 'xz'),
+]
+
+
+def detect_format(path):
+    """根据扩展名判断压缩包格式，无法识别时返回None"""
+    lower = path.lower()
+    for ext, fmt in _FORMATS:
+        if lower.endswith(ext):
+            return fmt
+    return None
+
+
+def _set_members(info, members):
+    info['members'] = members[:MAX_LISTED_MEMBERS]
+    info['members_truncated'] = len(members) > MAX_LISTED_MEMBERS
+
+
+def _probe_zip(path, info):
+    with zipfile.ZipFile(path) as zf:
+        entries = zf.infolist()
+    info['entries'] = len(entries)
+    info['uncompressed_size'] = sum(e.file_size for e in entries)
+    info['encrypted'] = any(e.flag_bits & 0x1 for e in entries)
+    info['exact'] = True
+    # 文件条目 [名称, 解压后大小, CRC-32, 是否加密]
+    _set_members(info, [[e.filename, e.file_size, e.CRC, bool(e.flag_bits & 0x1)] for e in entries if not e.is_dir()])
+
+
+def _probe_tar(path, info):
+    with tarfile.open(path, 'r:') as tf:
+        members = tf.getmembers()
+    info['entries'] = len(members)
+    info['uncompressed_size'] = sum(m.size for m in members if m.isfile())
+    info['encrypted'] = False
+    info['exact'] = True
+    # tar没有CRC，只记录名称和大小
+    _set_members(info, [[m.name, m.size, None, False] for m in members if m.isfile()])
+
+
+def _probe_gzip(path, info):
+    # gzip尾部4字节记录原始大小（对2^32取模），多成员或超过4GB时只是估算
+    with open(path, 'rb') as f:
+        f.seek(-4, os.SEEK_END)
+        isize = struct.unpack('<I', f.read(4))[0]
+    info['entries'] = 1
+    info['uncompressed_size'] = max(isize, info['archive_size'])
+
+
+def probe_archive(path, cache=None):
+    """探测压缩包信息，返回字典：
+    format, archive_size, uncompressed_size, entries, encrypted, exact,
+    members（文件条目 [[名称, 大小, CRC, 是否加密], ...]，无法列出时为None）, members_truncated, cached
+
+    cache: 可选的 TocCache，压缩包没有变化时直接返回缓存的结果
+    """
+    if cache is not None:
+        info = cache.get(path)
+        if info is not None:
+            info['cached'] = True
+            return info
+    info = _probe(path)
+    if cache is not None:
+        cache.put(path, info)
+    info['cached'] = False
+    return info
+
+
+def _probe(path):
+    archive_size = os.path.getsize(path)
+    fmt = detect_format(path)
+    info = {
+        'format': fmt or 'unknown',
+        'archive_size': archive_size,
+        'uncompressed_size': int(archive_size * DEFAULT_EXPANSION_RATIO),
+        'entries': None,
+        'encrypted': None,
+        'exact': False,
+        'members': None,
+        'members_truncated': False,
+    }
+    try:
+        if fmt == 'zip':
+            _probe_zip(path, info)
+        elif fmt == 'tar':
+            _probe_tar(path, info)
+        elif fmt in ('gz', 'tar.gz'):
+            _probe_gzip(path, info)
+    except (OSError, zipfile.BadZipFile, tarfile.TarError, struct.error, EOFError):
+        # 文件头损坏或格式与扩展名不符，保留估算值
+        pass
+    return info
+
+
+def format_size(num_bytes):
+    """把字节数格式化为易读的字符串"""
+    size = float(num_bytes)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}TB"
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试语料生成
+功能：按场景生成可重复的合成压缩包目录树（宽目录、深层嵌套、单层套娃、异常后缀、
+不同位置的正确密码、分卷、重复文件），供 benchmark.py 测量端到端处理性能
+"""
+
+import os
+import json
+import time
+import zlib
+import random
+import struct
+import tarfile
+import zipfile
+
+# 所有场景（按生成顺序）
+SCENARIOS = ('wide', 'deep', 'chain', 'malformed', 'password', 'split', 'duplicate')
+
+# 基准测试使用的密码列表（写入测试用的配置文件）
+BENCH_PASSWORDS = ['bench-pw-0', 'bench-pw-1', 'bench-pw-2', 'bench-pw-3', 'bench-pw-4']
+
+# 每个压缩包中文件的默认大小（字节）
+DEFAULT_PAYLOAD_BYTES = 256 * 1024
+
+# 异常后缀（对应用户下载时常见的改名方式）
+MALFORMED_SUFFIXES = ['删', '.bak', '_', '~']
+
+
+def _crc_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xEDB88320 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+class _ZipCryptoEncrypter:
+    """传统PKWARE加密（ZipCrypto），标准库zipfile只能解密不能加密"""
+
+    def __init__(self, password):
+        self.key0, self.key1, self.key2 = 0x12345678, 0x23456789, 0x34567890
+        for byte in password:
+            self._update(byte)
+
+    def _update(self, byte):
+        self.key0 = _CRC_TABLE[(self.key0 ^ byte) & 0xFF] ^ (self.key0 >> 8)
+        self.key1 = (self.key1 + (self.key0 & 0xFF)) & 0xFFFFFFFF
+        self.key1 = (self.key1 * 134775813 + 1) & 0xFFFFFFFF
+        self.key2 = _CRC_TABLE[(self.key2 ^ (self.key1 >> 24)) & 0xFF] ^ (self.key2 >> 8)
+
+    def encrypt(self, data):
+        out = bytearray(len(data))
+        for i, byte in enumerate(data):
+            temp = (self.key2 | 2) & 0xFFFF
+            out[i] = byte ^ (((temp * (temp ^ 1)) >> 8) & 0xFF)
+            self._update(byte)
+        return bytes(out)
+
+
+def write_encrypted_zip(path, members, password, rng=None):
+    """写入ZipCrypto加密的zip文件（deflate压缩）
+
+    members: [(压缩包内路径, 数据bytes), ...]
+    """
+    rng = rng or random.Random(0)
+    password = password.encode('utf-8')
+    dos_time, dos_date = 0, (2020 - 1980) << 9 | 1 << 5 | 1
+    central = []
+    with open(path, 'wb') as f:
+        for name, data in members:
+            encoded_name = name.encode('utf-8')
+            crc = zlib.crc32(data) & 0xFFFFFFFF
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+            compressed = compressor.compress(data) + compressor.flush()
+            # 12字节加密头：11字节随机数 + CRC最高字节（解压程序用来快速判断密码是否正确）
+            header = bytes(rng.randrange(256) for _ in range(11)) + bytes([crc >> 24])
+            encrypted = _ZipCryptoEncrypter(password).encrypt(header + compressed)
+            flags = 0x1 | 0x800
+            offset = f.tell()
+            f.write(struct.pack('<IHHHHHIIIHH', 0x04034B50, 20, flags, 8, dos_time, dos_date,
+                                crc, len(encrypted), len(data), len(encoded_name), 0))
+            f.write(encoded_name)
+            f.write(encrypted)
+            central.append((encoded_name, flags, crc, len(encrypted), len(data), offset))
+        cd_offset = f.tell()
+        for encoded_name, flags, crc, csize, usize, offset in central:
+            f.write(struct.pack('<IHHHHHHIIIHHHHHII', 0x02014B50, 20, 20, flags, 8, dos_time, dos_date,
+                                crc, csize, usize, len(encoded_name), 0, 0, 0, 0, 0, offset))
+            f.write(encoded_name)
+        cd_size = f.tell() - cd_offset
+        f.write(struct.pack('<IHHHHIIH', 0x06054B50, 0, 0, len(central), len(central), cd_size, cd_offset, 0))
+
+
+def make_payload(rng, size):
+    """一半随机数据、一半可压缩文本，接近真实下载内容的压缩率"""
+    half = size // 2
+    text = b''.join(b'line %d of benchmark payload\n' % rng.randrange(1000) for _ in range(half // 24 + 1))
+    return rng.randbytes(size - half) + text[:half]
+
+
+def _write_zip(path, members):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members:
+            zf.writestr(name, data)
+
+
+def _write_tar(path, members, mode='w:gz'):
+    with tarfile.open(path, mode) as tf:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 0
+            tf.addfile(info, _BytesReader(data))
+
+
+class _BytesReader:
+    """给tarfile.addfile用的最小文件对象"""
+
+    def __init__(self, data):
+        self.data = data
+        self.pos = 0
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = len(self.data) - self.pos
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += len(chunk)
+        return chunk
+
+
+class CorpusGenerator:
+    """按场景生成语料，每个场景一个独立的顶层文件夹"""
+
+    def __init__(self, root, scale=1, payload_bytes=DEFAULT_PAYLOAD_BYTES, seed=0):
+        self.root = root
+        self.scale = max(1, int(scale))
+        self.payload_bytes = payload_bytes
+        self.rng = random.Random(seed)
+
+    def _members(self, count=2, size=None):
+        size = size or self.payload_bytes
+        return [(f'file_{i}.bin', make_payload(self.rng, size)) for i in range(count)]
+
+    def _record(self, folder, archives):
+        archive_bytes = sum(os.path.getsize(p) for p in archives)
+        return {'folder': folder, 'archives': len(archives), 'archive_bytes': archive_bytes}
+
+    def wide(self, folder):
+        """宽目录：很多子文件夹，每个只有一个压缩包"""
+        archives = []
+        for i in range(8 * self.scale):
+            sub = os.path.join(folder, f'item_{i:04d}')
+            os.makedirs(sub)
+            path = os.path.join(sub, f'item_{i:04d}.zip')
+            _write_zip(path, self._members())
+            archives.append(path)
+        return archives
+
+    def deep(self, folder):
+        """深层嵌套：中间层没有压缩包，只有最底层有"""
+        archives = []
+        for branch in range(2):
+            path = os.path.join(folder, f'branch_{branch}')
+            for level in range(6 * self.scale):
+                path = os.path.join(path, f'level_{level}')
+            os.makedirs(path)
+            archive = os.path.join(path, 'bottom.tar.gz')
+            _write_tar(archive, self._members())
+            archives.append(archive)
+        return archives
+
+    def chain(self, folder):
+        """单层套娃：每层压缩包里只有一个子文件夹，子文件夹里是下一层压缩包"""
+        depth = 3 + self.scale
+        data = make_payload(self.rng, self.payload_bytes)
+        members = [('innermost.bin', data)]
+        for level in range(depth - 1, 0, -1):
+            inner_path = os.path.join(folder, f'.layer_{level}.zip')
+            _write_zip(inner_path, members)
+            with open(inner_path, 'rb') as f:
+                members = [(f'layer_{level}/layer_{level}.zip', f.read())]
+            os.remove(inner_path)
+        outer = os.path.join(folder, 'layer_0.zip')
+        _write_zip(outer, members)
+        return [outer]
+
+    def malformed(self, folder):
+        """异常后缀：需要先修正文件名再解压"""
+        archives = []
+        for i in range(4 * self.scale):
+            sub = os.path.join(folder, f'renamed_{i:04d}')
+            os.makedirs(sub)
+            suffix = MALFORMED_SUFFIXES[i % len(MALFORMED_SUFFIXES)]
+            path = os.path.join(sub, f'renamed_{i:04d}.zip{suffix}')
+            _write_zip(path, self._members())
+            archives.append(path)
+        return archives
+
+    def password(self, folder):
+        """加密压缩包：正确密码分别位于密码列表的开头、中间和末尾"""
+        archives = []
+        positions = [0, len(BENCH_PASSWORDS) // 2, len(BENCH_PASSWORDS) - 1]
+        for i in range(len(positions) * self.scale):
+            position = positions[i % len(positions)]
+            sub = os.path.join(folder, f'locked_{i:04d}_pw{position}')
+            os.makedirs(sub)
+            path = os.path.join(sub, f'locked_{i:04d}.zip')
+            # ZipCrypto是纯Python实现，加密数据不宜太大
+            write_encrypted_zip(path, self._members(size=min(self.payload_bytes, 64 * 1024)),
+                                BENCH_PASSWORDS[position], self.rng)
+            archives.append(path)
+        return archives
+
+    def split(self, folder):
+        """分卷：按7-Zip的方式把zip切成 .zip.001、.zip.002 ..."""
+        archives = []
+        for i in range(self.scale):
+            sub = os.path.join(folder, f'volumes_{i:04d}')
+            os.makedirs(sub)
+            whole = os.path.join(sub, f'volumes_{i:04d}.zip')
+            _write_zip(whole, self._members(count=3))
+            with open(whole, 'rb') as f:
+                data = f.read()
+            os.remove(whole)
+            part_size = len(data) // 3 + 1
+            for part in range(3):
+                path = f'{whole}.{part + 1:03d}'
+                with open(path, 'wb') as f:
+                    f.write(data[part * part_size:(part + 1) * part_size])
+                archives.append(path)
+        return archives
+
+    def duplicate(self, folder):
+        """重复文件：同一个压缩包出现在多个文件夹，以及同一文件夹中的副本"""
+        archives = []
+        members = self._members()
+        for i in range(3 * self.scale):
+            sub = os.path.join(folder, f'copy_{i:04d}')
+            os.makedirs(sub)
+            names = ['shared.zip', 'shared (1).zip'] if i % 3 == 0 else ['shared.zip']
+            for name in names:
+                path = os.path.join(sub, name)
+                _write_zip(path, members)
+                archives.append(path)
+        return archives
+
+    def generate(self, scenarios=SCENARIOS):
+        """生成语料，返回清单 {场景: {folder, archives, archive_bytes}}"""
+        manifest = {}
+        for name in scenarios:
+            if name not in SCENARIOS:
+                raise ValueError(f"未知场景: {name}")
+            folder = os.path.join(self.root, name)
+            os.makedirs(folder, exist_ok=True)
+            start = time.perf_counter()
+            archives = getattr(self, name)(folder)
+            entry = self._record(folder, archives)
+            entry['generate_seconds'] = round(time.perf_counter() - start, 3)
+            manifest[name] = entry
+        return manifest
+
+
+def write_bench_config(path):
+    """写入基准测试用的配置文件（包含测试密码列表）"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'passwords': BENCH_PASSWORDS}, f, ensure_ascii=False, indent=2)
+    return path
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端基准测试
+功能：用 bench_corpus 生成的合成语料运行处理引擎，测量每个场景的端到端吞吐量、
+各阶段耗时和内存峰值，结果追加到 benchmark_results.jsonl，并与上一次同场景的结果对比
+
+用法：
+    python benchmark.py                       # 运行所有场景
+    python benchmark.py wide password --repeat 3
+    python benchmark.py --scale 4 --label v1.2
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import platform
+import argparse
+import tempfile
+import threading
+import subprocess
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+from archive_engine import ArchiveEngine, APP_DIR
+from extract_backends import BACKEND_CLASSES
+from bench_corpus import SCENARIOS, DEFAULT_PAYLOAD_BYTES, CorpusGenerator, write_bench_config
+
+# 结果文件名
+RESULTS_FILE = 'benchmark_results.jsonl'
+
+# 与上次结果相比变化超过该比例时标记为退化
+REGRESSION_THRESHOLD = 0.10
+
+# 阶段耗时的变化小于该值（秒）时不判定退化，避免微秒级阶段的计时噪声
+MIN_STAGE_DELTA = 0.001
+
+# 内存采样间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.05
+
+
+def _current_rss():
+    """当前进程的常驻内存（字节），无法读取时返回None"""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss(who):
+    """resource记录的历史内存峰值（字节），Linux单位是KB，macOS是字节"""
+    if resource is None:
+        return None
+    value = resource.getrusage(who).ru_maxrss
+    return value if sys.platform == 'darwin' else value * 1024
+
+
+class PeakRssSampler:
+    """在后台线程中定期采样内存，记录运行期间的峰值"""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            rss = _current_rss()
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def code_version():
+    """当前代码版本（git describe），不是git仓库时返回None"""
+    try:
+        result = subprocess.run(
+            ['git', 'describe', '--always', '--dirty'],
+            cwd=APP_DIR, capture_output=True, text=True, timeout=10
+        )
+        return result.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def run_scenario(name, args, work_dir, log):
+    """生成一个场景的语料并处理一次，返回结果记录"""
+    corpus_dir = os.path.join(work_dir, 'corpus')
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    generator = CorpusGenerator(corpus_dir, scale=args.scale, payload_bytes=args.payload_kb * 1024, seed=args.seed)
+    entry = generator.generate([name])[name]
+    config_file = write_bench_config(os.path.join(work_dir, 'bench_config.json'))
+
+    engine = ArchiveEngine(
+        config_file=config_file,
+        log_callback=log,
+        output_dir=args.output_dir,
+        forced_backend=args.backend
+    )
+    # 预先选择解压程序（首次测速不计入处理时间）
+    engine.prepare_backends()
+    for fmt in ('zip', 'tar.gz'):
+        engine.selector.select('sample.' + fmt)
+
+    with PeakRssSampler() as sampler:
+        start = time.perf_counter()
+        result = engine.process_folder(entry['folder'])
+        wall = time.perf_counter() - start
+    engine.runner.close()
+
+    summary = engine.metrics.summary()
+    counters = summary['counters']
+    return {
+        'scenario': name,
+        'wall_seconds': round(wall, 4),
+        'archives': entry['archives'],
+        'archive_bytes': entry['archive_bytes'],
+        'archives_per_second': round(entry['archives'] / wall, 4) if wall > 0 else 0.0,
+        'bytes_per_second': round(entry['archive_bytes'] / wall, 1) if wall > 0 else 0.0,
+        'succeeded': result['succeeded'],
+        'failed': result['failed'],
+        'password_attempts': counters.get('password_attempts_total', 0),
+        'stages': {stage: {k: stats[k] for k in ('count', 'sum', 'p50', 'p95', 'max')}
+                   for stage, stats in summary['stages'].items()},
+        'peak_rss_bytes': sampler.peak,
+        'max_rss_bytes': _max_rss(resource.RUSAGE_SELF) if resource else None,
+        'children_max_rss_bytes': _max_rss(resource.RUSAGE_CHILDREN) if resource else None,
+        'backends': sorted(engine.backends),
+        'error': result['error'],
+    }
+
+
+def load_results(path):
+    """读取历史结果"""
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def find_baseline(records, record):
+    """找到同一主机、同一场景和规模的上一次结果"""
+    for previous in reversed(records):
+        if (previous.get('host') == record['host'] and previous.get('scenario') == record['scenario']
+                and previous.get('scale') == record['scale'] and previous.get('payload_kb') == record['payload_kb']):
+            return previous
+    return None
+
+
+def compare(previous, record, threshold=REGRESSION_THRESHOLD):
+    """与上次结果对比，返回 [(指标, 上次, 本次, 变化比例, 是否退化)]"""
+    rows = []
+    # (指标, 数值越大越好)
+    for key, higher_is_better in (('wall_seconds', False), ('bytes_per_second', True), ('peak_rss_bytes', False)):
+        old, new = previous.get(key), record.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -threshold if higher_is_better else change > threshold
+        rows.append((key, old, new, change, regressed))
+    for stage, stats in sorted(record['stages'].items()):
+        old_stats = previous.get('stages', {}).get(stage)
+        if not old_stats or not old_stats.get('p95'):
+            continue
+        delta = stats['p95'] - old_stats['p95']
+        change = delta / old_stats['p95']
+        rows.append((f'{stage}.p95', old_stats['p95'], stats['p95'], change,
+                     change > threshold and delta > MIN_STAGE_DELTA))
+    return rows
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='benchmark', description='压缩包处理端到端基准测试')
+    parser.add_argument('scenarios', nargs='*',
+                        help=f'要运行的场景（默认全部）: {", ".join(SCENARIOS)}')
+    parser.add_argument('--scale', type=int, default=1, help='语料规模倍数（默认: 1）')
+    parser.add_argument('--payload-kb', type=int, default=DEFAULT_PAYLOAD_BYTES // 1024,
+                        help='压缩包中每个文件的大小KB（默认: 256）')
+    parser.add_argument('--repeat', type=int, default=1, help='每个场景重复次数（默认: 1）')
+    parser.add_argument('--seed', type=int, default=0, help='语料随机种子（默认: 0）')
+    parser.add_argument('--backend', choices=sorted(BACKEND_CLASSES), help='强制使用指定的解压程序（默认自动选择）')
+    parser.add_argument('--label', help='写入结果的版本标签（默认: git describe）')
+    parser.add_argument('--output-dir', default=os.path.join(APP_DIR, 'benchmarks'),
+                        help='结果和引擎输出文件目录（默认: 程序目录下的benchmarks）')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='判定退化的变化比例（默认: 0.10）')
+    parser.add_argument('--verbose', action='store_true', help='输出处理引擎的日志')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    scenarios = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"未知场景: {', '.join(unknown)}")
+    os.makedirs(args.output_dir, exist_ok=True)
+    results_path = os.path.join(args.output_dir, RESULTS_FILE)
+    history = load_results(results_path)
+    log = print if args.verbose else (lambda message: None)
+
+    common = {
+        'version': args.label or code_version(),
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'platform': sys.platform,
+        'scale': args.scale,
+        'payload_kb': args.payload_kb,
+        'seed': args.seed,
+    }
+    regressions = 0
+    for name in scenarios:
+        for run in range(args.repeat):
+            with tempfile.TemporaryDirectory(prefix='butter_bench_') as work_dir:
+                record = dict(common, timestamp=time.time(), run=run)
+                record.update(run_scenario(name, args, work_dir, log))
+            baseline = find_baseline(history, record)
+            history.append(record)
+            with open(results_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+            rss = record['peak_rss_bytes'] or record['max_rss_bytes']
+            print(f"📊 {name}#{run}: {record['wall_seconds']:.2f}s, "
+                  f"{record['archives']}个压缩包, {record['bytes_per_second'] / 1024 / 1024:.2f} MB/s, "
+                  f"成功 {record['succeeded']} / 失败 {record['failed']}, 密码尝试 {record['password_attempts']}次, "
+                  f"内存峰值 {rss / 1024 / 1024 if rss else 0:.1f} MB")
+            for stage, stats in sorted(record['stages'].items()):
+                print(f"    阶段 {stage}: {stats['count']}次, p50={stats['p50']:.3f}s, p95={stats['p95']:.3f}s")
+            if baseline:
+                for key, old, new, change, regressed in compare(baseline, record, args.threshold):
+                    if regressed:
+                        regressions += 1
+                    marker = '⚠️ 退化' if regressed else '  '
+                    print(f"    {marker} {key}: {old} -> {new} ({change:+.1%}，对比 {baseline.get('version')})")
+
+    print(f"结果已追加到 {results_path}")
+    if regressions:
+        print(f"⚠️ 共 {regressions} 项指标相比上次退化超过 {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压炸弹防护
+功能：限制每个压缩包和每次运行的解压后总大小、文件数、压缩率以及压缩包的嵌套层数。
+解压前按文件头（zip/tar的条目列表、gz尾部记录的大小）检查，能确定超限时直接拒绝；
+解压过程中按解压程序报告的进度和输出目录的实际增长持续检查，超限时立即结束解压程序
+"""
+
+import os
+import threading
+from archive_probe import format_size
+
+# 默认限制（配置文件中bomb_guard可以逐项修改，设为0或null表示不限制）
+DEFAULT_LIMITS = {
+    'job_bytes': 50 * 1024 ** 3,      # 单个压缩包解压后的总大小
+    'job_entries': 200000,            # 单个压缩包的文件数
+    'max_ratio': 200,                 # 解压后大小 / 压缩包大小
+    'run_bytes': 500 * 1024 ** 3,     # 一次运行解压出的总大小
+    'run_entries': 2000000,           # 一次运行解压出的文件数
+    'max_depth': 10,                  # 压缩包嵌套层数（压缩包中的压缩包为第2层）
+}
+
+# 解压后小于该大小时不检查压缩率（小文件的压缩率没有意义，例如全是空格的文本）
+RATIO_MIN_BYTES = 64 * 1024 * 1024
+
+# 解压过程中检查输出目录的间隔（秒）
+POLL_INTERVAL = 0.5
+
+
+class GuardLimits:
+    """解压限制（0或None表示不限制）"""
+
+    def __init__(self, settings=None):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', True)
+        for key, default in DEFAULT_LIMITS.items():
+            value = settings.get(key, default)
+            if value is not None and (not isinstance(value, (int, float)) or value < 0):
+                raise ValueError(f"无效的限制 {key}: {value}")
+            setattr(self, key, value or None)
+        # 配置文件中大小可以按GB填写
+        for key, gb_key in (('job_bytes', 'job_gb'), ('run_bytes', 'run_gb')):
+            if gb_key in settings:
+                setattr(self, key, int(settings[gb_key] * 1024 ** 3) or None)
+
+
+class JobBudget:
+    """一个压缩包的解压预算：记录已解压的字节数和文件数，超过单个压缩包或本次运行的限制时触发中止"""
+
+    def __init__(self, guard, archive_path, archive_size, level):
+        self.guard = guard
+        self.archive_path = archive_path
+        self.archive_size = archive_size
+        self.level = level
+        self.bytes = 0
+        self.entries = 0
+        self.reason = None
+        self.succeeded = False
+        self.expected = None  # 文件头记录的 (解压后大小, 文件数)，成功时作为下限计入本次运行
+        self._cancel = None
+        self._measure = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def update(self, num_bytes=None, entries=None):
+        """更新已解压的字节数或文件数（只增不减），超限时中止并返回原因"""
+        with self._lock:
+            if num_bytes is not None and num_bytes > self.bytes:
+                self.bytes = num_bytes
+            if entries is not None and entries > self.entries:
+                self.entries = entries
+            if self.reason is not None:
+                return self.reason
+            reason = self.guard.exceeded(self)
+            if reason is None:
+                return None
+            self.reason = reason
+            cancel = self._cancel
+        if cancel is not None:
+            cancel()
+        return reason
+
+    def watch(self, measure, cancel):
+        """开始一次解压尝试：measure() 返回输出目录中新产生的 (字节数, 文件数)，超限时调用cancel()"""
+        with self._lock:
+            self._cancel = cancel
+            self._measure = measure
+            tripped = self.reason is not None
+        if tripped:
+            cancel()
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, args=(measure,), name='bomb-guard', daemon=True)
+        self._thread.start()
+
+    def _poll(self, measure):
+        while not self._stop.wait(POLL_INTERVAL):
+            num_bytes, entries = measure()
+            if self.update(num_bytes, entries) is not None:
+                return
+
+    def unwatch(self):
+        """一次解压尝试结束：最后统计一次输出目录（在第一次采样前就结束的解压也要计入），超限时设置reason"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._cancel = None
+            measure, self._measure = self._measure, None
+        if measure is not None:
+            self.update(*measure())
+
+
+class BombGuard:
+    """一次运行的解压炸弹防护（线程安全，多个解压任务共用）"""
+
+    def __init__(self, limits=None):
+        self.limits = limits or GuardLimits()
+        self.run_bytes = 0
+        self.run_entries = 0
+        self.rejected = 0
+        self.aborted = 0
+        self._active = set()
+        self._levels = {}  # 解压产生的文件或文件夹 -> 所在的嵌套层数
+        self._lock = threading.Lock()
+
+    # 嵌套层数
+
+    def level_of(self, path):
+        """压缩包的嵌套层数：处理目录中原有的压缩包为1，由第n层压缩包解压出来的为n+1"""
+        path = os.path.abspath(path)
+        with self._lock:
+            while True:
+                level = self._levels.get(path)
+                if level is not None:
+                    return level
+                parent = os.path.dirname(path)
+                if parent == path:
+                    return 1
+                path = parent
+
+    def mark_outputs(self, extract_to, names, level):
+        """记录第level层压缩包解压出的文件和文件夹（其中的压缩包为第level+1层）"""
+        with self._lock:
+            for name in names:
+                self._levels[os.path.abspath(os.path.join(extract_to, name))] = level + 1
+
+    def mark_path(self, path, level):
+        with self._lock:
+            self._levels[os.path.abspath(path)] = level
+
+    def moved(self, old_path, new_path):
+        """压缩包改名后保留其嵌套层数"""
+        with self._lock:
+            level = self._levels.pop(os.path.abspath(old_path), None)
+            if level is not None:
+                self._levels[os.path.abspath(new_path)] = level
+
+    # 检查
+
+    def begin(self, archive_path, probe):
+        """解压前按文件头检查，返回 (JobBudget, 拒绝原因)；拒绝时预算为None"""
+        level = self.level_of(archive_path)
+        budget = JobBudget(self, archive_path, probe['archive_size'], level)
+        if probe['exact']:
+            budget.expected = (probe['uncompressed_size'], probe['entries'] or 0)
+        if not self.limits.enabled:
+            return budget, None
+        limits = self.limits
+        reason = None
+        if limits.max_depth and level > limits.max_depth:
+            reason = f"嵌套层数 {level} 超过上限 {limits.max_depth}"
+        elif probe['exact']:
+            size, entries = probe['uncompressed_size'], probe['entries'] or 0
+            reason = self._check(size, entries, probe['archive_size'], source='文件头记录的')
+            with self._lock:
+                if reason is None and limits.run_bytes and self._run_bytes() + size > limits.run_bytes:
+                    reason = f"本次运行解压后总大小将超过上限 {format_size(limits.run_bytes)}"
+                elif reason is None and limits.run_entries and self._run_entries() + entries > limits.run_entries:
+                    reason = f"本次运行解压出的文件数将超过上限 {limits.run_entries}"
+        if reason is None:
+            with self._lock:
+                if limits.run_bytes and self._run_bytes() >= limits.run_bytes:
+                    reason = f"本次运行解压后总大小已达到上限 {format_size(limits.run_bytes)}"
+                elif limits.run_entries and self._run_entries() >= limits.run_entries:
+                    reason = f"本次运行解压出的文件数已达到上限 {limits.run_entries}"
+        if reason is not None:
+            with self._lock:
+                self.rejected += 1
+            return None, reason
+        with self._lock:
+            self._active.add(budget)
+        return budget, None
+
+    def _check(self, size, entries, archive_size, source=''):
+        """单个压缩包的大小、文件数和压缩率检查"""
+        limits = self.limits
+        if limits.job_bytes and size > limits.job_bytes:
+            return f"{source}解压后大小 {format_size(size)} 超过上限 {format_size(limits.job_bytes)}"
+        if limits.job_entries and entries > limits.job_entries:
+            return f"{source}文件数 {entries} 超过上限 {limits.job_entries}"
+        if limits.max_ratio and size >= RATIO_MIN_BYTES and archive_size and size / archive_size > limits.max_ratio:
+            return f"{source}压缩率 {size / archive_size:.0f} 倍超过上限 {limits.max_ratio} 倍"
+        return None
+
+    def _run_bytes(self):
+        return self.run_bytes + sum(budget.bytes for budget in self._active)
+
+    def _run_entries(self):
+        return self.run_entries + sum(budget.entries for budget in self._active)
+
+    def exceeded(self, budget):
+        """解压过程中的检查（由JobBudget.update调用），返回超限原因或None"""
+        if not self.limits.enabled:
+            return None
+        reason = self._check(budget.bytes, budget.entries, budget.archive_size, source='实际')
+        if reason is not None:
+            return reason
+        limits = self.limits
+        with self._lock:
+            if limits.run_bytes and self._run_bytes() > limits.run_bytes:
+                return f"本次运行解压后总大小超过上限 {format_size(limits.run_bytes)}"
+            if limits.run_entries and self._run_entries() > limits.run_entries:
+                return f"本次运行解压出的文件数超过上限 {limits.run_entries}"
+        return None
+
+    def finish(self, budget):
+        """压缩包处理结束（无论成功与否，已写出的数据都计入本次运行；成功时至少按文件头记录的大小计入）"""
+        budget.unwatch()
+        if budget.succeeded and budget.expected is not None:
+            budget.bytes = max(budget.bytes, budget.expected[0])
+            budget.entries = max(budget.entries, budget.expected[1])
+        with self._lock:
+            self._active.discard(budget)
+            self.run_bytes += budget.bytes
+            self.run_entries += budget.entries
+            if budget.reason is not None:
+                self.aborted += 1
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压程序后端
+功能：统一封装Bandizip、7-Zip、unrar、bsdtar和内置解压程序的命令行参数、输出解析和进度解析，
+并按格式在本机测速，自动为每种格式选择最快的后端（选择结果缓存到文件）
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import socket
+import tarfile
+import zipfile
+import tempfile
+import threading
+import subprocess
+
+from archive_probe import detect_format
+
+# 所有格式
+ALL_FORMATS = ('7z', 'zip', 'rar', 'tar', 'gz', 'bz2', 'xz', 'tar.gz', 'tar.bz2', 'tar.xz')
+
+# 解压结果状态
+STATUS_OK = 'ok'
+STATUS_WRONG_PASSWORD = 'wrong_password'
+STATUS_CORRUPT = 'corrupt'
+STATUS_ERROR = 'error'
+
+# 输出中的成功和错误关键字（Bandizip、7-Zip和内置解压程序输出格式相同）
+SUCCESS_INDICATORS = ['Everything is Ok', 'Files: ', 'Folders: ']
+ERROR_INDICATORS = ['Wrong password', 'Data Error', 'CRC Failed', 'Cannot open']
+
+# 打包成exe后sys.executable是程序本身，以这些参数启动时运行对应的解压脚本（见 run_frozen_extractor）
+FROZEN_NATIVE_FLAG = '--native-extractor'
+FROZEN_SIMULATOR_FLAG = '--simulator-extractor'
+
+# 测速用样本的大小（字节）
+BENCHMARK_SIZE = 8 * 1024 * 1024
+
+
+# 进度百分比（段首的百分比优先）
+_LEADING_PERCENT = re.compile(r'[\s\b]*(\d{1,3})%')
+_PERCENT = re.compile(r'(\d{1,3})%')
+
+
+class ExtractorBackend:
+    """解压程序后端基类：子类提供命令行参数和支持的格式"""
+
+    name = ''
+    formats = ()
+    # 默认优先级（没有测速数据时，数字小的优先）
+    preference = 100
+    # 为True时只有手动指定（--backend或--backend-path）才会启用
+    opt_in = False
+    # 是否逐个报告已完整写出的条目（parse_entry_done可用，嵌套压缩包可以流水线解压）
+    reports_entries = False
+
+    def __init__(self, executable):
+        self.executable = executable
+
+    def supports(self, fmt):
+        return fmt in self.formats
+
+    def build_command(self, archive_path, extract_to, password=''):
+        """构建解压命令"""
+        raise NotImplementedError
+
+    def build_test_command(self, archive_path, password=''):
+        """构建测试（校验CRC但不写出文件）命令，不支持测试模式时返回None"""
+        return None
+
+    def parse_progress(self, line):
+        """从一段输出中解析进度，返回0~1之间的小数，无法解析时返回None
+
+        7-Zip和Bandizip用退格或回车覆盖同一行显示进度（输出按换行、回车和退格分段回调），
+        7-Zip每段以百分比开头，后面的文件名中也可能有百分号；其他格式取最后一个百分比
+        """
+        match = _LEADING_PERCENT.match(line)
+        if match is None:
+            matches = _PERCENT.findall(line)
+            if not matches:
+                return None
+            value = matches[-1]
+        else:
+            value = match.group(1)
+        return min(int(value), 100) / 100.0
+
+    def parse_entry_done(self, line):
+        """从一行输出中解析已完整写出的条目名称，不是条目完成信息时返回None"""
+        return None
+
+    def parse_bytes_done(self, line):
+        """从一行输出中解析已解压的字节数，无法解析时返回None"""
+        return None
+
+    def classify_output(self, returncode, output_text):
+        """根据返回码和输出判断结果状态"""
+        lower = output_text.lower()
+        if 'wrong password' in lower or 'incorrect password' in lower:
+            return STATUS_WRONG_PASSWORD
+        if 'crc failed' in lower or 'data error' in lower or 'checksum' in lower:
+            return STATUS_CORRUPT
+        if returncode == 0:
+            return STATUS_OK
+        return STATUS_ERROR
+
+    def has_indicator(self, output_text, indicators):
+        lower = output_text.lower()
+        return any(indicator.lower() in lower for indicator in indicators)
+
+    def __repr__(self):
+        return f"<{self.name}: {self.executable}>"
+
+
+class BandizipBackend(ExtractorBackend):
+    name = 'bandizip'
+    formats = ALL_FORMATS
+    preference = 10
+
+    def build_command(self, archive_path, extract_to, password=''):
+        # 参考批处理文件格式: Bandizip.exe x -p:password -o:path "archive"
+        if password:
+            return [self.executable, 'x', f'-p:{password}', f'-o:{extract_to}', '-y', '-aoa', archive_path]
+        return [self.executable, 'x', f'-o:{extract_to}', '-y', '-aoa', archive_path]
+
+    def build_test_command(self, archive_path, password=''):
+        if password:
+            return [self.executable, 't', f'-p:{password}', archive_path]
+        return [self.executable, 't', archive_path]
+
+    @staticmethod
+    def locate():
+        possible_paths = [
+            r"C:\Program Files\WindowsApps\Bandisoft.com.15700C60EE320_7.40.22.0_x64__dytvnjx3s1h08\bin\Bandizip.exe",
+            r"C:\Program Files\Bandizip\Bandizip.exe",
+            r"C:\Program Files (x86)\Bandizip\Bandizip.exe",
+            r"C:\Users\{}\AppData\Local\Bandizip\Bandizip.exe".format(os.getenv('USERNAME'))
+        ]
+        for path in possible_paths:
+            if os.path.exists(path):
+                return path
+        return None
+
+
+class SevenZipBackend(ExtractorBackend):
+    name = '7z'
+    formats = ALL_FORMATS
+    preference = 20
+
+    def build_command(self, archive_path, extract_to, password=''):
+        # -p- 表示不使用密码（避免7z在遇到加密文件时等待输入）
+        password_arg = f'-p{password}' if password else '-p-'
+        return [self.executable, 'x', password_arg, f'-o{extract_to}', '-y', '-aoa', '-bsp1', '-bb0', archive_path]
+
+    def build_test_command(self, archive_path, password=''):
+        password_arg = f'-p{password}' if password else '-p-'
+        return [self.executable, 't', password_arg, '-bsp1', '-bb0', archive_path]
+
+    @staticmethod
+    def locate():
+        for name in ('7zz', '7z', '7za'):
+            path = shutil.which(name)
+            if path:
+                return path
+        for path in (r"C:\Program Files\7-Zip\7z.exe", r"C:\Program Files (x86)\7-Zip\7z.exe"):
+            if os.path.exists(path):
+                return path
+        return None
+
+
+class UnrarBackend(ExtractorBackend):
+    name = 'unrar'
+    formats = ('rar',)
+    preference = 30
+
+    def build_command(self, archive_path, extract_to, password=''):
+        password_arg = f'-p{password}' if password else '-p-'
+        return [self.executable, 'x', password_arg, '-o+', '-y', '-idc', archive_path, extract_to.rstrip('/\\') + os.sep]
+
+    def build_test_command(self, archive_path, password=''):
+        password_arg = f'-p{password}' if password else '-p-'
+        return [self.executable, 't', password_arg, '-idc', archive_path]
+
+    def classify_output(self, returncode, output_text):
+        lower = output_text.lower()
+        # unrar: 返回码11表示密码错误
+        if returncode == 11 or 'incorrect password' in lower or 'wrong password' in lower:
+            return STATUS_WRONG_PASSWORD
+        if returncode == 3 or 'checksum error' in lower or 'crc failed' in lower:
+            return STATUS_CORRUPT
+        return STATUS_OK if returncode == 0 else STATUS_ERROR
+
+    @staticmethod
+    def locate():
+        return shutil.which('unrar')
+
+
+class BsdtarBackend(ExtractorBackend):
+    name = 'bsdtar'
+    formats = ('zip', '7z', 'rar', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz')
+    preference = 40
+
+    def build_command(self, archive_path, extract_to, password=''):
+        cmd = [self.executable, '-x', '-f', archive_path, '-C', extract_to]
+        if password:
+            cmd[1:1] = ['--passphrase', password]
+        return cmd
+
+    def parse_progress(self, line):
+        # bsdtar不输出进度
+        return None
+
+    def classify_output(self, returncode, output_text):
+        lower = output_text.lower()
+        if 'passphrase' in lower or 'password' in lower:
+            return STATUS_WRONG_PASSWORD
+        if 'crc' in lower or 'damaged' in lower or 'truncated' in lower:
+            return STATUS_CORRUPT
+        return STATUS_OK if returncode == 0 else STATUS_ERROR
+
+    @staticmethod
+    def locate():
+        return shutil.which('bsdtar')
+
+
+class NativeBackend(ExtractorBackend):
+    """内置解压程序（native_extractor.py，独立子进程运行，可以被取消）"""
+
+    name = 'native'
+    formats = ('zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz')
+    preference = 90
+    reports_entries = True
+
+    frozen_flag = FROZEN_NATIVE_FLAG
+
+    def build_command(self, archive_path, extract_to, password=''):
+        cmd = script_command(self.executable, self.frozen_flag) + ['x']
+        if password:
+            cmd.append(f'-p:{password}')
+        return cmd + [f'-o:{extract_to}', '-y', '-aoa', archive_path]
+
+    def parse_progress(self, line):
+        if line.startswith('PROGRESS '):
+            try:
+                done, total = line.split()[1:3]
+                return int(done) / int(total) if int(total) else 1.0
+            except ValueError:
+                return None
+        return None
+
+    def parse_bytes_done(self, line):
+        if line.startswith('PROGRESS '):
+            try:
+                return int(line.split()[1])
+            except (ValueError, IndexError):
+                return None
+        return None
+
+    def parse_entry_done(self, line):
+        if line.startswith('DONE '):
+            return line[5:].rstrip('\r\n')
+        return None
+
+    @staticmethod
+    def locate():
+        # 打包成exe后由程序本身运行内置解压程序
+        if getattr(sys, 'frozen', False):
+            return sys.executable
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'native_extractor.py')
+        return path if os.path.exists(path) else None
+
+
+class SimulatorBackend(NativeBackend):
+    """模拟解压程序（fake_extractor.py），只在手动指定时使用，不参与自动选择"""
+
+    name = 'simulator'
+    formats = ALL_FORMATS
+    preference = 1000
+    opt_in = True
+    frozen_flag = FROZEN_SIMULATOR_FLAG
+
+    @staticmethod
+    def locate():
+        if getattr(sys, 'frozen', False):
+            return sys.executable
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_extractor.py')
+        return path if os.path.exists(path) else None
+
+
+def script_command(script, frozen_flag):
+    """运行解压脚本的命令前缀：源码运行时用Python解释器运行脚本，打包成exe后用程序本身加frozen_flag参数"""
+    if getattr(sys, 'frozen', False):
+        return [sys.executable, frozen_flag]
+    return [sys.executable, script]
+
+
+def run_frozen_extractor(argv):
+    """打包后的程序入口最先调用：第一个参数是解压脚本的标志时运行该脚本并返回退出码，否则返回None"""
+    if not argv or argv[0] not in (FROZEN_NATIVE_FLAG, FROZEN_SIMULATOR_FLAG):
+        return None
+    # 无控制台的exe中sys.stdout和sys.stderr为None，改为直接写入父进程传入的管道
+    for name, fd in (('stdout', 1), ('stderr', 2)):
+        if getattr(sys, name) is None:
+            try:
+                setattr(sys, name, open(fd, 'w', encoding='utf-8', errors='replace', closefd=False))
+            except OSError:
+                setattr(sys, name, open(os.devnull, 'w'))
+    if argv[0] == FROZEN_NATIVE_FLAG:
+        import native_extractor
+        return native_extractor.main(argv[1:])
+    import fake_extractor
+    return fake_extractor.main(argv[1:])
+
+
+# 后端注册表（名称 -> 类）
+BACKEND_CLASSES = {
+    cls.name: cls for cls in (BandizipBackend, SevenZipBackend, UnrarBackend, BsdtarBackend, NativeBackend,
+                              SimulatorBackend)
+}
+
+
+def discover_backends(bandizip_path=None, paths=None, forced=None):
+    """查找本机可用的后端，返回 {名称: 后端实例}
+
+    bandizip_path: 用户指定的Bandizip路径
+    paths: 可选的 {后端名称: 可执行文件路径}，覆盖自动查找结果
+    forced: 强制使用的后端名称（需要手动启用的后端此时也会查找）
+    """
+    found = {}
+    paths = dict(paths or {})
+    if bandizip_path:
+        paths.setdefault('bandizip', bandizip_path)
+    for name, cls in BACKEND_CLASSES.items():
+        if cls.opt_in and name != forced and name not in paths:
+            continue
+        executable = paths.get(name) or cls.locate()
+        if executable and os.path.exists(executable):
+            found[name] = cls(executable)
+    return found
+
+
+class BackendSelector:
+    """为每种格式选择本机最快的后端，测速结果按主机缓存到JSON文件"""
+
+    def __init__(self, backends, cache_file, throughput_model=None, log_callback=None, forced=None):
+        self.backends = backends
+        self.cache_file = cache_file
+        self.throughput_model = throughput_model
+        self.log_callback = log_callback
+        self.forced = forced
+        self.host = socket.gethostname()
+        self.cache = self._load_cache()
+        # 多个工作线程同时遇到未测速的格式时只测一次
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def _signature(self):
+        """可用后端的签名：后端集合或路径变化后缓存失效"""
+        return {name: backend.executable for name, backend in sorted(self.backends.items())}
+
+    def _load_cache(self):
+        try:
+            if os.path.exists(self.cache_file):
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    cache = json.load(f)
+                if cache.get('host') == self.host and cache.get('backends') == self._signature():
+                    return cache
+        except (OSError, ValueError):
+            pass
+        return {'host': self.host, 'backends': self._signature(), 'formats': {}}
+
+    def _save_cache(self):
+        try:
+            tmp_path = self.cache_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            self.log(f"⚠️ 保存后端选择缓存失败: {e}")
+
+    def candidates(self, fmt):
+        """支持该格式的后端，按默认优先级排序"""
+        return sorted((b for b in self.backends.values() if b.supports(fmt)), key=lambda b: b.preference)
+
+    def select(self, archive_path):
+        """为压缩包选择后端，没有可用后端时返回None"""
+        fmt = detect_format(archive_path) or 'unknown'
+        if self.forced:
+            return self.backends.get(self.forced)
+        candidates = self.candidates(fmt)
+        if not candidates:
+            # 无法识别的格式交给支持所有格式的后端
+            candidates = self.candidates('7z')
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+
+        with self._lock:
+            cached = self.cache['formats'].get(fmt)
+            if cached and cached.get('backend') in self.backends:
+                return self.backends[cached['backend']]
+
+            if fmt in BENCHMARK_FORMATS:
+                choice = self.benchmark_format(fmt, candidates)
+                if choice:
+                    return choice
+
+        # 无法测速的格式：按历史吞吐量，没有历史数据时按默认优先级
+        if self.throughput_model:
+            measured = []
+            for backend in candidates:
+                rate, startup, samples = self.throughput_model.throughput(backend.name, fmt)
+                if samples:
+                    measured.append((rate, backend))
+            if measured:
+                return max(measured, key=lambda item: item[0])[1]
+        return candidates[0]
+
+    def benchmark_format(self, fmt, candidates=None):
+        """用样本压缩包测试每个后端的解压速度，缓存并返回最快的后端"""
+        candidates = candidates or self.candidates(fmt)
+        if not candidates:
+            return None
+        self.log(f"⏱️ 正在测试 {fmt} 格式的解压速度（{', '.join(b.name for b in candidates)}）...")
+        results = {}
+        with tempfile.TemporaryDirectory(prefix='butter_bench_') as work_dir:
+            try:
+                sample_path, sample_bytes = create_benchmark_sample(work_dir, fmt)
+            except Exception as e:
+                self.log(f"⚠️ 无法生成测速样本: {e}")
+                return None
+            for backend in candidates:
+                seconds = _time_extraction(backend, sample_path, work_dir)
+                if seconds:
+                    results[backend.name] = round(sample_bytes / seconds, 1)
+                    self.log(f"⏱️ {backend.name}: {results[backend.name] / 1024 / 1024:.1f} MB/s")
+                else:
+                    self.log(f"⚠️ {backend.name} 无法解压 {fmt} 样本")
+        if not results:
+            return None
+        best = max(results, key=results.get)
+        self.cache['formats'][fmt] = {
+            'backend': best,
+            'bytes_per_second': results,
+            'measured_at': time.time(),
+        }
+        self._save_cache()
+        self.log(f"✅ {fmt} 格式使用 {best}")
+        return self.backends[best]
+
+    def benchmark_all(self):
+        """测试所有可生成样本的格式"""
+        for fmt in BENCHMARK_FORMATS:
+            if len(self.candidates(fmt)) > 1:
+                self.benchmark_format(fmt)
+        return self.cache['formats']
+
+
+# 可以用标准库生成测速样本的格式
+BENCHMARK_FORMATS = ('zip', 'tar', 'tar.gz', 'tar.bz2', 'tar.xz')
+
+
+def create_benchmark_sample(work_dir, fmt, size=BENCHMARK_SIZE):
+    """生成测速样本：一半随机数据、一半可压缩数据，返回 (路径, 解压后字节数)"""
+    payload_dir = os.path.join(work_dir, 'payload')
+    os.makedirs(payload_dir, exist_ok=True)
+    chunk = size // 8
+    names = []
+    for i in range(8):
+        name = os.path.join(payload_dir, f'file_{i}.bin')
+        with open(name, 'wb') as f:
+            if i % 2:
+                f.write(os.urandom(chunk))
+            else:
+                f.write((b'butter unpacker benchmark %d\n' % i) * (chunk // 28))
+        names.append(name)
+    total = sum(os.path.getsize(n) for n in names)
+
+    sample_path = os.path.join(work_dir, 'sample.' + fmt)
+    if fmt == 'zip':
+        with zipfile.ZipFile(sample_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name in names:
+                zf.write(name, os.path.basename(name))
+    else:
+        mode = {'tar': 'w', 'tar.gz': 'w:gz', 'tar.bz2': 'w:bz2', 'tar.xz': 'w:xz'}[fmt]
+        with tarfile.open(sample_path, mode) as tf:
+            for name in names:
+                tf.add(name, os.path.basename(name))
+    shutil.rmtree(payload_dir)
+    return sample_path, total
+
+
+def _time_extraction(backend, sample_path, work_dir, repeats=2):
+    """返回多次解压中最快一次的耗时，失败返回None"""
+    best = None
+    for i in range(repeats):
+        out_dir = os.path.join(work_dir, f'out_{backend.name}_{i}')
+        os.makedirs(out_dir, exist_ok=True)
+        start = time.perf_counter()
+        try:
+            result = subprocess.run(
+                backend.build_command(sample_path, out_dir),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                stdin=subprocess.DEVNULL,
+                timeout=120
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return None
+        elapsed = time.perf_counter() - start
+        shutil.rmtree(out_dir, ignore_errors=True)
+        if result.returncode != 0:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压策略
+功能：用配置文件中的规则决定文件夹是否处理、正常格式的压缩包是否解压。每个文件夹每轮只扫描一次，
+生成文件夹摘要（各类文件的数量和大小），所有规则都在摘要上判断，不再对每个候选压缩包重新读取目录；
+每个决定都带有原因（匹配的规则），写入日志
+
+规则按顺序匹配，第一条满足全部条件的规则生效：
+    {"name": "说明", "条件": 值, ..., "action": "动作"}
+
+条件（数值可写成 3、"<=2"、">=1"、"!=0"，大小可带单位 "<100MB"）：
+    files           文件夹中的文件数
+    archives        正常格式压缩包数（以压缩包扩展名结尾）
+    malformed       异常格式压缩包数
+    executables     可执行文件数
+    total_size      文件夹中文件的总大小
+    depth           相对于处理根目录的层级
+    path            路径通配符（文件夹规则匹配文件夹路径，压缩包规则匹配压缩包路径）
+    folder_ext      文件夹中有以这些扩展名结尾的文件，例如 [".iso", ".mkv"]
+    ext             压缩包以这些扩展名结尾（只用于压缩包规则）
+    size            压缩包大小（只用于压缩包规则）
+    kind            压缩包类型 normal / malformed（只用于压缩包规则）
+
+动作：
+    文件夹规则  stop 不处理也不进入子文件夹, skip 不处理但进入子文件夹, process 处理
+    压缩包规则  extract 解压, skip 不解压
+"""
+
+import os
+import re
+import fnmatch
+
+# 文件分类
+CLASS_ARCHIVE = 'archive'        # 正常格式的压缩包
+CLASS_MALFORMED = 'malformed'    # 异常格式的压缩包（扩展名在中间）
+CLASS_EXECUTABLE = 'executable'  # 可执行文件
+CLASS_OTHER = 'other'
+
+# 动作
+ACTION_STOP = 'stop'
+ACTION_SKIP = 'skip'
+ACTION_PROCESS = 'process'
+ACTION_EXTRACT = 'extract'
+FOLDER_ACTIONS = (ACTION_STOP, ACTION_SKIP, ACTION_PROCESS)
+ARCHIVE_ACTIONS = (ACTION_EXTRACT, ACTION_SKIP)
+
+# 出现后停止处理该文件夹的扩展名（解压到最终内容的标志）
+DEFAULT_EXECUTABLE_EXTENSIONS = ['.exe', '.msi', '.bat', '.cmd', '.com', '.scr']
+
+# 默认规则（与之前固定的判断相同）
+DEFAULT_FOLDER_RULES = [
+    {'name': '发现可执行文件', 'executables': '>=1', 'action': ACTION_STOP},
+]
+DEFAULT_ARCHIVE_RULES = [
+    {'name': '异常格式压缩包', 'kind': 'malformed', 'action': ACTION_EXTRACT},
+    {'name': '文件夹中不超过2个文件', 'files': '<=2', 'action': ACTION_EXTRACT},
+    {'name': '文件夹中只有一个压缩包', 'archives': 1, 'action': ACTION_EXTRACT},
+]
+DEFAULT_ARCHIVE_ACTION = ACTION_SKIP
+DEFAULT_ARCHIVE_REASON = '文件夹中有多个文件和压缩包'
+
+# 数值条件
+_COUNT_FIELDS = ('files', 'archives', 'malformed', 'executables', 'depth')
+_SIZE_FIELDS = ('total_size', 'size')
+_ARCHIVE_ONLY_FIELDS = ('ext', 'size', 'kind')
+
+_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3, 'TB': 1024 ** 4}
+_COMPARISON = re.compile(r'^\s*(<=|>=|!=|==|<|>|=)?\s*([0-9.]+)\s*([KMGT]?B)?\s*$', re.IGNORECASE)
+_OPERATORS = {
+    '<': lambda a, b: a < b, '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b, '>=': lambda a, b: a >= b,
+    '==': lambda a, b: a == b, '=': lambda a, b: a == b, '!=': lambda a, b: a != b,
+}
+
+
+def _parse_comparison(field, value):
+    """把条件值解析为 (运算符, 数值)"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return '==', value
+    match = _COMPARISON.match(str(value))
+    if not match or (match.group(3) and field not in _SIZE_FIELDS):
+        raise ValueError(f"无效的条件 {field}: {value}")
+    operator, number, unit = match.group(1) or '==', float(match.group(2)), (match.group(3) or '').upper()
+    return operator, number * _UNITS[unit]
+
+
+def _extensions(value):
+    return tuple(ext.lower() for ext in ([value] if isinstance(value, str) else value))
+
+
+class _Rule:
+    def __init__(self, spec, actions, archive_rule):
+        spec = dict(spec)
+        self.action = spec.pop('action', None)
+        if self.action not in actions:
+            raise ValueError(f"无效的动作: {self.action}（可用: {', '.join(actions)}）")
+        self.name = spec.pop('name', None)
+        if not spec:
+            raise ValueError("规则没有任何条件")
+        self.description = ', '.join(f'{key}={value}' for key, value in spec.items())
+        self.checks = []
+        for field, value in spec.items():
+            if field in _ARCHIVE_ONLY_FIELDS and not archive_rule:
+                raise ValueError(f"条件 {field} 只能用于压缩包规则")
+            if field in _COUNT_FIELDS or field in _SIZE_FIELDS:
+                operator, number = _parse_comparison(field, value)
+                self.checks.append((field, _OPERATORS[operator], number))
+            elif field in ('ext', 'folder_ext'):
+                self.checks.append((field, None, _extensions(value)))
+            elif field == 'path':
+                self.checks.append((field, None, str(value).replace('\\', '/')))
+            elif field == 'kind':
+                if value not in ('normal', 'malformed'):
+                    raise ValueError(f"无效的条件 kind: {value}")
+                self.checks.append((field, None, value))
+            else:
+                raise ValueError(f"未知的条件: {field}")
+
+    @property
+    def reason(self):
+        return self.name or self.description
+
+    def matches(self, summary, archive=None):
+        for field, operator, expected in self.checks:
+            if operator is not None:
+                if not operator(summary.value(field, archive), expected):
+                    return False
+            elif field == 'ext':
+                if not archive.lower().endswith(expected):
+                    return False
+            elif field == 'folder_ext':
+                if not summary.has_extension(expected):
+                    return False
+            elif field == 'path':
+                path = os.path.join(summary.path, archive) if archive else summary.path
+                if not fnmatch.fnmatch(path.replace('\\', '/'), expected):
+                    return False
+            elif field == 'kind':
+                if summary.classes.get(archive) != (CLASS_MALFORMED if expected == 'malformed' else CLASS_ARCHIVE):
+                    return False
+        return True
+
+
+class FolderSummary:
+    """一个文件夹的文件摘要：文件名 -> 大小，以及按分类的数量"""
+
+    def __init__(self, path, depth, files, classify):
+        self.path = path
+        self.depth = depth
+        self.files = files
+        self.classes = {name: classify(name) for name in files}
+        self.counts = {CLASS_ARCHIVE: 0, CLASS_MALFORMED: 0, CLASS_EXECUTABLE: 0, CLASS_OTHER: 0}
+        for cls in self.classes.values():
+            self.counts[cls] += 1
+        self.total_size = sum(files.values())
+
+    @property
+    def has_archive(self):
+        return bool(self.counts[CLASS_ARCHIVE] or self.counts[CLASS_MALFORMED])
+
+    def names(self, cls):
+        return [name for name, c in self.classes.items() if c == cls]
+
+    def has_extension(self, extensions):
+        return any(name.lower().endswith(extensions) for name in self.files)
+
+    def value(self, field, archive=None):
+        if field == 'files':
+            return len(self.files)
+        if field == 'archives':
+            return self.counts[CLASS_ARCHIVE]
+        if field == 'malformed':
+            return self.counts[CLASS_MALFORMED]
+        if field == 'executables':
+            return self.counts[CLASS_EXECUTABLE]
+        if field == 'depth':
+            return self.depth
+        if field == 'total_size':
+            return self.total_size
+        if field == 'size':
+            return self.files.get(archive, 0)
+        raise KeyError(field)
+
+
+class ExtractionPolicy:
+    """按规则决定文件夹和压缩包的处理方式"""
+
+    def __init__(self, archive_extensions, is_malformed, settings=None):
+        settings = settings or {}
+        self.archive_extensions = tuple(ext.lower() for ext in archive_extensions)
+        self.is_malformed = is_malformed
+        self.executable_extensions = _extensions(
+            settings.get('executable_extensions', DEFAULT_EXECUTABLE_EXTENSIONS))
+        self.folder_rules = [_Rule(spec, FOLDER_ACTIONS, False)
+                             for spec in settings.get('folder_rules', DEFAULT_FOLDER_RULES)]
+        self.archive_rules = [_Rule(spec, ARCHIVE_ACTIONS, True)
+                              for spec in settings.get('archive_rules', DEFAULT_ARCHIVE_RULES)]
+        self.default_archive_action = settings.get('default_archive_action', DEFAULT_ARCHIVE_ACTION)
+        self.default_archive_reason = DEFAULT_ARCHIVE_REASON if 'archive_rules' not in settings else '没有匹配的规则'
+        if self.default_archive_action not in ARCHIVE_ACTIONS:
+            raise ValueError(f"无效的默认动作: {self.default_archive_action}")
+
+    def classify(self, name):
+        lower = name.lower()
+        if lower.endswith(self.executable_extensions):
+            return CLASS_EXECUTABLE
+        if self.is_malformed(name):
+            return CLASS_MALFORMED
+        if lower.endswith(self.archive_extensions):
+            return CLASS_ARCHIVE
+        return CLASS_OTHER
+
+    def summarize(self, path, depth):
+        """扫描一次文件夹，生成摘要（无法读取时抛出OSError）"""
+        files = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        files[entry.name] = entry.stat().st_size
+                except OSError:
+                    continue
+        return FolderSummary(path, depth, files, self.classify)
+
+    def summary_of(self, path, depth, files):
+        """用已知的 {文件名: 大小} 生成摘要（例如按压缩包条目列表预测的解压结果）"""
+        return FolderSummary(path, depth, files, self.classify)
+
+    def decide_folder(self, summary):
+        """返回 (动作, 原因)"""
+        for rule in self.folder_rules:
+            if rule.matches(summary):
+                return rule.action, rule.reason
+        if not summary.has_archive:
+            return ACTION_SKIP, '没有压缩包'
+        return ACTION_PROCESS, '有压缩包'
+
+    def decide_archive(self, summary, name):
+        """文件夹中的压缩包是否解压，返回 (动作, 原因)"""
+        for rule in self.archive_rules:
+            if rule.matches(summary, name):
+                return rule.action, rule.reason
+        return self.default_archive_action, self.default_archive_reason
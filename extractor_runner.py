@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压程序子进程调度
+功能：在后台asyncio事件循环中运行解压程序，同时收集标准输出和错误输出，
+支持超时和按任务取消（立即结束整个进程树），一个事件循环可同时管理多个解压任务
+"""
+
+import os
+import re
+import sys
+import time
+import codecs
+import signal
+import asyncio
+import itertools
+import threading
+import subprocess
+import locale
+
+# 取消或超时后等待进程退出的最长时间（秒）
+KILL_WAIT_SECONDS = 5
+
+# 每次从管道读取的字节数
+READ_CHUNK = 64 * 1024
+
+# 没有分隔符的输出超过该长度时直接作为一段回调（避免缓存无限增长）
+MAX_SEGMENT = 64 * 1024
+
+# 输出按换行、回车和退格分段（7-Zip和Bandizip的进度用\r或\b覆盖同一行，不换行）
+_SEGMENT = re.compile(r'[^\r\n\b]*[\r\n\b]')
+
+
+class JobResult:
+    """一次解压程序运行的结果"""
+
+    def __init__(self, returncode, stdout, stderr, duration, timed_out=False, cancelled=False):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+
+class _Job:
+    def __init__(self, job_id, cmd):
+        self.job_id = job_id
+        self.cmd = cmd
+        self.process = None
+        self.task = None
+        self.cancel_requested = False
+
+
+def kill_process_tree(pid):
+    """结束进程及其所有子进程"""
+    try:
+        if sys.platform == 'win32':
+            subprocess.run(
+                ['taskkill', '/T', '/F', '/PID', str(pid)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0)
+            )
+        else:
+            # 子进程以新会话启动，进程组号等于其pid
+            os.killpg(pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError, OSError):
+        pass
+
+
+class ExtractorJobRunner:
+    """在独立线程的事件循环中运行解压程序子进程（线程安全）"""
+
+    def __init__(self):
+        self.encoding = locale.getpreferredencoding(False)
+        # 可选的进程优先级（resource_governor.ProcessPriority），后台模式下降低解压程序的CPU和I/O优先级
+        self.priority = None
+        self.loop = asyncio.new_event_loop()
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run_loop, name='extractor-loop', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _read_stream(self, stream, chunks, on_output, stream_name):
+        """分块读取输出，按换行、回车和退格分段回调给调用方（用于进度解析等）"""
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors='replace')
+        pending = ''
+        while True:
+            data = await stream.read(READ_CHUNK)
+            text = decoder.decode(data, final=not data)
+            if text:
+                chunks.append(text)
+                pending += text
+                # 只在最后一个分隔符之前分段（对没有分隔符的尾部逐位置匹配是平方复杂度）
+                end = max(pending.rfind('\r'), pending.rfind('\n'), pending.rfind('\b')) + 1
+                for match in _SEGMENT.finditer(pending, 0, end):
+                    self._emit(on_output, stream_name, match.group())
+                pending = pending[end:]
+                if len(pending) > MAX_SEGMENT:
+                    self._emit(on_output, stream_name, pending)
+                    pending = ''
+            if not data:
+                self._emit(on_output, stream_name, pending)
+                break
+
+    @staticmethod
+    def _emit(on_output, stream_name, segment):
+        # 只有分隔符的段（连续的退格、\r\n中的\n）不回调
+        if on_output and segment.strip('\r\n\b'):
+            try:
+                on_output(stream_name, segment)
+            except Exception:
+                pass
+
+    async def run_async(self, cmd, timeout=None, on_output=None, job=None, deadline_extender=None):
+        """运行一个解压程序并等待结束（协程版本）
+
+        deadline_extender: 可选回调，超时到达时调用；返回秒数则再等待这么久，返回None则判定超时
+        """
+        job = job or self._register(cmd)
+        start = time.perf_counter()
+        stdout_chunks, stderr_chunks = [], []
+        kwargs = {}
+        priority = self.priority
+        if sys.platform == 'win32':
+            kwargs['creationflags'] = subprocess.CREATE_NEW_PROCESS_GROUP | (priority.creationflags() if priority else 0)
+        else:
+            kwargs['start_new_session'] = True
+        timed_out = False
+        readers = None
+        try:
+            job.process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **kwargs
+            )
+            if priority is not None:
+                priority.apply(job.process.pid)
+            if job.cancel_requested:
+                raise asyncio.CancelledError()
+            readers = asyncio.gather(
+                self._read_stream(job.process.stdout, stdout_chunks, on_output, 'stdout'),
+                self._read_stream(job.process.stderr, stderr_chunks, on_output, 'stderr'),
+                job.process.wait()
+            )
+            remaining = timeout
+            while True:
+                try:
+                    await asyncio.wait_for(asyncio.shield(readers), remaining)
+                    break
+                except asyncio.TimeoutError:
+                    remaining = None
+                    if deadline_extender:
+                        remaining = await self.loop.run_in_executor(None, deadline_extender)
+                    if not remaining:
+                        timed_out = True
+                        kill_process_tree(job.process.pid)
+                        await self._wait_killed(job.process, readers)
+                        break
+            return JobResult(job.process.returncode, ''.join(stdout_chunks), ''.join(stderr_chunks),
+                             time.perf_counter() - start, timed_out=timed_out)
+        except asyncio.CancelledError:
+            if job.process is not None:
+                kill_process_tree(job.process.pid)
+                await self._wait_killed(job.process, readers)
+            return JobResult(job.process.returncode if job.process else None,
+                             ''.join(stdout_chunks), ''.join(stderr_chunks),
+                             time.perf_counter() - start, cancelled=True)
+        finally:
+            if job.process is not None and job.process.returncode is None:
+                # 其他异常（如读取输出出错）同样结束进程树，不留下仍在写入目标目录的解压程序
+                kill_process_tree(job.process.pid)
+                await self._wait_killed(job.process, readers)
+            with self._lock:
+                self.jobs.pop(job.job_id, None)
+
+    async def _wait_killed(self, process, readers):
+        try:
+            await asyncio.wait_for(process.wait(), KILL_WAIT_SECONDS)
+            if readers is not None:
+                await asyncio.wait_for(readers, KILL_WAIT_SECONDS)
+        except (asyncio.TimeoutError, asyncio.CancelledError, Exception):
+            # 读取输出的任务出错时异常已经由run_async处理，这里只等待结束
+            pass
+
+    def _register(self, cmd):
+        with self._lock:
+            job = _Job(next(self._ids), cmd)
+            self.jobs[job.job_id] = job
+        return job
+
+    def submit(self, cmd, timeout=None, on_output=None, deadline_extender=None):
+        """从任意线程提交任务，返回 (任务编号, concurrent.futures.Future)"""
+        job = self._register(cmd)
+
+        async def runner():
+            job.task = asyncio.current_task()
+            return await self.run_async(cmd, timeout, on_output, job, deadline_extender)
+
+        future = asyncio.run_coroutine_threadsafe(runner(), self.loop)
+        return job.job_id, future
+
+    def run(self, cmd, timeout=None, on_output=None, deadline_extender=None):
+        """从工作线程同步运行一个解压程序，返回JobResult"""
+        job_id, future = self.submit(cmd, timeout, on_output, deadline_extender)
+        return future.result()
+
+    def cancel(self, job_id):
+        """取消指定任务（立即结束其进程树）"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return False
+        job.cancel_requested = True
+
+        def do_cancel():
+            if job.task is not None:
+                job.task.cancel()
+
+        self.loop.call_soon_threadsafe(do_cancel)
+        return True
+
+    def cancel_all(self):
+        """取消所有正在运行的任务"""
+        with self._lock:
+            job_ids = list(self.jobs)
+        for job_id in job_ids:
+            self.cancel(job_id)
+        return len(job_ids)
+
+    def running_count(self):
+        with self._lock:
+            return len(self.jobs)
+
+    def close(self):
+        """取消所有任务并停止事件循环"""
+        self.cancel_all()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=KILL_WAIT_SECONDS)
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟解压程序（用于性能和故障测试）
+功能：命令行参数和输出格式与Bandizip一致，按脚本模拟启动耗时、解压吞吐量、密码错误、
+CRC错误、卡死和输出文件延迟出现，不需要真正的Bandizip即可在Linux上测试调度、超时和取消逻辑
+
+用法：
+    python fake_extractor.py x [-p:密码] -o:目标目录 [-y] [-aoa] 压缩包   # 命令行解压
+    python fake_extractor.py 压缩包                                        # 模拟Bandizip图形界面
+
+脚本（JSON）通过环境变量 BUTTER_SIM_SCRIPT 指定（脚本不能放在被处理的文件夹中，
+否则文件名中的压缩包扩展名会被当作异常格式压缩包）：
+    {
+      "defaults": {"startup_seconds": 0.2, "bytes_per_second": 50000000},
+      "archives": {
+        "*locked*": {"password": "secret"},
+        "*.rar":    {"fault": "crc"},
+        "stuck_*":  {"fault": "hang", "hang_after": 0.5}
+      }
+    }
+archives中按文件名（或完整路径）通配符匹配，所有匹配项按顺序合并到defaults之上。
+
+可用字段：
+    startup_seconds     进程启动耗时
+    bytes_per_second    解压吞吐量（按解压后大小计算耗时）
+    jitter              吞吐量的随机波动比例（按压缩包名称固定种子，结果可重复）
+    size                解压后总大小（默认读取zip/tar文件头，否则等于压缩包大小）
+    files               生成的文件数（synthetic模式）
+    content             archive: 真正解压zip/tar内容；synthetic: 生成随机内容文件
+    password            正确密码，null表示不需要密码
+    fault               crc / data_error / cannot_open / hang
+    hang_after          卡死前完成的进度比例（0~1）
+    file_delay          每个文件写入之间的额外延迟（秒）
+    materialize_delay   进程退出后再过多少秒文件才出现在目标目录
+    exit_code           强制指定退出码
+    gui_seconds         图形界面模式下模拟用户输入密码所需的时间
+    gui_result          图形界面模式的结果：ok / cancel
+"""
+
+import os
+import sys
+import json
+import time
+import fnmatch
+import random
+import shutil
+import tarfile
+import zipfile
+import tempfile
+import subprocess
+
+import native_extractor
+from extract_backends import script_command, FROZEN_SIMULATOR_FLAG
+
+# 脚本文件的环境变量
+SCRIPT_ENV = 'BUTTER_SIM_SCRIPT'
+
+EXIT_OK = 0
+EXIT_FATAL = 2
+EXIT_USAGE = 7
+
+DEFAULTS = {
+    'startup_seconds': 0.05,
+    'bytes_per_second': 200 * 1024 * 1024,
+    'jitter': 0.0,
+    'size': None,
+    'files': 2,
+    'content': None,
+    'password': None,
+    'fault': None,
+    'hang_after': 0.0,
+    'file_delay': 0.0,
+    'materialize_delay': 0.0,
+    'exit_code': None,
+    'gui_seconds': 3.0,
+    'gui_result': 'ok',
+}
+
+# 进度输出的间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+# 卡死时最长保持的时间（秒），防止测试异常退出后留下进程
+HANG_SECONDS = 24 * 3600
+
+
+def load_behavior(archive_path):
+    """合并默认值和脚本，得到该压缩包的模拟行为"""
+    behavior = dict(DEFAULTS)
+    script_path = os.environ.get(SCRIPT_ENV)
+    name = os.path.basename(archive_path)
+    if script_path:
+        with open(script_path, 'r', encoding='utf-8') as f:
+            script = json.load(f)
+        behavior.update(script.get('defaults', {}))
+        for pattern, overrides in script.get('archives', {}).items():
+            if fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(archive_path, pattern):
+                behavior.update(overrides)
+    return behavior
+
+
+def _archive_rng(archive_path):
+    # 用文件名而不是hash()做种子，保证每次运行结果一致
+    return random.Random(os.path.basename(archive_path))
+
+
+def _can_extract(archive_path):
+    """是否是内置解压程序能真正解压的有效压缩包"""
+    lower = archive_path.lower()
+    try:
+        if lower.endswith('.zip'):
+            return zipfile.is_zipfile(archive_path)
+        if any(lower.endswith(ext) for ext, _ in native_extractor.TAR_MODES):
+            return tarfile.is_tarfile(archive_path)
+    except OSError:
+        pass
+    return False
+
+
+def _uncompressed_size(archive_path, behavior):
+    if behavior['size'] is not None:
+        return int(behavior['size'])
+    try:
+        from archive_probe import probe_archive
+        return probe_archive(archive_path)['uncompressed_size']
+    except Exception:
+        return os.path.getsize(archive_path)
+
+
+def _pace(total_bytes, rate, start_fraction, end_fraction, stop_fraction=None):
+    """按吞吐量等待并输出进度；到达stop_fraction时返回False（用于模拟卡死）"""
+    duration = total_bytes / max(rate, 1) * (end_fraction - start_fraction)
+    started = time.monotonic()
+    while True:
+        elapsed = time.monotonic() - started
+        fraction = start_fraction + (elapsed / duration * (end_fraction - start_fraction) if duration > 0 else 1)
+        fraction = min(fraction, end_fraction)
+        if stop_fraction is not None and fraction >= stop_fraction:
+            print(f"PROGRESS {int(total_bytes * stop_fraction)} {total_bytes}", flush=True)
+            return False
+        print(f"PROGRESS {int(total_bytes * fraction)} {total_bytes}", flush=True)
+        if fraction >= end_fraction:
+            return True
+        time.sleep(min(PROGRESS_INTERVAL, max(duration - elapsed, 0.01)))
+
+
+def _materialize(staging, extract_to, file_delay):
+    """把暂存目录中的文件移动到目标目录"""
+    for name in sorted(os.listdir(staging)):
+        target = os.path.join(extract_to, name)
+        if os.path.isdir(target) and os.path.isdir(os.path.join(staging, name)):
+            shutil.copytree(os.path.join(staging, name), target, dirs_exist_ok=True)
+        else:
+            shutil.move(os.path.join(staging, name), target)
+        if file_delay:
+            time.sleep(file_delay)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def _materialize_paced(staging, extract_to, total_bytes, rate, file_delay):
+    """按吞吐量逐个把文件移动到目标目录，每个文件就位后输出 DONE <条目>（与内置解压程序一致）"""
+    files = []
+    for dirpath, _, filenames in os.walk(staging):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            files.append((os.path.relpath(path, staging).replace(os.sep, '/'), os.path.getsize(path)))
+    files.sort()
+    content_bytes = sum(size for _, size in files) or 1
+    fraction = 0.0
+    for relative, size in files:
+        end = fraction + size / content_bytes
+        _pace(total_bytes, rate, fraction, end)
+        fraction = end
+        target = os.path.join(extract_to, *relative.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(target)
+        shutil.move(os.path.join(staging, *relative.split('/')), target)
+        print(f"DONE {relative}", flush=True)
+        if file_delay:
+            time.sleep(file_delay)
+    # 空文件夹
+    for dirpath, dirnames, _ in os.walk(staging):
+        for name in dirnames:
+            os.makedirs(os.path.join(extract_to, os.path.relpath(os.path.join(dirpath, name), staging)), exist_ok=True)
+    shutil.rmtree(staging, ignore_errors=True)
+
+
+def _spawn_materializer(staging, extract_to, delay, file_delay):
+    """启动独立进程在延迟后移动文件（模拟解压程序退出后文件才出现）"""
+    kwargs = {}
+    if sys.platform == 'win32':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    subprocess.Popen(
+        script_command(os.path.abspath(__file__), FROZEN_SIMULATOR_FLAG)
+        + ['--materialize', staging, extract_to, str(delay), str(file_delay)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        **kwargs
+    )
+
+
+def _write_synthetic(staging, archive_path, behavior, total_bytes, rng):
+    stem = os.path.basename(archive_path).split('.')[0] or 'output'
+    count = max(1, int(behavior['files']))
+    per_file = total_bytes // count
+    for i in range(count):
+        with open(os.path.join(staging, f'{stem}_{i}.bin'), 'wb') as f:
+            remaining = per_file
+            while remaining > 0:
+                chunk = min(remaining, 1024 * 1024)
+                f.write(rng.randbytes(chunk))
+                remaining -= chunk
+
+
+def extract(archive_path, extract_to, password=''):
+    """模拟命令行解压，返回退出码"""
+    if not os.path.exists(archive_path):
+        print(f"Cannot open the file as archive: {archive_path}", file=sys.stderr)
+        return EXIT_FATAL
+    behavior = load_behavior(archive_path)
+    rng = _archive_rng(archive_path)
+    time.sleep(behavior['startup_seconds'])
+
+    fault = behavior['fault']
+    if fault == 'cannot_open':
+        print(f"Cannot open the file as archive: {archive_path}", file=sys.stderr)
+        return behavior['exit_code'] or EXIT_FATAL
+    expected = behavior['password']
+    if expected is not None and password != expected:
+        print(f"Wrong password : {os.path.basename(archive_path)}", file=sys.stderr)
+        return behavior['exit_code'] or EXIT_FATAL
+
+    total_bytes = _uncompressed_size(archive_path, behavior)
+    rate = behavior['bytes_per_second'] * (1 + rng.uniform(-1, 1) * behavior['jitter'])
+
+    if fault == 'hang':
+        _pace(total_bytes, rate, 0.0, 1.0, stop_fraction=float(behavior['hang_after']))
+        time.sleep(HANG_SECONDS)
+        return EXIT_FATAL
+    if fault in ('crc', 'data_error'):
+        _pace(total_bytes, rate, 0.0, 0.5)
+        message = 'CRC Failed' if fault == 'crc' else 'Data Error'
+        print(f"{message} : {os.path.basename(archive_path)}", file=sys.stderr)
+        return behavior['exit_code'] or EXIT_FATAL
+
+    os.makedirs(extract_to, exist_ok=True)
+    # 先写到临时目录，按materialize_delay的设置再移动到目标目录
+    staging = tempfile.mkdtemp(prefix='butter_sim_')
+    content = behavior['content'] or ('archive' if _can_extract(archive_path) else 'synthetic')
+    if content == 'archive':
+        # 真正解压内容，由内置解压程序负责校验密码之外的格式错误
+        with open(os.devnull, 'w') as devnull:
+            stdout = sys.stdout
+            sys.stdout = devnull
+            try:
+                code = native_extractor.extract(archive_path, staging, password)
+            finally:
+                sys.stdout = stdout
+        if code != native_extractor.EXIT_OK:
+            shutil.rmtree(staging, ignore_errors=True)
+            return code
+    else:
+        _write_synthetic(staging, archive_path, behavior, total_bytes, rng)
+
+    if behavior['materialize_delay']:
+        _pace(total_bytes, rate, 0.0, 1.0)
+        _spawn_materializer(staging, extract_to, behavior['materialize_delay'], behavior['file_delay'])
+    else:
+        # 解压耗时按文件大小分摊，文件逐个出现在目标目录
+        _materialize_paced(staging, extract_to, total_bytes, rate, behavior['file_delay'])
+    print("Everything is Ok", flush=True)
+    code = behavior['exit_code']
+    return EXIT_OK if code is None else code
+
+
+def gui(archive_path):
+    """模拟Bandizip图形界面：等待“用户”输入密码后解压到压缩包所在目录，然后保持打开直到被关闭"""
+    behavior = load_behavior(archive_path)
+    time.sleep(behavior['gui_seconds'])
+    if behavior['gui_result'] == 'ok':
+        # 图形界面没有控制台输出
+        sys.stdout = sys.stderr = open(os.devnull, 'w')
+        extract(archive_path, os.path.dirname(os.path.abspath(archive_path)), behavior['password'] or '')
+    time.sleep(HANG_SECONDS)
+    return EXIT_OK
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == '--materialize':
+        staging, extract_to, delay, file_delay = argv[1:5]
+        time.sleep(float(delay))
+        _materialize(staging, extract_to, float(file_delay))
+        return EXIT_OK
+    if len(argv) == 1 and not argv[0].startswith('-') and argv[0] != 'x':
+        return gui(argv[0])
+    parsed = native_extractor.parse_args(argv)
+    if parsed is None:
+        print(__doc__, file=sys.stderr)
+        return EXIT_USAGE
+    archive_path, extract_to, password = parsed
+    return extract(archive_path, extract_to, password)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视文件夹模式
+功能：持续监视一个或多个收件文件夹（Linux下使用inotify，其他平台轮询），
+新压缩包的大小和修改时间稳定一段时间后（写入完成），自动交给处理引擎解压
+"""
+
+import os
+import sys
+import time
+import queue
+import struct
+import select
+import threading
+
+# inotify事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+# 清理已记录文件中已不存在的路径的间隔（秒）
+PRUNE_INTERVAL = 60.0
+
+
+class PollingSource:
+    """轮询方式检测文件变化（所有平台可用）"""
+
+    name = 'poll'
+
+    def __init__(self, roots, interval=2.0):
+        self.roots = list(roots)
+        self.interval = interval
+        self.snapshot = {}
+
+    def _scan(self):
+        """递归扫描所有收件文件夹，返回 {路径: (大小, 修改时间)}"""
+        result = {}
+        stack = list(self.roots)
+        while stack:
+            folder = stack.pop()
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                st = entry.stat(follow_symlinks=False)
+                                result[entry.path] = (st.st_size, st.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+        return result
+
+    def initial_files(self):
+        """返回启动时已存在的文件"""
+        self.snapshot = self._scan()
+        return set(self.snapshot)
+
+    def wait_for_changes(self, timeout):
+        """等待一段时间后返回有变化的文件路径"""
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = {path for path, sig in current.items() if self.snapshot.get(path) != sig}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifySource:
+    """基于inotify的文件变化检测（仅Linux）"""
+
+    name = 'inotify'
+
+    def __init__(self, roots):
+        import ctypes
+        import ctypes.util
+        self.roots = list(roots)
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        self.watches = {}  # wd -> 目录路径
+
+    def _add_watch(self, folder):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+        if wd < 0:
+            return False
+        self.watches[wd] = folder
+        return True
+
+    def _add_tree(self, root):
+        """为目录树中的每个目录添加监视，返回其中已存在的文件"""
+        files = set()
+        for folder, dirs, names in os.walk(root):
+            self._add_watch(folder)
+            files.update(os.path.join(folder, name) for name in names)
+        return files
+
+    def initial_files(self):
+        files = set()
+        for root in self.roots:
+            files |= self._add_tree(root)
+        return files
+
+    def wait_for_changes(self, timeout):
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，重新扫描全部目录
+                for root in self.roots:
+                    changed |= self._add_tree(root)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            folder = self.watches.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新建或移入的子目录：补充监视并检查其中已有的文件
+                    changed |= self._add_tree(path)
+            else:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+def create_source(roots, backend='auto', poll_interval=2.0):
+    """创建文件变化检测源：auto时Linux优先使用inotify，失败则回退到轮询"""
+    if backend in ('auto', 'inotify') and sys.platform.startswith('linux'):
+        try:
+            return InotifySource(roots)
+        except (OSError, AttributeError):
+            if backend == 'inotify':
+                raise
+    elif backend == 'inotify':
+        raise OSError('当前平台不支持inotify')
+    return PollingSource(roots, poll_interval)
+
+
+class FolderWatcher:
+    """监视收件文件夹，把写入完成的压缩包所在文件夹交给引擎处理"""
+
+    def __init__(self, engine, inboxes, stable_seconds=5.0, poll_interval=2.0,
+                 backend='auto', process_existing=False, profile=False):
+        self.engine = engine
+        self.inboxes = [os.path.abspath(p) for p in inboxes]
+        self.stable_seconds = stable_seconds
+        self.poll_interval = poll_interval
+        self.backend = backend
+        self.process_existing = process_existing
+        self.profile = profile
+
+        self.pending = {}  # 路径 -> (大小, 修改时间, 开始稳定的时间)
+        self.known = {}    # 已处理或启动时已存在的文件 -> (大小, 修改时间)
+        self._known_lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.queued_folders = set()
+        self.active_folder = None  # 正在处理的文件夹（其中新出现的文件暂不判断）
+        self._queued_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def log(self, message):
+        self.engine.log(message)
+
+    def stop(self):
+        """停止监视（当前文件夹处理完后退出）"""
+        self._stop_event.set()
+        self.engine.request_stop()
+
+    def is_candidate(self, path):
+        """是否是需要关注的压缩包（正常格式或异常格式）"""
+        filename = os.path.basename(path)
+        lower = filename.lower()
+        return (any(lower.endswith(ext) for ext in self.engine.archive_extensions)
+                or self.engine.is_malformed_archive(filename))
+
+    @staticmethod
+    def _signature(path):
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+
+    def _remember_tree(self, folder):
+        """记录文件夹下所有文件的当前状态，处理产生的文件不会再次触发处理"""
+        snapshot = {}
+        for current, dirs, names in os.walk(folder):
+            for name in names:
+                path = os.path.join(current, name)
+                try:
+                    snapshot[path] = self._signature(path)
+                except OSError:
+                    continue
+        prefix = folder.rstrip(os.sep) + os.sep
+        with self._known_lock:
+            # 该文件夹下已不存在的文件不再记录（长时间监视时记录不会无限增长）
+            for path in [p for p in self.known if p.startswith(prefix) and p not in snapshot]:
+                del self.known[path]
+            self.known.update(snapshot)
+
+    def _prune_known(self):
+        """移除已记录但已不存在的文件，返回移除数"""
+        with self._known_lock:
+            paths = list(self.known)
+        missing = [path for path in paths if not os.path.exists(path)]
+        with self._known_lock:
+            for path in missing:
+                self.known.pop(path, None)
+        return len(missing)
+
+    def _track(self, paths, now):
+        """把有变化的候选文件加入待稳定列表"""
+        for path in paths:
+            if not self.is_candidate(path):
+                continue
+            try:
+                size, mtime = self._signature(path)
+            except OSError:
+                self.pending.pop(path, None)
+                continue
+            previous = self.pending.get(path)
+            if previous is None or previous[:2] != (size, mtime):
+                self.pending[path] = (size, mtime, now)
+
+    def _collect_stable(self, now):
+        """检查待稳定列表，返回大小和修改时间已稳定足够久的文件"""
+        ready = []
+        for path, (size, mtime, since) in list(self.pending.items()):
+            try:
+                current = self._signature(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            if current != (size, mtime) or self._is_being_processed(path):
+                # 仍在写入，或者是正在处理的文件夹中的文件（可能由解压或重命名产生），等处理完再判断
+                self.pending[path] = current + (now,)
+            elif now - since >= self.stable_seconds:
+                del self.pending[path]
+                with self._known_lock:
+                    already_handled = self.known.get(path) == current
+                if not already_handled:
+                    ready.append(path)
+        return ready
+
+    def _is_being_processed(self, path):
+        active = self.active_folder
+        return active is not None and (path + os.sep).startswith(active + os.sep)
+
+    def _enqueue_folder(self, folder):
+        with self._queued_lock:
+            if folder in self.queued_folders:
+                return
+            self.queued_folders.add(folder)
+        self.jobs.put(folder)
+
+    def _worker(self):
+        """后台处理线程：依次处理排队的文件夹"""
+        while not self._stop_event.is_set():
+            try:
+                folder = self.jobs.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._queued_lock:
+                self.queued_folders.discard(folder)
+            if not os.path.isdir(folder):
+                continue
+            self.active_folder = folder
+            self.log(f"📥 处理新到达的压缩包所在文件夹: {folder}")
+            try:
+                self.engine.process_folder(folder, profile=self.profile)
+            except Exception as e:
+                self.log(f"💥 处理文件夹时出错: {e}")
+            finally:
+                self._remember_tree(folder)
+                self.active_folder = None
+
+    def run(self):
+        """阻塞运行监视循环，直到调用stop()"""
+        source = create_source(self.inboxes, self.backend, self.poll_interval)
+        self.log(f"👀 开始监视 {len(self.inboxes)} 个文件夹（{source.name}，稳定窗口 {self.stable_seconds}s）")
+        for inbox in self.inboxes:
+            self.log(f"👀 监视: {inbox}")
+
+        existing = source.initial_files()
+        now = time.monotonic()
+        if self.process_existing:
+            self._track(existing, now - self.stable_seconds)
+        else:
+            for inbox in self.inboxes:
+                self._remember_tree(inbox)
+
+        worker = threading.Thread(target=self._worker, name='watch-worker', daemon=True)
+        worker.start()
+        last_prune = time.monotonic()
+        try:
+            while not self._stop_event.is_set():
+                # 有待稳定文件时缩短等待时间，尽快发现写入完成
+                timeout = self.poll_interval
+                if self.pending:
+                    timeout = min(timeout, max(0.1, self.stable_seconds / 4))
+                changed = source.wait_for_changes(timeout)
+                now = time.monotonic()
+                self._track(changed, now)
+                for path in self._collect_stable(now):
+                    self.log(f"🆕 压缩包写入完成: {path}")
+                    self._enqueue_folder(os.path.dirname(path))
+                if now - last_prune >= PRUNE_INTERVAL:
+                    last_prune = now
+                    self._prune_known()
+        finally:
+            source.close()
+            self._stop_event.set()
+            worker.join(timeout=5)
+            self.log("👋 已停止监视")
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包完整性校验
+功能：压缩包解压成功后，在后台线程中用解压程序的测试模式（7z t、unrar t、Bandizip t）
+或标准库重新计算CRC（zip逐个条目读取校验CRC-32，tar系列读取整个压缩流校验gzip/bz2/xz的校验和），
+校验与后续压缩包的解压同时进行，不增加串行等待时间
+"""
+
+import os
+import time
+import queue
+import tarfile
+import zipfile
+import threading
+
+from native_extractor import TAR_MODES
+from run_metrics import STAGE_INTEGRITY
+from extract_backends import STATUS_OK
+
+# 校验模式
+VERIFY_OFF = 'off'          # 不校验
+VERIFY_AUTO = 'auto'        # 标准库支持的格式用内置校验，其他格式用解压程序的测试模式
+VERIFY_NATIVE = 'native'    # 只用内置校验（其他格式跳过）
+VERIFY_BACKEND = 'backend'  # 优先用解压程序的测试模式，解压程序不支持时用内置校验
+VERIFY_MODES = (VERIFY_OFF, VERIFY_AUTO, VERIFY_NATIVE, VERIFY_BACKEND)
+
+# 校验结果
+RESULT_PASSED = 'passed'
+RESULT_FAILED = 'failed'
+RESULT_SKIPPED = 'skipped'
+
+# 内置校验每次读取的字节数
+READ_CHUNK = 1024 * 1024
+
+
+class _Stopped(Exception):
+    pass
+
+
+def native_supported(archive_path):
+    lower = archive_path.lower()
+    return lower.endswith('.zip') or any(lower.endswith(ext) for ext, _ in TAR_MODES)
+
+
+def _drain(stream, stop):
+    while stream.read(READ_CHUNK):
+        if stop is not None and stop.is_set():
+            raise _Stopped()
+
+
+def native_verify(archive_path, password='', stop=None):
+    """用标准库读取全部数据并校验，返回 (是否通过, 说明)"""
+    lower = archive_path.lower()
+    try:
+        if lower.endswith('.zip'):
+            pwd = password.encode('utf-8') if password else None
+            with zipfile.ZipFile(archive_path) as zf:
+                entries = [e for e in zf.infolist() if not e.is_dir()]
+                for entry in entries:
+                    # 读到条目末尾时zipfile会比较CRC-32，不一致时抛出BadZipFile
+                    with zf.open(entry, pwd=pwd) as src:
+                        _drain(src, stop)
+            return True, f'{len(entries)}个文件CRC-32一致'
+        for ext, mode in TAR_MODES:
+            if lower.endswith(ext):
+                # 流式模式顺序读完整个压缩流，压缩格式的校验和在流结束时检查
+                count = 0
+                with tarfile.open(archive_path, mode.replace(':', '|')) as tf:
+                    for member in tf:
+                        if member.isfile():
+                            _drain(tf.extractfile(member), stop)
+                            count += 1
+                return True, f'{count}个文件读取完整'
+        return False, '不支持的格式'
+    except _Stopped:
+        raise
+    except RuntimeError as e:
+        return False, f'密码错误: {e}'
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError, ValueError) as e:
+        return False, str(e)
+    except Exception as e:
+        return False, f'{type(e).__name__}: {e}'
+
+
+class IntegrityVerifier:
+    """后台校验队列：解压工作线程提交后立即返回，由校验线程依次完成"""
+
+    def __init__(self, mode, runner, metrics, log_callback=None, workers=1, thread_init=None):
+        if mode not in VERIFY_MODES:
+            raise ValueError(f"未知的校验模式: {mode}")
+        self.mode = mode
+        self.runner = runner
+        self.metrics = metrics
+        self.log_callback = log_callback
+        self.workers = max(1, int(workers))
+        self.thread_init = thread_init  # 校验线程启动时调用（例如后台模式下降低线程优先级）
+        self.results = []
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def submit(self, archive_path, backend, password='', timeout=None):
+        """提交一个已成功解压的压缩包"""
+        if self.mode == VERIFY_OFF or self._stop.is_set():
+            return
+        with self._lock:
+            if not self._threads:
+                self._threads = [
+                    threading.Thread(target=self._run, name=f'integrity-{i}', daemon=True)
+                    for i in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+        self._queue.put((archive_path, backend, password, timeout))
+
+    def _run(self):
+        if self.thread_init is not None:
+            self.thread_init()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._verify(*item)
+            finally:
+                self._queue.task_done()
+
+    def _method(self, archive_path, backend):
+        """选择校验方式：'native' / 'backend' / None"""
+        testable = (self.mode in (VERIFY_AUTO, VERIFY_BACKEND) and backend is not None
+                    and backend.build_test_command(archive_path) is not None)
+        if self.mode == VERIFY_BACKEND and testable:
+            return 'backend'
+        if native_supported(archive_path):
+            return 'native'
+        return 'backend' if testable else None
+
+    def _verify(self, archive_path, backend, password, timeout):
+        if self._stop.is_set():
+            return
+        name = os.path.basename(archive_path)
+        method = self._method(archive_path, backend)
+        if method is None:
+            self._record(name, RESULT_SKIPPED, None, '没有可用的校验方式', 0.0)
+            self.log(f"🧪 跳过完整性校验: {name}（没有可用的校验方式）")
+            return
+        start = time.perf_counter()
+        try:
+            if method == 'native':
+                ok, detail = native_verify(archive_path, password, self._stop)
+            else:
+                method = backend.name
+                result = self.runner.run(backend.build_test_command(archive_path, password), timeout=timeout)
+                if result.cancelled:
+                    return
+                if result.timed_out:
+                    ok, detail = False, '校验超时'
+                else:
+                    ok = backend.classify_output(result.returncode, result.stdout + result.stderr) == STATUS_OK
+                    detail = f'测试模式返回码 {result.returncode}'
+        except _Stopped:
+            return
+        except Exception as e:
+            ok, detail = False, f'校验出错: {e}'
+        seconds = time.perf_counter() - start
+        self.metrics.observe_stage(STAGE_INTEGRITY, seconds)
+        self._record(name, RESULT_PASSED if ok else RESULT_FAILED, method, detail, seconds)
+        if ok:
+            self.log(f"🧪 校验通过: {name}（{method}，{detail}，{seconds:.2f}秒）")
+        else:
+            self.log(f"❌ 校验失败: {name}（{method}）: {detail}")
+
+    def _record(self, name, status, method, detail, seconds):
+        self.metrics.incr(f'integrity_{status}_total')
+        with self._lock:
+            self.results.append({
+                'archive': name,
+                'status': status,
+                'method': method,
+                'detail': detail,
+                'seconds': round(seconds, 4),
+            })
+
+    def pending(self):
+        """尚未开始的校验数"""
+        return self._queue.qsize()
+
+    def cancel(self):
+        """停止处理时丢弃尚未开始的校验（正在运行的校验进程由runner一并结束）"""
+        self._stop.set()
+
+    def drain(self):
+        """等待所有已提交的校验完成并结束校验线程，返回 {状态: 数量}"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join()
+        counts = {}
+        for result in self.results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        return counts
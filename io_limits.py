@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按存储设备限制解压并发
+功能：按压缩包所在设备和解压目标设备（st_dev）分组，为每个设备设置并发上限和可选的带宽预算；
+机械硬盘默认只允许一个任务，固态硬盘允许多个，并根据实际吞吐量自动调整并发上限
+"""
+
+import os
+import sys
+import time
+import threading
+from collections import deque
+
+# 各类设备的初始并发上限和自动调整的最大值
+DEVICE_DEFAULTS = {
+    'hdd': {'jobs': 1, 'max_jobs': 2},
+    'ssd': {'jobs': 4, 'max_jobs': 16},
+    'unknown': {'jobs': 2, 'max_jobs': 8},
+}
+
+# 每完成多少个任务评估一次并发上限
+ADJUST_EVERY = 4
+
+# 计算设备吞吐量时使用的最近任务数
+WINDOW_JOBS = 8
+
+# 提高并发后吞吐量至少提升该比例才保留；吞吐量下降超过该比例时降低并发
+GAIN_THRESHOLD = 0.05
+DROP_THRESHOLD = 0.30
+
+
+def device_kind(dev):
+    """判断设备类型：hdd / ssd / unknown（仅Linux可以通过sysfs判断）"""
+    if not sys.platform.startswith('linux'):
+        return 'unknown'
+    block = f'/sys/dev/block/{os.major(dev)}:{os.minor(dev)}'
+    # 分区没有queue目录，需要查看所属的磁盘
+    for path in (os.path.join(block, 'queue', 'rotational'), os.path.join(block, '..', 'queue', 'rotational')):
+        try:
+            with open(path, 'r') as f:
+                return 'hdd' if f.read().strip() == '1' else 'ssd'
+        except OSError:
+            continue
+    return 'unknown'
+
+
+def device_name(dev):
+    if hasattr(os, 'major'):
+        return f'{os.major(dev)}:{os.minor(dev)}'
+    return str(dev)
+
+
+class DeviceBudget:
+    """单个设备的并发上限、带宽令牌桶和吞吐量统计"""
+
+    def __init__(self, dev, kind, jobs, max_jobs, bandwidth=None):
+        self.dev = dev
+        self.kind = kind
+        self.limit = jobs
+        self.max_limit = max(jobs, max_jobs)
+        self.bandwidth = bandwidth  # 字节/秒，None表示不限制
+        self.active = 0
+        self.tokens = 0.0
+        self.updated = time.monotonic()
+        self.history = deque(maxlen=WINDOW_JOBS)  # (开始时间, 结束时间, 字节数)
+        self.completed = 0
+        self.peak_active = 0
+        self._last_rate = None
+        self._last_limit = None
+
+    def _refill(self, now):
+        if self.bandwidth:
+            # 令牌最多积累1秒的预算
+            self.tokens = min(self.bandwidth, self.tokens + (now - self.updated) * self.bandwidth)
+        self.updated = now
+
+    def can_start(self, now):
+        self._refill(now)
+        if self.active >= self.limit:
+            return False
+        # 令牌可以透支：只要余额不为负就允许开始，开始时扣除整个任务的数据量
+        return not self.bandwidth or self.tokens >= 0
+
+    def start(self, num_bytes):
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        if self.bandwidth:
+            self.tokens -= num_bytes
+
+    def retry_after(self):
+        """带宽透支时需要等待的秒数"""
+        if self.bandwidth and self.tokens < 0:
+            return -self.tokens / self.bandwidth
+        return None
+
+    def finish(self, started, finished, num_bytes):
+        """记录一个任务完成，返回调整后的新并发上限（没有调整时返回None）"""
+        self.active -= 1
+        self.history.append((started, finished, num_bytes))
+        self.completed += 1
+        if self.completed % ADJUST_EVERY == 0:
+            return self._adjust()
+        return None
+
+    def rate(self):
+        """最近一批任务的总吞吐量（字节/秒）"""
+        if not self.history:
+            return 0.0
+        span = max(f for _, f, _ in self.history) - min(s for s, _, _ in self.history)
+        return sum(b for _, _, b in self.history) / span if span > 0 else 0.0
+
+    def _adjust(self):
+        # 爬山法：并发已用满时尝试加一，吞吐量没有明显提升就退回；吞吐量明显下降（磁盘抖动）时减一
+        rate = self.rate()
+        old_limit = self.limit
+        saturated = self.peak_active >= self.limit
+        if self._last_rate is None:
+            if saturated and self.limit < self.max_limit:
+                self.limit += 1
+        elif self.limit > self._last_limit:
+            if rate >= self._last_rate * (1 + GAIN_THRESHOLD):
+                if saturated and self.limit < self.max_limit:
+                    self.limit += 1
+            else:
+                self.limit = self._last_limit
+        elif rate < self._last_rate * (1 - DROP_THRESHOLD) and self.limit > 1:
+            self.limit -= 1
+        elif saturated and self.limit < self.max_limit and self.limit == self._last_limit:
+            self.limit += 1
+        self._last_rate, self._last_limit = rate, old_limit
+        self.peak_active = self.active
+        return self.limit if self.limit != old_limit else None
+
+
+class DeviceLimiter:
+    """为解压任务做准入控制：任务涉及的每个设备都有空闲名额和带宽预算时才能开始"""
+
+    def __init__(self, settings=None, log_callback=None):
+        settings = settings or {}
+        self.log_callback = log_callback
+        self.defaults = {kind: dict(values) for kind, values in DEVICE_DEFAULTS.items()}
+        for kind in self.defaults:
+            if f'{kind}_jobs' in settings:
+                self.defaults[kind]['jobs'] = int(settings[f'{kind}_jobs'])
+                self.defaults[kind]['max_jobs'] = max(self.defaults[kind]['max_jobs'], int(settings[f'{kind}_jobs']))
+        # 按路径指定的设备设置 {路径: {'max_jobs': n, 'bandwidth_mb': x}}，启动时换算为st_dev
+        self.overrides = {}
+        for path, values in settings.get('devices', {}).items():
+            try:
+                self.overrides[os.stat(path).st_dev] = values
+            except OSError:
+                self.log(f"⚠️ 设备设置中的路径不存在: {path}")
+        self.devices = {}
+        self._lock = threading.Lock()
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def _budget(self, dev):
+        budget = self.devices.get(dev)
+        if budget is None:
+            kind = device_kind(dev)
+            values = dict(self.defaults[kind])
+            override = self.overrides.get(dev, {})
+            if 'max_jobs' in override:
+                # 手动指定的上限不再自动调整
+                values['jobs'] = values['max_jobs'] = int(override['max_jobs'])
+            bandwidth = override.get('bandwidth_mb')
+            budget = DeviceBudget(dev, kind, values['jobs'], values['max_jobs'],
+                                  bandwidth * 1024 * 1024 if bandwidth else None)
+            self.devices[dev] = budget
+        return budget
+
+    @staticmethod
+    def _devices(job):
+        """任务的 (源设备, 目标设备)，结果缓存在任务上"""
+        if job.devices is None:
+            try:
+                source = os.stat(job.path).st_dev
+                target = os.stat(job.target or os.path.dirname(job.path)).st_dev
+            except OSError:
+                source = target = None
+            job.devices = (source, target)
+        return job.devices
+
+    def prepare(self, job):
+        """计算任务对各设备的数据量（源设备读取压缩包，目标设备写入解压后的数据），结果缓存在任务上
+
+        提交任务时调用（JobScheduler的prepare）：准入检查在调度器的锁内对每个排队任务进行，不能在那里访问文件系统
+        """
+        if job.charges is None:
+            source, target = self._devices(job)
+            try:
+                read_bytes = os.path.getsize(job.path)
+            except OSError:
+                read_bytes = 0
+            charges = {}
+            if source is not None:
+                charges[source] = charges.get(source, 0) + read_bytes
+            if target is not None:
+                charges[target] = charges.get(target, 0) + job.size
+            job.charges = charges
+        return job.charges
+
+    def try_acquire(self, job):
+        """设备有空闲名额时占用并返回True"""
+        charges = self.prepare(job)
+        now = time.monotonic()
+        with self._lock:
+            budgets = [(self._budget(dev), num_bytes) for dev, num_bytes in charges.items()]
+            if not all(budget.can_start(now) for budget, _ in budgets):
+                return False
+            for budget, num_bytes in budgets:
+                budget.start(num_bytes)
+        job.io_charges = charges
+        job.io_started = now
+        return True
+
+    def release(self, job):
+        """任务结束，更新吞吐量统计并自动调整并发上限"""
+        charges = job.io_charges
+        if not charges:
+            return
+        now = time.monotonic()
+        with self._lock:
+            changes = []
+            for dev, num_bytes in charges.items():
+                budget = self.devices[dev]
+                new_limit = budget.finish(job.io_started, now, num_bytes)
+                if new_limit is not None:
+                    changes.append((budget, new_limit))
+        job.io_charges = None
+        for budget, new_limit in changes:
+            self.log(f"💽 设备 {device_name(budget.dev)}（{budget.kind}）并发上限调整为 {new_limit}，"
+                     f"吞吐量 {budget.rate() / 1024 / 1024:.1f} MB/s")
+
+    def retry_after(self):
+        """所有候选任务都因带宽透支无法开始时，下次重试前等待的秒数"""
+        with self._lock:
+            waits = [w for w in (b.retry_after() for b in self.devices.values()) if w is not None]
+        return min(waits) if waits else None
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压任务调度
+功能：把就绪的解压任务按可配置的策略排序（最小优先、最浅层优先、先到先处理、按路径规则的优先级），
+等待时间超过上限的任务直接提到队首，保证大压缩包不会被小任务无限期推迟
+"""
+
+import time
+import heapq
+import fnmatch
+import itertools
+import threading
+from collections import deque
+
+# 调度策略
+POLICY_SJF = 'sjf'              # 解压后大小最小的优先（缩短大量小任务的平均等待时间）
+POLICY_SHALLOW = 'shallow'      # 目录层级最浅的优先
+POLICY_FIFO = 'fifo'            # 先发现的先处理
+POLICY_PRIORITY = 'priority'    # 按路径规则的优先级，相同优先级时小的优先
+SCHEDULE_POLICIES = (POLICY_SJF, POLICY_SHALLOW, POLICY_FIFO, POLICY_PRIORITY)
+
+DEFAULT_POLICY = POLICY_SJF
+
+# 任务等待超过该时间（秒）后不再参与排序，直接按到达顺序处理（防止饿死）
+DEFAULT_MAX_WAIT = 300
+
+
+class ExtractionJob:
+    """一个待解压的压缩包"""
+
+    def __init__(self, path, size, depth, context=None, target=None):
+        self.path = path
+        self.size = size          # 解压后大小（探测或估算）
+        self.depth = depth        # 相对于处理根目录的层级
+        self.context = context    # 调用方附带的状态（引擎用来记录所属文件夹）
+        self.target = target      # 解压目标目录
+        self.devices = None       # (源设备, 目标设备)，由设备限流填写
+        self.charges = None       # 各设备的数据量 {设备: 字节数}，提交时由设备限流计算
+        self.io_charges = None
+        self.io_started = None
+        self.seq = None
+        self.submitted_at = None
+        self.priority = 0
+        self.taken = False
+
+    def waited(self, now=None):
+        return (now or time.monotonic()) - self.submitted_at
+
+
+class JobScheduler:
+    """线程安全的解压任务队列，get()在队列为空且没有正在运行的任务时返回None"""
+
+    def __init__(self, policy=DEFAULT_POLICY, rules=None, max_wait=DEFAULT_MAX_WAIT, prepare=None):
+        if policy not in SCHEDULE_POLICIES:
+            raise ValueError(f"未知的调度策略: {policy}")
+        self.policy = policy
+        # 优先级规则 [{'pattern': 通配符, 'priority': 数字}, ...]，数字大的优先，第一条匹配的规则生效
+        self.rules = [(rule['pattern'], int(rule.get('priority', 0))) for rule in (rules or [])]
+        self.max_wait = max_wait
+        # 提交时在锁外调用 prepare(job)，准入检查需要的文件系统信息只在这里读取一次（准入检查在锁内进行）
+        self.prepare = prepare
+        self.running = 0
+        self.promoted = 0
+        self._heap = []
+        self._arrivals = deque()
+        self._queued = 0
+        self._seq = itertools.count()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def rule_priority(self, path):
+        normalized = path.replace('\\', '/')
+        for pattern, priority in self.rules:
+            if fnmatch.fnmatch(normalized, pattern):
+                return priority
+        return 0
+
+    def key(self, job):
+        """排序键（小的优先）"""
+        if self.policy == POLICY_SJF:
+            return (job.size,)
+        if self.policy == POLICY_SHALLOW:
+            return (job.depth, job.size)
+        if self.policy == POLICY_PRIORITY:
+            return (-job.priority, job.size)
+        return ()
+
+    def best(self, jobs):
+        """从同一文件夹的候选中选出最先处理的一个（候选按发现顺序排列）"""
+        for job in jobs:
+            job.priority = self.rule_priority(job.path)
+        return min(jobs, key=self.key)
+
+    def submit(self, job):
+        if self.prepare is not None:
+            self.prepare(job)
+        with self._cond:
+            job.seq = next(self._seq)
+            job.submitted_at = time.monotonic()
+            job.priority = self.rule_priority(job.path)
+            heapq.heappush(self._heap, (self.key(job), job.seq, job))
+            self._arrivals.append(job)
+            self._queued += 1
+            self._cond.notify()
+
+    def _take(self, admit):
+        """按顺序取出第一个被准入的任务，没有时返回None"""
+        # 等待最久的任务超过上限时优先处理
+        while self._arrivals and self._arrivals[0].taken:
+            self._arrivals.popleft()
+        if self._arrivals and self.max_wait is not None and self._arrivals[0].waited() > self.max_wait:
+            job = self._arrivals[0]
+            if admit is None or admit(job):
+                self._arrivals.popleft()
+                if self.policy != POLICY_FIFO:
+                    self.promoted += 1
+                return self._mark_taken(job)
+            # 超时任务的设备没有空闲名额时先处理其他设备上的任务
+        skipped = []
+        chosen = None
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            job = entry[2]
+            if job.taken:
+                continue
+            if admit is None or admit(job):
+                chosen = job
+                break
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return self._mark_taken(chosen) if chosen else None
+
+    def _mark_taken(self, job):
+        job.taken = True
+        self._queued -= 1
+        return job
+
+    def get(self, admit=None, retry_after=None):
+        """取出下一个任务；全部完成或已关闭时返回None
+
+        admit: 可选的准入回调，返回False的任务暂不开始（例如所在设备的并发已满）
+        retry_after: 可选回调，所有任务都未被准入时返回需要等待的秒数（None表示等到有任务结束）
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._queued:
+                    job = self._take(admit)
+                    if job is not None:
+                        self.running += 1
+                        return job
+                    self._cond.wait(retry_after() if retry_after else None)
+                    continue
+                if not self.running:
+                    return None
+                self._cond.wait()
+
+    def done(self, job):
+        """任务完成（其后续任务应在调用前提交）"""
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """停止调度，唤醒所有等待的工作线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def queued(self):
+        with self._cond:
+            return self._queued
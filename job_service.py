@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本机任务服务
+功能：让处理引擎作为本机服务运行，通过localhost HTTP或Unix套接字接收处理任务（文件夹+选项+优先级），
+所有任务进入同一个有界队列，由同一个引擎（同一组按设备限流的解压线程）依次处理，
+多个脚本或用户不再各自启动互相争抢磁盘的进程；可以查询任务状态、进度和结果，或取消任务
+
+接口（JSON）：
+    POST   /jobs        提交任务 {"folder": 路径, "has_password": false, "use_bandizip_wait": false, "priority": 0}
+    GET    /jobs        所有任务
+    GET    /jobs/<id>   任务状态、进度、结果和最近的日志
+    DELETE /jobs/<id>   取消任务（排队中的直接移除，运行中的停止处理）
+    GET    /status      服务状态
+
+POST请求必须带 Content-Type: application/json，Host必须是本机地址（防止网页通过跨站请求或DNS重绑定调用服务）
+"""
+
+import os
+import json
+import stat
+import errno
+import time
+import heapq
+import socket
+import itertools
+import threading
+import http.client
+import socketserver
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 队列中最多等待的任务数，超出后拒绝提交（HTTP 503）
+DEFAULT_MAX_QUEUE = 100
+
+# 已结束的任务最多保留的数量（更早的从状态列表中移除）
+MAX_FINISHED_JOBS = 200
+
+# 每个任务保留的最近日志行数
+JOB_LOG_LINES = 200
+
+# 请求体最大字节数
+MAX_REQUEST_BYTES = 64 * 1024
+
+# 允许的Host（另外允许服务实际监听的地址）
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1')
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATES = (JOB_SUCCEEDED, JOB_FAILED, JOB_CANCELLED)
+
+
+class ServiceError(Exception):
+    """提交或操作任务失败（status为对应的HTTP状态码）"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class ServiceJob:
+    """一个处理任务"""
+
+    def __init__(self, job_id, folder, has_password=False, use_bandizip_wait=False, priority=0):
+        self.job_id = job_id
+        self.folder = folder
+        self.has_password = has_password
+        self.use_bandizip_wait = use_bandizip_wait
+        self.priority = priority
+        self.state = JOB_QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = None
+        self.result = None
+        self.cancel_requested = False
+        self.logs = deque(maxlen=JOB_LOG_LINES)
+
+    def to_dict(self, with_logs=False):
+        data = {
+            'id': self.job_id,
+            'folder': self.folder,
+            'has_password': self.has_password,
+            'use_bandizip_wait': self.use_bandizip_wait,
+            'priority': self.priority,
+            'state': self.state,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress': self.progress,
+            'result': self.result,
+        }
+        if with_logs:
+            data['logs'] = list(self.logs)
+        return data
+
+
+class JobService:
+    """任务队列和处理线程：同一时间只运行一个任务，任务内部的并发由引擎的解压线程和设备限流决定"""
+
+    def __init__(self, engine, max_queue=DEFAULT_MAX_QUEUE):
+        self.engine = engine
+        self.max_queue = max_queue
+        self.jobs = {}
+        self.current = None
+        self._queue = []  # (-优先级, 序号, 任务)
+        self._seq = itertools.count(1)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        # 引擎的日志和进度同时记录到当前任务
+        self._engine_log = engine.log_callback
+        self._engine_progress = engine.progress_callback
+        engine.log_callback = self._on_log
+        engine.progress_callback = self._on_progress
+
+    def log(self, message):
+        self._engine_log(message)
+
+    def _on_log(self, message):
+        job = self.current
+        if job is not None:
+            job.logs.append(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {message}")
+        self._engine_log(message)
+
+    def _on_progress(self, snapshot):
+        job = self.current
+        if job is not None:
+            job.progress = snapshot
+        if self._engine_progress:
+            self._engine_progress(snapshot)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='job-service', daemon=True)
+        self._thread.start()
+
+    def submit(self, options):
+        """提交任务，返回任务；参数错误或队列已满时抛出ServiceError"""
+        if not isinstance(options, dict):
+            raise ServiceError("请求内容必须是JSON对象")
+        folder = options.get('folder')
+        if not isinstance(folder, str) or not folder:
+            raise ServiceError("缺少folder")
+        folder = os.path.abspath(os.path.expanduser(folder))
+        if not os.path.isdir(folder):
+            raise ServiceError(f"文件夹不存在: {folder}", 404)
+        try:
+            priority = int(options.get('priority', 0))
+        except (TypeError, ValueError):
+            raise ServiceError("priority必须是整数")
+        with self._cond:
+            if self._stopped:
+                raise ServiceError("服务正在停止", 503)
+            if len(self._queue) >= self.max_queue:
+                raise ServiceError(f"队列已满（{self.max_queue}个任务），请稍后再试", 503)
+            job = ServiceJob(str(next(self._seq)), folder, bool(options.get('has_password', False)),
+                             bool(options.get('use_bandizip_wait', False)), priority)
+            self.jobs[job.job_id] = job
+            heapq.heappush(self._queue, (-priority, int(job.job_id), job))
+            self._cond.notify()
+        self.log(f"📨 收到任务 #{job.job_id}: {folder}（优先级 {priority}，排队 {len(self._queue)} 个）")
+        return job
+
+    def get(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is None:
+            raise ServiceError(f"任务不存在: {job_id}", 404)
+        return job
+
+    def cancel(self, job_id):
+        """取消任务：排队中的直接移除，运行中的请求引擎停止"""
+        with self._cond:
+            job = self.get(job_id)
+            if job.state == JOB_QUEUED:
+                self._queue = [entry for entry in self._queue if entry[2] is not job]
+                heapq.heapify(self._queue)
+                self._finish(job, JOB_CANCELLED)
+                self.log(f"🚫 任务 #{job_id} 已取消")
+                return job
+            # 持有锁时确认该任务仍在运行，下一个任务不会在此期间开始，停止请求不会落到它上面
+            if job.state == JOB_RUNNING and self.current is job and not job.cancel_requested:
+                job.cancel_requested = True
+                self.log(f"🚫 正在停止任务 #{job_id}...")
+                self.engine.request_stop()
+        return job
+
+    def list_jobs(self):
+        with self._cond:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def status(self):
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'max_queue': self.max_queue,
+                'running': self.current.job_id if self.current else None,
+                'jobs': len(self.jobs),
+                'workers': self.engine.workers,
+                'backends': sorted(self.engine.backends),
+            }
+
+    def _finish(self, job, state):
+        job.state = state
+        job.finished_at = time.time()
+        # 只保留最近的已结束任务
+        finished = [j for j in self.jobs.values() if j.state in FINISHED_STATES]
+        for old in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[old.job_id]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job = heapq.heappop(self._queue)[2]
+                job.state = JOB_RUNNING
+                job.started_at = time.time()
+                self.current = job
+            self.log(f"▶️ 开始任务 #{job.job_id}: {job.folder}")
+            self.engine.has_password = job.has_password
+            self.engine.use_bandizip_wait = job.use_bandizip_wait
+            try:
+                # 取消请求可能在引擎重置停止标志之前到达：引擎重置后再检查一次，已取消时不开始处理
+                result = self.engine.process_folder(job.folder, cancelled=lambda: job.cancel_requested)
+            except Exception as e:
+                result = {'folder': job.folder, 'stopped': False, 'error': str(e), 'succeeded': 0, 'failed': 0}
+            with self._cond:
+                self.current = None
+                job.result = result
+                if result['stopped'] or job.cancel_requested:
+                    state = JOB_CANCELLED
+                elif result['error'] or result['failed'] or result.get('integrity_failed'):
+                    state = JOB_FAILED
+                else:
+                    state = JOB_SUCCEEDED
+                self._finish(job, state)
+            self.log(f"⏹️ 任务 #{job.job_id} 结束: {state}（成功 {result['succeeded']} 个, 失败 {result['failed']} 个）")
+
+    def stop(self):
+        """停止服务：不再接收任务，停止正在运行的任务"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self.engine.request_stop()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'ButterUnpacker'
+
+    def log_message(self, format, *args):
+        # 请求日志不输出（Unix套接字没有客户端地址）
+        pass
+
+    def _reply(self, status, data, headers=None):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _check_origin(self, method):
+        """只接受发往本机地址的请求；提交任务必须是JSON（网页的简单跨站请求不能设置该类型）"""
+        host = (self.headers.get('Host') or '').strip().lower()
+        if host.startswith('['):
+            host = host[1:host.find(']')]
+        elif host.count(':') == 1:
+            host = host.split(':')[0]
+        address = self.server.server_address
+        listening = str(address[0]).lower() if isinstance(address, tuple) else None
+        if host not in LOCAL_HOSTS and host != listening:
+            raise ServiceError(f"不允许的Host: {host or '(空)'}", 403)
+        if method == 'POST':
+            content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+            if content_type != 'application/json':
+                raise ServiceError("Content-Type必须是application/json", 415)
+
+    def _route(self, method):
+        service = self.server.service
+        parts = [p for p in self.path.split('?')[0].split('/') if p]
+        try:
+            self._check_origin(method)
+            if parts == ['status'] and method == 'GET':
+                return self._reply(200, service.status())
+            if parts == ['jobs'] and method == 'GET':
+                return self._reply(200, service.list_jobs())
+            if parts == ['jobs'] and method == 'POST':
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    raise ServiceError("无效的Content-Length")
+                if length < 0:
+                    raise ServiceError("无效的Content-Length")
+                if length > MAX_REQUEST_BYTES:
+                    raise ServiceError("请求内容过大", 413)
+                try:
+                    options = json.loads(self.rfile.read(length) or b'{}')
+                except ValueError:
+                    raise ServiceError("请求内容不是有效的JSON")
+                return self._reply(201, service.submit(options).to_dict())
+            if len(parts) == 2 and parts[0] == 'jobs':
+                if method == 'GET':
+                    return self._reply(200, service.get(parts[1]).to_dict(with_logs=True))
+                if method == 'DELETE':
+                    return self._reply(200, service.cancel(parts[1]).to_dict())
+            raise ServiceError(f"不支持的请求: {method} {self.path}", 404)
+        except ServiceError as e:
+            headers = {'Retry-After': '5'} if e.status == 503 else None
+            return self._reply(e.status, {'error': str(e)}, headers)
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_DELETE(self):
+        self._route('DELETE')
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler需要 (主机, 端口) 形式的客户端地址
+        return request, ('local', 0)
+
+
+def create_server(service, host='127.0.0.1', port=8765, socket_path=None):
+    """创建HTTP服务（指定socket_path时监听Unix套接字）"""
+    if socket_path:
+        try:
+            mode = os.lstat(socket_path).st_mode
+        except FileNotFoundError:
+            mode = None
+        if mode is not None:
+            # 只删除上次运行遗留的套接字，不删除同名的普通文件
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(errno.EEXIST, "路径已存在且不是套接字", socket_path)
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _Handler)
+    else:
+        server = ThreadingHTTPServer((host, port), _Handler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    """任务服务的客户端，address为 主机:端口 或Unix套接字路径"""
+
+    def __init__(self, address):
+        self.address = address
+
+    def _connection(self):
+        if os.sep in self.address or self.address.endswith('.sock'):
+            return _UnixHTTPConnection(self.address)
+        host, _, port = self.address.rpartition(':')
+        return http.client.HTTPConnection(host or '127.0.0.1', int(port), timeout=30)
+
+    def request(self, method, path, data=None):
+        """发送请求，返回 (状态码, JSON内容)"""
+        conn = self._connection()
+        try:
+            body = json.dumps(data).encode('utf-8') if data is not None else None
+            headers = {'Content-Type': 'application/json'} if body else {}
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read() or b'null')
+        finally:
+            conn.close()
+
+    def submit(self, folder, has_password=False, use_bandizip_wait=False, priority=0):
+        return self.request('POST', '/jobs', {
+            'folder': os.path.abspath(folder),
+            'has_password': has_password,
+            'use_bandizip_wait': use_bandizip_wait,
+            'priority': priority,
+        })
+
+    def job(self, job_id):
+        return self.request('GET', f'/jobs/{job_id}')
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点分片处理
+功能：多台主机处理同一个共享目录（NAS）时，通过共享目录中的租约文件分配文件夹：
+每个含有压缩包的文件夹由第一个原子创建租约文件（O_EXCL）的节点处理，持有期间定期更新心跳（文件修改时间），
+处理完成后写入完成标记；节点退出或卡死后租约过期，其他节点接管该文件夹；
+其他节点的文件夹完成后，本节点参与争抢其中新出现的子文件夹，使工作量在节点之间自动均衡
+
+租约文件放在 <根目录>/.butter_leases（可指定其他共享目录），文件名是文件夹相对路径的哈希，
+因此各主机可以把共享目录挂载到不同的路径
+"""
+
+import os
+import json
+import time
+import errno
+import socket
+import hashlib
+import threading
+
+# 租约目录名（处理时跳过该目录）
+LEASE_DIR_NAME = '.butter_leases'
+
+# 租约超过该时间（秒）没有心跳视为过期
+DEFAULT_LEASE_TTL = 60.0
+
+# 等待其他节点的文件夹完成时的检查间隔（秒）
+POLL_INTERVAL = 2.0
+
+# 租约状态
+LEASE_ACQUIRED = 'acquired'  # 本节点获得租约
+LEASE_HELD = 'held'          # 其他节点正在处理
+LEASE_DONE = 'done'          # 已被处理完成（文件夹此后没有变化）
+
+
+def default_node_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseCoordinator:
+    """通过租约文件协调多个节点（线程安全）"""
+
+    def __init__(self, root, lease_dir=None, ttl=DEFAULT_LEASE_TTL, node_id=None, log_callback=None):
+        self.root = os.path.abspath(root)
+        self.lease_dir = os.path.abspath(lease_dir) if lease_dir else os.path.join(self.root, LEASE_DIR_NAME)
+        self.ttl = float(ttl)
+        # 心跳间隔取过期时间的1/4，网络抖动或短暂卡顿不会导致租约被接管
+        self.heartbeat_interval = self.ttl / 4
+        self.node_id = node_id or default_node_id()
+        # 本节点临时文件名中使用的标识
+        self._node_tag = hashlib.sha1(self.node_id.encode('utf-8')).hexdigest()[:12]
+        self.log_callback = log_callback
+        # 租约被其他节点接管时调用 on_lost(文件夹)（在心跳线程中），调用方应停止处理该文件夹
+        self.on_lost = None
+        self.held = {}      # 文件夹 -> (租约文件路径, 租约标识(节点, 获得时间))
+        self.deferred = {}  # 其他节点正在处理的文件夹 -> 层级
+        self.stolen = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(self.lease_dir, exist_ok=True)
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def is_lease_dir(self, path):
+        return os.path.abspath(path) == self.lease_dir
+
+    def _key(self, folder):
+        relative = os.path.relpath(os.path.abspath(folder), self.root).replace(os.sep, '/')
+        return hashlib.sha1(relative.encode('utf-8')).hexdigest()
+
+    def _paths(self, folder):
+        key = self._key(folder)
+        return os.path.join(self.lease_dir, key + '.lease'), os.path.join(self.lease_dir, key + '.done')
+
+    @staticmethod
+    def _folder_mtime(folder):
+        try:
+            return os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def _is_done(self, folder, done_path):
+        """完成标记存在且文件夹此后没有变化（新放入的文件会改变文件夹修改时间）"""
+        try:
+            with open(done_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return record.get('mtime_ns') == self._folder_mtime(folder)
+
+    def _create(self, lease_path, folder):
+        """原子创建租约文件，返回租约标识 (节点, 获得时间)，已存在时返回None"""
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except OSError as e:
+            if e.errno == errno.EEXIST:
+                return None
+            raise
+        token = (self.node_id, time.time())
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'node': token[0], 'folder': os.path.relpath(folder, self.root),
+                       'acquired_at': token[1]}, f, ensure_ascii=False)
+        return token
+
+    def _lease_state(self, lease_path):
+        """租约的 (节点, 获得时间, 心跳时间)，用于确认改名前后是同一份租约；不存在时返回None"""
+        try:
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                st = os.fstat(f.fileno())
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # 刚创建还没写入内容的租约
+            record = {}
+            try:
+                st = os.stat(lease_path)
+            except OSError:
+                return None
+        return record.get('node', '?'), record.get('acquired_at'), st.st_mtime_ns
+
+    def _expired(self, state):
+        """租约是否过期（心跳时间是文件修改时间，由NAS服务器设置，不受各主机时钟偏差影响）"""
+        if state is None:
+            return False
+        return self._server_now() - state[2] / 1e9 > self.ttl
+
+    def _server_now(self):
+        """共享目录所在服务器的当前时间（更新本节点时钟文件的修改时间后读取）"""
+        probe = os.path.join(self.lease_dir, f'.clock.{self._node_tag}')
+        with open(probe, 'a'):
+            pass
+        os.utime(probe, None)
+        return os.stat(probe).st_mtime
+
+    def claim(self, folder, depth=0):
+        """尝试获得文件夹的租约，返回 LEASE_ACQUIRED / LEASE_HELD / LEASE_DONE"""
+        folder = os.path.abspath(folder)
+        lease_path, done_path = self._paths(folder)
+        if self._is_done(folder, done_path):
+            return LEASE_DONE
+        token = self._create(lease_path, folder)
+        if token is None:
+            state = self._lease_state(lease_path)
+            token = self._take_over(lease_path, folder, state) if self._expired(state) else None
+            if token is None:
+                with self._lock:
+                    self.deferred[folder] = depth
+                return LEASE_HELD
+            self.stolen += 1
+            self.log(f"🔁 接管过期租约: {os.path.relpath(folder, self.root)}（原节点 {state[0]}）")
+        with self._lock:
+            self.held[folder] = (lease_path, token)
+            self.deferred.pop(folder, None)
+        return LEASE_ACQUIRED
+
+    def _take_over(self, lease_path, folder, state):
+        """接管判定为过期的租约state，成功返回新租约的标识，否则返回None
+
+        先把租约原子改名为本节点专用的文件名（只有一个节点能改名成功），再确认改走的正是判定过期的那份租约：
+        判定之后原节点可能更新了心跳，或者其他节点已经接管并写入了新租约，这时把它改回原名并放弃接管
+        """
+        stale_path = f'{lease_path}.stale.{self._node_tag}'
+        try:
+            os.rename(lease_path, stale_path)
+        except OSError:
+            return None
+        if self._lease_state(stale_path) != state:
+            self._restore(stale_path, lease_path)
+            self.log(f"🔁 租约已被原节点或其他节点更新，放弃接管: {os.path.relpath(folder, self.root)}")
+            return None
+        try:
+            os.unlink(stale_path)
+        except OSError:
+            pass
+        return self._create(lease_path, folder)
+
+    def _restore(self, stale_path, lease_path):
+        """把误改名的有效租约改回原名（不覆盖这期间新创建的租约）"""
+        try:
+            os.link(stale_path, lease_path)
+        except FileExistsError:
+            pass
+        except OSError:
+            # 不支持硬链接的文件系统
+            try:
+                os.rename(stale_path, lease_path)
+                return
+            except OSError:
+                pass
+        try:
+            os.unlink(stale_path)
+        except OSError:
+            pass
+
+    def release(self, folder, done=True):
+        """释放租约，done为True时写入完成标记"""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            held = self.held.pop(folder, None)
+        if held is None:
+            return
+        lease_path, token = held
+        if done:
+            _, done_path = self._paths(folder)
+            tmp_path = f'{done_path}.{self._node_tag}.tmp'
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({'node': self.node_id, 'folder': os.path.relpath(folder, self.root),
+                               'mtime_ns': self._folder_mtime(folder), 'finished_at': time.time()}, f,
+                              ensure_ascii=False)
+                os.replace(tmp_path, done_path)
+            except OSError as e:
+                self.log(f"⚠️ 无法写入完成标记: {e}")
+        if self._owner_token(lease_path) == token:
+            try:
+                os.unlink(lease_path)
+            except OSError:
+                pass
+
+    def owns(self, folder):
+        """本节点是否仍持有文件夹的租约（被其他节点接管后心跳会发现并移除）"""
+        with self._lock:
+            return os.path.abspath(folder) in self.held
+
+    @staticmethod
+    def _owner_token(lease_path):
+        """当前租约文件的标识 (节点, 获得时间)，无法读取时返回None"""
+        try:
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return record.get('node'), record.get('acquired_at')
+
+    def poll_deferred(self):
+        """检查其他节点持有的文件夹，返回 (已完成的文件夹, 租约已过期可以接管的文件夹)，均为 [(文件夹, 层级)]"""
+        with self._lock:
+            deferred = list(self.deferred.items())
+        finished, expired = [], []
+        for folder, depth in deferred:
+            lease_path, done_path = self._paths(folder)
+            if self._is_done(folder, done_path) or not os.path.exists(folder):
+                finished.append((folder, depth))
+            elif not os.path.exists(lease_path) or self._expired(self._lease_state(lease_path)):
+                expired.append((folder, depth))
+            else:
+                continue
+            with self._lock:
+                self.deferred.pop(folder, None)
+        return finished, expired
+
+    def has_deferred(self):
+        with self._lock:
+            return bool(self.deferred)
+
+    def start_heartbeat(self):
+        self._thread = threading.Thread(target=self._heartbeat_loop, name='lease-heartbeat', daemon=True)
+        self._thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                held = list(self.held.items())
+            for folder, (lease_path, token) in held:
+                if self._renew(lease_path, token):
+                    continue
+                self.log(f"⚠️ 租约已丢失（已被其他节点接管）: {os.path.relpath(folder, self.root)}，停止处理该文件夹")
+                with self._lock:
+                    self.held.pop(folder, None)
+                if self.on_lost is not None:
+                    self.on_lost(folder)
+
+    def _renew(self, lease_path, token):
+        """更新心跳，租约文件已不是本节点创建的那一份时返回False
+
+        接管会把原租约改名后在同一路径创建新租约，只按路径更新修改时间会替接管的节点续期；
+        先从打开的文件中确认租约标识，再通过同一个文件描述符更新修改时间（不支持时按路径）
+        """
+        try:
+            with open(lease_path, 'r', encoding='utf-8') as f:
+                try:
+                    record = json.load(f)
+                except ValueError:
+                    return False
+                if (record.get('node'), record.get('acquired_at')) != token:
+                    return False
+                if os.utime in os.supports_fd:
+                    os.utime(f.fileno(), None)
+                else:
+                    os.utime(lease_path, None)
+        except OSError:
+            return False
+        return True
+
+    def close(self):
+        """停止心跳并释放所有未完成的租约（不写完成标记，其他节点可以立即接管）"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        with self._lock:
+            folders = list(self.held)
+        for folder in folders:
+            self.release(folder, done=False)
+        try:
+            os.unlink(os.path.join(self.lease_dir, f'.clock.{self._node_tag}'))
+        except OSError:
+            pass
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内置解压程序（Python标准库实现）
+功能：用zipfile/tarfile解压zip和tar系列格式，命令行参数与Bandizip一致，
+作为没有安装其他解压程序时的后备，也方便在Linux上直接运行
+
+未压缩的zip条目（stored）和未压缩tar中的文件直接在内核中从压缩包复制到目标文件（copy_file_range/sendfile，
+不支持时用mmap），不经过Python的读写循环；已知大小的文件先预分配磁盘空间，减少大文件的碎片
+
+用法：
+    python native_extractor.py x [-p:密码] -o:目标目录 [-y] [-aoa] 压缩包
+
+输出：
+    PROGRESS <已解压字节数> <总字节数>
+    DONE <条目名称>（每个文件完整写出并关闭后输出，供调用方提前处理已写出的文件）
+    Everything is Ok / Wrong password / CRC Failed / Data Error / Cannot open
+
+退出码（与7-Zip一致）：0 成功，2 出错，7 参数错误
+"""
+
+import os
+import sys
+import mmap
+import time
+import zlib
+import errno
+import struct
+import tarfile
+import zipfile
+
+EXIT_OK = 0
+EXIT_FATAL = 2
+EXIT_USAGE = 7
+
+# 读写缓冲区大小
+COPY_BUFFER = 1024 * 1024
+
+# 内核复制每次调用的最大字节数（同时决定进度更新的粒度）
+ZERO_COPY_CHUNK = 64 * 1024 * 1024
+
+# 小于该大小的文件不预分配（系统调用的开销大于收益）
+PREALLOCATE_MIN = 1024 * 1024
+
+# 进度输出的最小间隔（秒）
+PROGRESS_INTERVAL = 0.5
+
+# 支持的格式（扩展名 -> tarfile打开模式，zip单独处理）
+TAR_MODES = [
+    ('.tar.gz', 'r:gz'), ('.tgz', 'r:gz'),
+    ('.tar.bz2', 'r:bz2'), ('.tar.xz', 'r:xz'),
+    ('.tar', 'r:'),
+]
+
+
+class Progress:
+    """按时间节流输出解压进度"""
+
+    def __init__(self, total):
+        self.total = total
+        self.done = 0
+        self._last = 0.0
+
+    def add(self, num_bytes):
+        self.done += num_bytes
+        now = time.monotonic()
+        if now - self._last >= PROGRESS_INTERVAL:
+            self._last = now
+            self.emit()
+
+    def emit(self):
+        print(f"PROGRESS {self.done} {self.total}", flush=True)
+
+
+def _copy_stream(src, dst, progress):
+    while True:
+        chunk = src.read(COPY_BUFFER)
+        if not chunk:
+            break
+        dst.write(chunk)
+        progress.add(len(chunk))
+
+
+def _preallocate(dst, size):
+    """按条目大小预分配磁盘空间（文件系统不支持时忽略）"""
+    if size < PREALLOCATE_MIN or not hasattr(os, 'posix_fallocate'):
+        return
+    try:
+        os.posix_fallocate(dst.fileno(), 0, size)
+    except OSError:
+        pass
+
+
+# zip本地文件头中文件名长度和扩展字段长度的位置（zipfile.structFileHeader的字段序号）
+_FH_FILENAME_LENGTH = 10
+_FH_EXTRA_FIELD_LENGTH = 11
+
+# 当前可用的内核复制方式（第一次失败后换下一种，进程内记住结果）
+_copy_methods = ['copy_file_range', 'sendfile']
+# 内核复制不支持时回退的错误
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EBADF, getattr(errno, 'EOPNOTSUPP', errno.EINVAL)}
+
+
+def _kernel_copy(src_fd, offset, dst_fd, count):
+    """从源文件的offset处复制最多count字节到目标文件当前位置，返回复制的字节数，都不支持时返回None"""
+    while _copy_methods:
+        method = _copy_methods[0]
+        try:
+            if method == 'copy_file_range' and hasattr(os, 'copy_file_range'):
+                return os.copy_file_range(src_fd, dst_fd, count, offset_src=offset)
+            if method == 'sendfile' and hasattr(os, 'sendfile') and sys.platform.startswith('linux'):
+                return os.sendfile(dst_fd, src_fd, offset, count)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS:
+                raise
+        _copy_methods.pop(0)
+    return None
+
+
+def _copy_range(src, offset, length, dst, progress):
+    """把压缩包中 [offset, offset+length) 的数据原样复制到目标文件"""
+    dst.flush()
+    copied = 0
+    src_map = view = None
+    try:
+        while copied < length:
+            count = min(ZERO_COPY_CHUNK, length - copied)
+            if view is None:
+                done = _kernel_copy(src.fileno(), offset + copied, dst.fileno(), count)
+                if done is None:
+                    # 没有可用的内核复制方式：映射压缩包，直接写出映射的切片
+                    src_map = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+                    view = memoryview(src_map)
+            if view is not None:
+                done = os.write(dst.fileno(), view[offset + copied:offset + copied + count])
+            if not done:
+                raise EOFError('压缩包数据不完整')
+            copied += done
+            progress.add(done)
+    finally:
+        if view is not None:
+            view.release()
+            src_map.close()
+
+
+def _file_crc32(path):
+    """计算已写出文件的CRC-32（读入复用的缓冲区，由zlib计算）"""
+    crc = 0
+    buffer = bytearray(COPY_BUFFER * 8)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            count = f.readinto(buffer)
+            if not count:
+                return crc
+            crc = zlib.crc32(view[:count], crc)
+
+
+def _stored_data_offset(raw, entry):
+    """未压缩zip条目数据在压缩包中的偏移（读取本地文件头，其中的扩展字段长度可能与中央目录不同）"""
+    raw.seek(entry.header_offset)
+    header = raw.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"Bad magic number for file header: {entry.filename}")
+    fields = struct.unpack(zipfile.structFileHeader, header)
+    return entry.header_offset + zipfile.sizeFileHeader + fields[_FH_FILENAME_LENGTH] + fields[_FH_EXTRA_FIELD_LENGTH]
+
+
+def _entry_done(name):
+    print(f"DONE {name}", flush=True)
+
+
+def _safe_target(extract_to, name):
+    """计算条目的目标路径，拒绝绝对路径和跳出目标目录的路径"""
+    target = os.path.realpath(os.path.join(extract_to, name))
+    root = os.path.realpath(extract_to)
+    if target != root and not target.startswith(root + os.sep):
+        raise ValueError(f"非法路径: {name}")
+    return target
+
+
+def extract_zip(archive_path, extract_to, password):
+    with zipfile.ZipFile(archive_path) as zf, open(archive_path, 'rb') as raw:
+        entries = zf.infolist()
+        progress = Progress(sum(e.file_size for e in entries))
+        pwd = password.encode('utf-8') if password else None
+        for entry in entries:
+            target = _safe_target(extract_to, entry.filename)
+            if entry.is_dir():
+                os.makedirs(target, exist_ok=True)
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            stored = entry.compress_type == zipfile.ZIP_STORED and not entry.flag_bits & 0x1
+            with open(target, 'wb') as dst:
+                _preallocate(dst, entry.file_size)
+                if stored:
+                    # 未压缩的条目直接复制原始数据，写出后由zlib校验CRC-32
+                    _copy_range(raw, _stored_data_offset(raw, entry), entry.file_size, dst, progress)
+                else:
+                    with zf.open(entry, pwd=pwd) as src:
+                        _copy_stream(src, dst, progress)
+            if stored and _file_crc32(target) != entry.CRC:
+                raise zipfile.BadZipFile(f"Bad CRC-32 for file {entry.filename!r}")
+            _entry_done(entry.filename)
+        progress.emit()
+
+
+def extract_tar(archive_path, extract_to, mode):
+    with tarfile.open(archive_path, mode) as tf, open(archive_path, 'rb') as raw:
+        members = tf.getmembers()
+        progress = Progress(sum(m.size for m in members if m.isfile()))
+        # 未压缩的tar中文件数据连续存放在offset_data处，可以直接复制
+        plain = mode == 'r:'
+        for member in members:
+            target = _safe_target(extract_to, member.name)
+            if member.isdir():
+                os.makedirs(target, exist_ok=True)
+            elif member.isfile():
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                with open(target, 'wb') as dst:
+                    _preallocate(dst, member.size)
+                    if plain and not member.issparse():
+                        _copy_range(raw, member.offset_data, member.size, dst, progress)
+                    else:
+                        with tf.extractfile(member) as src:
+                            _copy_stream(src, dst, progress)
+                _entry_done(member.name)
+            # 链接和设备文件不解压，避免写到目标目录之外
+        progress.emit()
+
+
+def extract(archive_path, extract_to, password=''):
+    """解压压缩包，返回退出码"""
+    lower = archive_path.lower()
+    os.makedirs(extract_to, exist_ok=True)
+    try:
+        if lower.endswith('.zip'):
+            extract_zip(archive_path, extract_to, password)
+        else:
+            for ext, mode in TAR_MODES:
+                if lower.endswith(ext):
+                    extract_tar(archive_path, extract_to, mode)
+                    break
+            else:
+                print(f"Cannot open the file as archive: {archive_path}", file=sys.stderr)
+                return EXIT_FATAL
+    except RuntimeError as e:
+        # zipfile对加密条目缺少或使用错误密码时抛出RuntimeError
+        print(f"Wrong password : {e}", file=sys.stderr)
+        return EXIT_FATAL
+    except zipfile.BadZipFile as e:
+        message = str(e)
+        if 'CRC' in message:
+            print(f"CRC Failed : {message}", file=sys.stderr)
+        else:
+            print(f"Data Error : {message}", file=sys.stderr)
+        return EXIT_FATAL
+    except (tarfile.TarError, EOFError, OSError, ValueError) as e:
+        print(f"Data Error : {e}", file=sys.stderr)
+        return EXIT_FATAL
+    print("Everything is Ok", flush=True)
+    return EXIT_OK
+
+
+def parse_args(argv):
+    """解析Bandizip风格的参数，返回 (压缩包, 目标目录, 密码)"""
+    if not argv or argv[0] != 'x':
+        return None
+    password = ''
+    extract_to = None
+    archive_path = None
+    for arg in argv[1:]:
+        if arg.startswith('-p:'):
+            password = arg[3:]
+        elif arg.startswith('-o:'):
+            extract_to = arg[3:]
+        elif arg in ('-y', '-aoa'):
+            continue
+        elif arg.startswith('-'):
+            return None
+        else:
+            archive_path = arg
+    if not archive_path:
+        return None
+    return archive_path, extract_to or os.path.dirname(os.path.abspath(archive_path)), password
+
+
+def main(argv=None):
+    parsed = parse_args(sys.argv[1:] if argv is None else argv)
+    if parsed is None:
+        print(__doc__, file=sys.stderr)
+        return EXIT_USAGE
+    archive_path, extract_to, password = parsed
+    return extract(archive_path, extract_to, password)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
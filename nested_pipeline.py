@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+嵌套压缩包流水线解压
+功能：外层压缩包解压过程中，解压程序报告某个条目已完整写出（内置解压程序输出 DONE <条目>）时，
+如果该条目是下一轮处理本来就会解压的内层压缩包（按外层压缩包的条目列表预先判断），立即把它交给调度器，
+内层压缩包的解压与外层压缩包剩余部分的解压同时进行，不必等外层全部完成后再重新扫描
+
+外层压缩包的一次尝试失败时（密码错误、文件损坏），尚未开始的内层任务被取消，正在运行的等待其结束，
+之后的尝试不再使用流水线（重新写出的条目会覆盖正在读取的文件），剩下的内层压缩包由下一轮正常处理
+"""
+
+import os
+import threading
+
+
+class PipelinedEntry:
+    """一个提前提交的内层压缩包（作为解压任务的context）"""
+
+    def __init__(self, owner, kind):
+        self.owner = owner      # 外层压缩包所在文件夹的处理状态
+        self.kind = kind        # 'normal' / 'malformed'
+        self.started = False
+        self.cancelled = False
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """工作线程开始执行前调用，已取消时返回False"""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self.started = True
+            return True
+
+    def cancel(self):
+        """取消尚未开始的任务，已开始时返回False"""
+        with self._lock:
+            if self.started:
+                return False
+            self.cancelled = True
+            return True
+
+
+class NestedPipeline:
+    """一次外层解压的流水线：plan为 {条目相对路径: 类型}，submit(路径, 类型) 提交任务并返回PipelinedEntry"""
+
+    def __init__(self, extract_to, plan, submit):
+        self.extract_to = extract_to
+        self.plan = {_normalize(name): kind for name, kind in plan.items()}
+        self.submit = submit
+        self.entries = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.plan)
+
+    def on_entry_done(self, name):
+        """解压程序报告条目已写出"""
+        with self._lock:
+            kind = self.plan.pop(_normalize(name), None)
+        if kind is None:
+            return
+        path = os.path.join(self.extract_to, *_normalize(name).split('/'))
+        entry = self.submit(path, kind)
+        if entry is not None:
+            with self._lock:
+                self.entries.append(entry)
+
+    def abort(self):
+        """外层的本次尝试失败：停止提交，取消未开始的任务并等待已开始的任务结束，返回取消的数量"""
+        with self._lock:
+            self.plan = {}
+            entries, self.entries = self.entries, []
+        cancelled = 0
+        for entry in entries:
+            if entry.cancel():
+                cancelled += 1
+            else:
+                entry.finished.wait()
+        return cancelled
+
+
+def _normalize(name):
+    return name.replace('\\', '/').strip('/')
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+密码字典
+功能：管理配置文件中的常用密码列表，并可引用外部密码字典文件（每行一个密码，可达数百万行）。
+字典文件按行流式读取（mmap），不整体加载到内存；去重使用紧凑的64位哈希索引，
+常用密码总是最先尝试，然后依次尝试各个字典文件
+"""
+
+import os
+import json
+import mmap
+from array import array
+
+# 哈希索引的初始容量（槽位数，必须是2的幂）
+INITIAL_INDEX_SLOTS = 1024
+
+# 哈希索引的最大装填率，超过后容量翻倍
+MAX_LOAD_FACTOR = 0.7
+
+# 统计字典行数时每次读取的字节数
+COUNT_CHUNK_SIZE = 4 * 1024 * 1024
+
+_HASH_MASK = (1 << 64) - 1
+
+
+class SeenIndex:
+    """只保存64位哈希值的开放寻址集合，每个条目8字节（Python的set每个字符串约需100字节）
+
+    64位哈希在千万级条目下发生碰撞的概率约为十亿分之几，碰撞只会导致跳过一个候选密码
+    """
+
+    def __init__(self, expected=0):
+        slots = INITIAL_INDEX_SLOTS
+        while slots * MAX_LOAD_FACTOR < expected:
+            slots *= 2
+        self._slots = array('Q', bytes(8 * slots))
+        self._mask = slots - 1
+        self.count = 0
+
+    @staticmethod
+    def _hash(value):
+        # 0表示空槽位
+        return (hash(value) & _HASH_MASK) or 1
+
+    def add(self, value):
+        """加入集合，返回True表示之前不存在"""
+        h = self._hash(value)
+        slots, mask = self._slots, self._mask
+        i = h & mask
+        while True:
+            current = slots[i]
+            if current == 0:
+                break
+            if current == h:
+                return False
+            i = (i + 1) & mask
+        slots[i] = h
+        self.count += 1
+        if self.count > len(slots) * MAX_LOAD_FACTOR:
+            self._grow()
+        return True
+
+    def _grow(self):
+        old = self._slots
+        self._slots = array('Q', bytes(8 * len(old) * 2))
+        self._mask = len(self._slots) - 1
+        slots, mask = self._slots, self._mask
+        for h in old:
+            if h:
+                i = h & mask
+                while slots[i]:
+                    i = (i + 1) & mask
+                slots[i] = h
+
+    def memory_bytes(self):
+        return self._slots.itemsize * len(self._slots)
+
+
+def _decode(line):
+    line = line.rstrip(b'\r\n')
+    try:
+        return line.decode('utf-8')
+    except UnicodeDecodeError:
+        return line.decode('latin-1')
+
+
+def iter_wordlist(path):
+    """按行流式读取字典文件（mmap，内存只占用操作系统页缓存）"""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for line in iter(mm.readline, b''):
+                password = _decode(line)
+                if password:
+                    yield password
+
+
+def count_lines(path):
+    """统计字典文件行数（按块计数换行符，不解码）"""
+    lines = 0
+    last = b''
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(COUNT_CHUNK_SIZE)
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            last = chunk
+    if last and not last.endswith(b'\n'):
+        lines += 1
+    return lines
+
+
+class PasswordStore:
+    """常用密码列表（保存在配置文件的passwords中）+ 外部字典文件（配置文件的wordlists中）"""
+
+    def __init__(self, config_file, log_callback=None):
+        self.config_file = config_file
+        self.log_callback = log_callback
+        # 常用密码（图形界面的密码管理直接修改这个列表，然后调用save）
+        self.passwords = []
+        # 字典文件路径（相对路径以配置文件所在目录为基准）
+        self.wordlists = []
+        # 运行时临时追加的字典文件（命令行 --wordlist），不写入配置文件
+        self.extra_wordlists = []
+        self._line_counts = {}
+        self._missing_reported = set()
+        self.load()
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def _read_config(self):
+        if os.path.exists(self.config_file):
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {}
+
+    def load(self):
+        """加载配置文件中的常用密码和字典文件列表，返回常用密码列表"""
+        try:
+            config = self._read_config()
+            self.passwords[:] = config.get('passwords', [])
+            self.wordlists[:] = config.get('wordlists', [])
+        except Exception as e:
+            self.log(f"加载配置文件失败: {e}")
+        return self.passwords
+
+    def save(self):
+        """保存常用密码（保留配置文件中的其他设置，先写临时文件再替换）"""
+        try:
+            try:
+                config = self._read_config()
+            except ValueError:
+                config = {}
+            if config.get('passwords') == self.passwords:
+                return
+            config['passwords'] = self.passwords
+            tmp_path = self.config_file + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.config_file)
+        except Exception as e:
+            self.log(f"保存配置文件失败: {e}")
+
+    def wordlist_paths(self):
+        """所有存在的字典文件的绝对路径"""
+        base = os.path.dirname(os.path.abspath(self.config_file))
+        paths = []
+        for path in self.wordlists + self.extra_wordlists:
+            path = os.path.expanduser(path)
+            if not os.path.isabs(path):
+                path = os.path.join(base, path)
+            if os.path.isfile(path):
+                paths.append(path)
+            elif path not in self._missing_reported:
+                self._missing_reported.add(path)
+                self.log(f"⚠️ 密码字典不存在: {path}")
+        return paths
+
+    def _count(self, path):
+        # 按文件大小和修改时间缓存行数，避免每个压缩包都重新统计
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime)
+        if key not in self._line_counts:
+            self._line_counts[key] = count_lines(path)
+        return self._line_counts[key]
+
+    def estimate_total(self, include_empty=False):
+        """候选密码总数（字典文件按行数计算，未去重）"""
+        total = len(self.passwords) + (1 if include_empty else 0)
+        for path in self.wordlist_paths():
+            try:
+                total += self._count(path)
+            except OSError:
+                pass
+        return total
+
+    def candidates(self, include_empty=False):
+        """按顺序生成去重后的候选密码：无密码（可选）、常用密码、各字典文件"""
+        passwords = list(self.passwords)
+        paths = self.wordlist_paths()
+        # 索引按实际产生的候选密码增长（通常在字典前部就能找到密码，不必按字典总行数预分配）
+        seen = SeenIndex(len(passwords) + 1)
+        if include_empty:
+            seen.add('')
+            yield ''
+        for password in passwords:
+            if seen.add(password):
+                yield password
+        for path in paths:
+            try:
+                for password in iter_wordlist(path):
+                    if seen.add(password):
+                        yield password
+            except (OSError, ValueError) as e:
+                self.log(f"⚠️ 读取密码字典失败: {path}: {e}")
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理进度和剩余时间
+功能：按已发现压缩包的解压后大小（探测文件头得到）和解压程序输出的进度，汇总整次运行的进度、
+实时吞吐量和预计剩余时间；进度由后台线程按固定间隔回调给界面，解压线程只更新计数，不做任何输出
+"""
+
+import time
+import threading
+
+from archive_probe import format_size
+
+# 进度回调的间隔（秒）
+REPORT_INTERVAL = 0.5
+
+# 实时吞吐量的平滑系数（指数加权移动平均）
+RATE_ALPHA = 0.3
+
+# 任务状态
+_PENDING = 0
+_RUNNING = 1
+_DONE = 2
+
+
+class _JobProgress:
+    __slots__ = ('size', 'fraction', 'state', 'success')
+
+    def __init__(self, size):
+        self.size = size
+        self.fraction = 0.0
+        self.state = _PENDING
+        self.success = False
+
+
+class ProgressTracker:
+    """汇总一次运行中所有解压任务的进度（线程安全），callback(snapshot) 在后台线程中按间隔调用"""
+
+    def __init__(self, callback=None, interval=REPORT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self.started_at = time.monotonic()
+        self._jobs = {}
+        self._finished_bytes = 0
+        # 尚未处理完（包括其子文件夹还没有扫描）的文件夹数：大于0时还会发现新的压缩包，预计剩余时间只按已发现的计算
+        self._open_folders = 0
+        self._lock = threading.Lock()
+        self._changed = False
+        self._rate = None
+        self._last_sample = None  # (时间, 已完成字节数)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, key, size):
+        """登记一个已发现的压缩包（同一压缩包重复登记只计一次）"""
+        with self._lock:
+            if key not in self._jobs:
+                self._jobs[key] = _JobProgress(max(int(size or 0), 0))
+                self._changed = True
+
+    def discard(self, key):
+        """移除未处理的压缩包（例如由其他节点处理）"""
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.state == _PENDING:
+                del self._jobs[key]
+                self._changed = True
+
+    def open_folder(self):
+        """开始处理一个文件夹（其中和子文件夹中的压缩包还没有全部发现）"""
+        with self._lock:
+            self._open_folders += 1
+
+    def close_folder(self):
+        """文件夹处理完成且子文件夹已经扫描"""
+        with self._lock:
+            self._open_folders = max(self._open_folders - 1, 0)
+            self._changed = True
+
+    def start(self, key):
+        with self._lock:
+            job = self._jobs.setdefault(key, _JobProgress(0))
+            if job.state == _DONE:
+                self._finished_bytes -= job.size
+            job.state = _RUNNING
+            job.fraction = 0.0
+            self._changed = True
+
+    def update(self, key, fraction):
+        """解压程序报告的当前任务进度（0~1），每次尝试密码都从0开始"""
+        job = self._jobs.get(key)
+        if job is not None and job.state == _RUNNING:
+            job.fraction = min(max(fraction, 0.0), 1.0)
+            self._changed = True
+
+    def finish(self, key, success):
+        with self._lock:
+            job = self._jobs.setdefault(key, _JobProgress(0))
+            if job.state != _DONE:
+                self._finished_bytes += job.size
+            job.state = _DONE
+            job.success = success
+            job.fraction = 1.0
+            self._changed = True
+
+    def snapshot(self, finished=False):
+        """当前进度：压缩包数、字节数、实时吞吐量和预计剩余秒数（finished表示运行已结束的最终进度）"""
+        now = time.monotonic()
+        with self._lock:
+            total = done = failed = running = 0
+            total_bytes = 0
+            running_bytes = 0.0
+            for job in self._jobs.values():
+                total += 1
+                total_bytes += job.size
+                if job.state == _DONE:
+                    done += 1
+                    if not job.success:
+                        failed += 1
+                elif job.state == _RUNNING:
+                    running += 1
+                    running_bytes += job.size * job.fraction
+            done_bytes = min(self._finished_bytes + int(running_bytes), total_bytes)
+            if self._last_sample is not None and now > self._last_sample[0]:
+                rate = max(done_bytes - self._last_sample[1], 0) / (now - self._last_sample[0])
+                self._rate = rate if self._rate is None else self._rate + RATE_ALPHA * (rate - self._rate)
+            self._last_sample = (now, done_bytes)
+            rate = self._rate or 0.0
+            discovering = self._open_folders > 0
+        if finished:
+            # 最终进度显示整次运行的平均吞吐量
+            elapsed = now - self.started_at
+            rate = done_bytes / elapsed if elapsed > 0 else 0.0
+        remaining = total_bytes - done_bytes
+        eta = remaining / rate if rate > 0 else None
+        return {
+            'archives_total': total,
+            'archives_done': done,
+            'archives_failed': failed,
+            'archives_running': running,
+            'bytes_total': total_bytes,
+            'bytes_done': done_bytes,
+            'fraction': done_bytes / total_bytes if total_bytes else (done / total if total else 0.0),
+            'bytes_per_second': rate,
+            'eta_seconds': eta,
+            # 仍在发现新的压缩包：总量和预计剩余时间只是目前已发现部分的下限
+            'eta_provisional': discovering and not finished,
+            'elapsed_seconds': now - self.started_at,
+            'finished': finished,
+        }
+
+    def start_reporting(self):
+        """启动后台回调线程（没有回调时不启动）"""
+        if self.callback is None or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._report_loop, name='progress-reporter', daemon=True)
+        self._thread.start()
+
+    def _report_loop(self):
+        while not self._stop.wait(self.interval):
+            # 吞吐量需要按固定间隔采样，没有变化时也计算，但只在有变化时回调
+            snapshot = self.snapshot()
+            if self._changed:
+                self._changed = False
+                self._emit(snapshot)
+
+    def _emit(self, snapshot):
+        try:
+            self.callback(snapshot)
+        except Exception:
+            pass
+
+    def stop_reporting(self):
+        """停止回调线程，并回调一次最终进度"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._emit(self.snapshot(finished=True))
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+def format_progress(snapshot):
+    """把进度快照格式化为一行文字"""
+    text = (f"{snapshot['fraction'] * 100:.1f}%  压缩包 {snapshot['archives_done']}/{snapshot['archives_total']}"
+            f"（剩余 {snapshot['archives_total'] - snapshot['archives_done']}）  "
+            f"{format_size(snapshot['bytes_done'])} / {format_size(snapshot['bytes_total'])}  "
+            f"{format_size(snapshot['bytes_per_second'])}/s")
+    if snapshot['archives_done'] < snapshot['archives_total']:
+        eta = snapshot['eta_seconds']
+        if eta is None:
+            text += "  剩余时间 --:--"
+        elif snapshot.get('eta_provisional'):
+            text += f"  剩余时间 ≥{format_duration(eta)}（仍在发现压缩包）"
+        else:
+            text += f"  剩余时间 {format_duration(eta)}"
+    return text
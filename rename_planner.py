@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量修正异常格式压缩包的文件名
+功能：按文件夹的一次目录快照在内存中计算所有修正后的文件名并解决重名（添加_1、_2……后缀），
+一次完成全部改名；每次改名写入改名日志（JSON Lines），可以按运行撤销
+"""
+
+import os
+import json
+import time
+import itertools
+import threading
+
+# 改名日志文件名（放在输出目录）
+JOURNAL_NAME = 'rename_journal.jsonl'
+
+# 本进程中的运行序号（watch和serve模式下同一秒内可能开始多次运行）
+_run_numbers = itertools.count(1)
+
+# 日志记录类型
+OP_RENAME = 'rename'
+OP_UNDO = 'undo'
+
+
+def new_run_id():
+    """运行编号：时间、进程号和本进程中的运行序号"""
+    return time.strftime('%Y%m%d-%H%M%S') + f'-{os.getpid()}-{next(_run_numbers)}'
+
+
+def corrected_name(filename, archive_extensions):
+    """去掉压缩包扩展名之后多余的部分（例如 name.7z删 -> name.7z），不需要修正时返回原文件名"""
+    filename_lower = filename.lower()
+    # 按扩展名长度排序，优先处理较长的扩展名（如.tar.gz）
+    for ext in sorted(archive_extensions, key=len, reverse=True):
+        if ext in filename_lower and not filename_lower.endswith(ext):
+            # 保留扩展名之前的部分，去掉扩展名之后的部分
+            return filename[:filename_lower.find(ext)] + ext
+    return filename
+
+
+def plan_renames(snapshot, filenames, archive_extensions):
+    """在内存中计算改名方案，返回 [(原文件名, 新文件名)]
+
+    snapshot: 文件夹中现有的全部文件名（一次listdir的结果）
+    filenames: 需要修正的文件名
+    """
+    # 按系统规则比较文件名（Windows不区分大小写），已占用的名字包括本次计划中的新名字
+    taken = {os.path.normcase(name) for name in snapshot}
+    next_suffix = {}  # (主名, 扩展名) -> 下一个尝试的数字，重名很多时不必从1重新尝试
+    plan = []
+    for filename in filenames:
+        target = corrected_name(filename, archive_extensions)
+        if target == filename:
+            continue
+        if os.path.normcase(target) in taken:
+            base, ext = os.path.splitext(target)
+            key = (os.path.normcase(base), os.path.normcase(ext))
+            counter = next_suffix.get(key, 1)
+            while os.path.normcase(f"{base}_{counter}{ext}") in taken:
+                counter += 1
+            next_suffix[key] = counter + 1
+            target = f"{base}_{counter}{ext}"
+        taken.add(os.path.normcase(target))
+        plan.append((filename, target))
+    return plan
+
+
+class RenameJournal:
+    """改名日志（线程安全，追加写入）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.run_id = new_run_id()
+        self._lock = threading.Lock()
+
+    def new_run(self):
+        """开始新的一次运行（撤销按运行进行）"""
+        self.run_id = new_run_id()
+
+    def record(self, folder, old, new, op=OP_RENAME, run_id=None):
+        line = json.dumps({'run': run_id or self.run_id, 'op': op, 'folder': folder, 'old': old, 'new': new,
+                           'time': time.time()}, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+    def read(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                records = []
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+                return records
+        except OSError:
+            return []
+
+    def runs(self):
+        """还有未撤销改名的运行，按时间顺序 [(运行, 未撤销的改名数)]"""
+        counts = {}
+        for record in self.read():
+            if record.get('op') == OP_RENAME:
+                counts[record['run']] = counts.get(record['run'], 0) + 1
+            elif record.get('op') == OP_UNDO:
+                counts[record['run']] = counts.get(record['run'], 0) - 1
+        return [(run_id, count) for run_id, count in counts.items() if count > 0]
+
+    def undo(self, run_id, log_callback=None):
+        """按相反顺序撤销一次运行中的改名，返回 (撤销数, 跳过数)"""
+        records = self.read()
+        undone = {(r['folder'], r['old'], r['new']) for r in records
+                  if r.get('op') == OP_UNDO and r.get('run') == run_id}
+        renames = [r for r in records if r.get('op') == OP_RENAME and r.get('run') == run_id]
+        restored = skipped = 0
+        for record in reversed(renames):
+            key = (record['folder'], record['old'], record['new'])
+            if key in undone:
+                continue
+            old_path = os.path.join(record['folder'], record['old'])
+            new_path = os.path.join(record['folder'], record['new'])
+            if not os.path.exists(new_path) or os.path.exists(old_path):
+                skipped += 1
+                if log_callback:
+                    log_callback(f"⚠️ 无法撤销（文件已不存在或原文件名已被占用）: {record['new']} -> {record['old']}")
+                continue
+            try:
+                os.rename(new_path, old_path)
+            except OSError as e:
+                skipped += 1
+                if log_callback:
+                    log_callback(f"⚠️ 撤销改名失败: {record['new']} -> {record['old']}: {e}")
+                continue
+            self.record(record['folder'], record['old'], record['new'], op=OP_UNDO, run_id=run_id)
+            restored += 1
+            if log_callback:
+                log_callback(f"↩️ 已恢复文件名: {record['new']} -> {record['old']}")
+        return restored, skipped
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+低影响后台模式
+功能：以较低的CPU和I/O优先级（nice / ioprio，Windows下为低于正常的优先级类）运行解压程序子进程和进程内的校验线程，
+可选限定CPU亲和性；负载调节器按系统平均负载、可用内存和I/O等待比例在运行中减少或增加同时进行的解压任务数
+"""
+
+import os
+import sys
+import ctypes
+import platform
+import threading
+import subprocess
+
+# 默认nice值（0~19，越大优先级越低）
+DEFAULT_NICE = 10
+
+# I/O调度类别（Linux ioprio_set）
+IOPRIO_CLASSES = {'realtime': 1, 'best-effort': 2, 'idle': 3}
+DEFAULT_IOPRIO = 'idle'
+DEFAULT_IOPRIO_LEVEL = 7  # best-effort类别中的优先级（0~7，越大越低）
+
+IOPRIO_CLASS_SHIFT = 13
+IOPRIO_WHO_PROCESS = 1
+
+# 各架构ioprio_set的系统调用号
+IOPRIO_SET_SYSCALLS = {
+    'x86_64': 251, 'amd64': 251,
+    'i386': 289, 'i686': 289,
+    'aarch64': 30, 'arm64': 30, 'riscv64': 30,
+    'armv7l': 314, 'armv6l': 314,
+    'ppc64le': 273, 'ppc64': 273,
+    's390x': 282,
+}
+
+# 负载调节器默认设置
+DEFAULT_INTERVAL = 5.0        # 采样间隔（秒）
+DEFAULT_MAX_LOAD = 0.8        # 每个CPU的1分钟平均负载上限
+DEFAULT_MIN_FREE_MEMORY = 0.15  # 可用内存占比下限
+DEFAULT_MAX_IOWAIT = 0.25     # I/O等待占CPU时间的比例上限
+
+# 所有指标都低于上限的该比例时才增加并发（留出回差，避免在边界上反复调整）
+GROW_MARGIN = 0.75
+
+
+def parse_cpu_list(text):
+    """解析CPU列表，例如 "0-3,6" -> [0, 1, 2, 3, 6]"""
+    cpus = set()
+    for part in str(text).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition('-')
+        if sep:
+            cpus.update(range(int(first), int(last) + 1))
+        else:
+            cpus.add(int(first))
+    if not cpus:
+        raise ValueError(f"无效的CPU列表: {text}")
+    return sorted(cpus)
+
+
+def _ioprio_set(who, ioprio_class, level):
+    """调用Linux的ioprio_set，不支持的平台抛出OSError"""
+    number = IOPRIO_SET_SYSCALLS.get(platform.machine().lower())
+    if number is None:
+        raise OSError(f"不支持的架构: {platform.machine()}")
+    libc = ctypes.CDLL(None, use_errno=True)
+    value = (ioprio_class << IOPRIO_CLASS_SHIFT) | (level if ioprio_class != IOPRIO_CLASSES['idle'] else 0)
+    if libc.syscall(number, IOPRIO_WHO_PROCESS, who, value) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+class ProcessPriority:
+    """降低进程或线程的CPU和I/O优先级，失败时只记录一次警告（例如容器中没有权限）"""
+
+    def __init__(self, nice=DEFAULT_NICE, ioprio=DEFAULT_IOPRIO, ioprio_level=DEFAULT_IOPRIO_LEVEL, cpus=None,
+                 log_callback=None):
+        if ioprio is not None and ioprio not in IOPRIO_CLASSES:
+            raise ValueError(f"未知的I/O优先级类别: {ioprio}")
+        self.nice = nice
+        self.ioprio = ioprio
+        self.ioprio_level = int(ioprio_level)
+        self.cpus = cpus
+        self.log_callback = log_callback
+        self._warned = set()
+
+    @classmethod
+    def from_settings(cls, settings, cpus=None, log_callback=None):
+        """按配置文件中background的设置创建，cpus参数优先于配置文件"""
+        if cpus is None and settings.get('cpus') is not None:
+            cpus = parse_cpu_list(','.join(map(str, settings['cpus'])) if isinstance(settings['cpus'], list)
+                                  else settings['cpus'])
+        return cls(nice=settings.get('nice', DEFAULT_NICE), ioprio=settings.get('ioprio', DEFAULT_IOPRIO),
+                   ioprio_level=settings.get('ioprio_level', DEFAULT_IOPRIO_LEVEL), cpus=cpus,
+                   log_callback=log_callback)
+
+    def _warn(self, what, error):
+        if what not in self._warned:
+            self._warned.add(what)
+            if self.log_callback:
+                self.log_callback(f"⚠️ 无法设置{what}（本次运行不再提示）: {error}")
+
+    def creationflags(self):
+        """Windows下创建子进程时使用的优先级类"""
+        if sys.platform != 'win32' or self.nice is None or self.nice <= 0:
+            return 0
+        if self.nice >= 15:
+            return getattr(subprocess, 'IDLE_PRIORITY_CLASS', 0)
+        return getattr(subprocess, 'BELOW_NORMAL_PRIORITY_CLASS', 0)
+
+    def apply(self, pid):
+        """降低指定进程（Linux下也可以是线程号）的优先级"""
+        if sys.platform == 'win32':
+            # Windows的优先级类在创建进程时通过creationflags设置
+            return
+        if self.nice is not None:
+            try:
+                # setpriority设置的是绝对值，只在比当前值低时调整（普通用户不能提高优先级）
+                if os.getpriority(os.PRIO_PROCESS, pid) < self.nice:
+                    os.setpriority(os.PRIO_PROCESS, pid, self.nice)
+            except OSError as e:
+                self._warn('CPU优先级', e)
+        if self.ioprio is not None and sys.platform.startswith('linux'):
+            try:
+                _ioprio_set(pid, IOPRIO_CLASSES[self.ioprio], self.ioprio_level)
+            except OSError as e:
+                self._warn('I/O优先级', e)
+        if self.cpus and hasattr(os, 'sched_setaffinity'):
+            try:
+                os.sched_setaffinity(pid, self.cpus)
+            except OSError as e:
+                self._warn('CPU亲和性', e)
+
+    def apply_to_current_thread(self):
+        """降低当前线程的优先级（Linux下nice、ioprio和亲和性都可以按线程设置，其他平台不处理）"""
+        if sys.platform.startswith('linux'):
+            self.apply(threading.get_native_id())
+
+    def describe(self):
+        parts = []
+        if self.nice is not None:
+            parts.append(f"nice {self.nice}")
+        if self.ioprio is not None:
+            parts.append(f"ioprio {self.ioprio}" + (f"/{self.ioprio_level}" if self.ioprio == 'best-effort' else ''))
+        if self.cpus:
+            parts.append(f"CPU {','.join(map(str, self.cpus))}")
+        return '，'.join(parts) or '不调整优先级'
+
+
+def read_load():
+    """每个CPU的1分钟平均负载，不支持的平台返回None"""
+    try:
+        return os.getloadavg()[0] / (os.cpu_count() or 1)
+    except (AttributeError, OSError):
+        return None
+
+
+def read_free_memory():
+    """可用内存占总内存的比例（Linux /proc/meminfo），不支持的平台返回None"""
+    values = {}
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                key, _, rest = line.partition(':')
+                values[key] = int(rest.split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    if not values.get('MemTotal') or 'MemAvailable' not in values:
+        return None
+    return values['MemAvailable'] / values['MemTotal']
+
+
+def read_cpu_times():
+    """(I/O等待时间, 总CPU时间)（Linux /proc/stat，单位为时钟周期），不支持的平台返回None"""
+    try:
+        with open('/proc/stat', 'r') as f:
+            fields = f.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != 'cpu' or len(fields) < 6:
+        return None
+    times = [int(value) for value in fields[1:]]
+    return times[4], sum(times)
+
+
+class LoadGovernor:
+    """负载调节器：按系统负载限制同时进行的解压任务数，从min_workers开始，负载低时每个采样周期加一，超限时减一"""
+
+    def __init__(self, max_workers, settings=None, log_callback=None):
+        settings = settings or {}
+        self.max_workers = max(1, int(max_workers))
+        self.min_workers = min(self.max_workers, max(1, int(settings.get('min_workers', 1))))
+        self.interval = float(settings.get('interval', DEFAULT_INTERVAL))
+        self.max_load = settings.get('max_load', DEFAULT_MAX_LOAD)
+        self.min_free_memory = settings.get('min_free_memory', DEFAULT_MIN_FREE_MEMORY)
+        self.max_iowait = settings.get('max_iowait', DEFAULT_MAX_IOWAIT)
+        self.log_callback = log_callback
+        self.limit = self.min_workers
+        self.active = 0
+        self.lowest = self.limit
+        self.last_sample = {}
+        self._cpu_times = read_cpu_times()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def log(self, message):
+        if self.log_callback:
+            self.log_callback(message)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='load-governor', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.adjust(self.sample())
+
+    def sample(self):
+        """采样系统负载，不支持的指标为None"""
+        iowait = None
+        times = read_cpu_times()
+        if times is not None and self._cpu_times is not None:
+            total = times[1] - self._cpu_times[1]
+            iowait = (times[0] - self._cpu_times[0]) / total if total > 0 else 0.0
+        self._cpu_times = times
+        return {'load': read_load(), 'free_memory': read_free_memory(), 'iowait': iowait}
+
+    def adjust(self, sample):
+        """按一次采样调整并发上限，返回新的上限（没有调整时返回None）"""
+        self.last_sample = sample
+        load, free_memory, iowait = sample.get('load'), sample.get('free_memory'), sample.get('iowait')
+        reasons = []
+        if load is not None and load > self.max_load:
+            reasons.append(f"负载 {load:.2f}/CPU")
+        if free_memory is not None and free_memory < self.min_free_memory:
+            reasons.append(f"可用内存 {free_memory:.0%}")
+        if iowait is not None and iowait > self.max_iowait:
+            reasons.append(f"I/O等待 {iowait:.0%}")
+        relaxed = ((load is None or load < self.max_load * GROW_MARGIN)
+                   and (free_memory is None or free_memory > self.min_free_memory / GROW_MARGIN)
+                   and (iowait is None or iowait < self.max_iowait * GROW_MARGIN))
+        with self._lock:
+            old_limit = self.limit
+            if reasons and self.limit > self.min_workers:
+                self.limit -= 1
+            elif not reasons and relaxed and self.limit < self.max_workers and self.active >= self.limit:
+                # 只有名额已用满时才增加，空闲的名额不说明系统还能承受更多任务
+                self.limit += 1
+            self.lowest = min(self.lowest, self.limit)
+            new_limit = self.limit
+        if new_limit == old_limit:
+            return None
+        if new_limit < old_limit:
+            self.log(f"⚖️ 系统繁忙（{'，'.join(reasons)}），同时解压的任务数减少为 {new_limit}")
+        else:
+            self.log(f"⚖️ 系统负载较低，同时解压的任务数增加为 {new_limit}")
+        return new_limit
+
+    def try_acquire(self):
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.active -= 1
+
+    def retry_after(self):
+        """名额已满时等到下一次采样再尝试"""
+        with self._lock:
+            return self.interval if self.active >= self.limit else None
+
+    def admission(self, admit, retry_after):
+        """把设备准入回调包装为先检查本调节器的名额，返回 (准入回调, 重试等待回调)"""
+        def governed_admit(job):
+            if not self.try_acquire():
+                return False
+            if admit(job):
+                return True
+            self.release()
+            return False
+
+        def governed_retry_after():
+            waits = [w for w in (retry_after(), self.retry_after()) if w is not None]
+            return min(waits) if waits else None
+
+        return governed_admit, governed_retry_after
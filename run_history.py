@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+历史运行性能数据库
+功能：把每次处理运行的摘要（每个压缩包的大小、格式、解压程序、密码尝试次数、各阶段耗时、吞吐量，以及主机信息、
+配置和解压程序的指纹）保存到本地SQLite数据库；生成报告时把最近一次运行与之前语料相似的运行对比，
+标记吞吐量退化、阶段耗时增长和异常的压缩包，并列出两者之间配置、解压程序或主机的变化
+"""
+
+import os
+import sys
+import json
+import socket
+import sqlite3
+import hashlib
+import platform
+import threading
+
+# 历史数据库文件名（放在输出目录）
+HISTORY_DB_NAME = 'run_history.sqlite'
+
+# 最多保留的运行数，超出后删除最早的运行
+DEFAULT_MAX_RUNS = 500
+
+# 判定退化的变化比例
+DEFAULT_THRESHOLD = 0.2
+
+# 作为对比基准的相似运行数（取中位数，单次运行的波动不会造成误报）
+DEFAULT_BASELINE_RUNS = 5
+
+# 语料相似度下限：各格式字节占比的重合程度（0~1）
+MIN_SIMILARITY = 0.7
+
+# 语料总大小相差超过该倍数时不视为相似
+MAX_SIZE_RATIO = 4.0
+
+# 阶段p95耗时增加少于该秒数时不算退化（避免毫秒级阶段的抖动）
+MIN_STAGE_DELTA = 0.05
+
+# 吞吐量低于同类压缩包历史中位数的该分之一时标记为异常
+ANOMALY_FACTOR = 4.0
+
+# 小于该大小的压缩包耗时主要是固定开销，不判断吞吐量是否异常
+MIN_ANOMALY_BYTES = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    folder TEXT NOT NULL,
+    host TEXT NOT NULL,
+    host_info TEXT NOT NULL,
+    config_hash TEXT NOT NULL,
+    backends TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    archives INTEGER NOT NULL,
+    succeeded INTEGER NOT NULL,
+    failed INTEGER NOT NULL,
+    archive_bytes INTEGER NOT NULL,
+    elapsed REAL NOT NULL,
+    bytes_per_second REAL NOT NULL,
+    stages TEXT NOT NULL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS archives (
+    run_id INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    uncompressed INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    success INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    bytes_per_second REAL NOT NULL,
+    stages TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS archives_run ON archives (run_id);
+"""
+
+
+def host_info():
+    """本机信息（对比时用于判断两次运行是否在同一环境中进行）"""
+    return {
+        'host': socket.gethostname(),
+        'platform': sys.platform,
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count() or 1,
+    }
+
+
+def file_hash(path):
+    """文件内容的SHA-1，文件不存在时返回空字符串"""
+    try:
+        with open(path, 'rb') as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return ''
+
+
+def backend_identity(backends):
+    """各解压程序的路径、大小和修改时间（升级解压程序后会变化），{名称: {...}}"""
+    identity = {}
+    for name, backend in sorted(backends.items()):
+        entry = {'path': backend.executable}
+        try:
+            st = os.stat(backend.executable)
+            entry.update(size=st.st_size, mtime=int(st.st_mtime))
+        except (OSError, TypeError):
+            pass
+        identity[name] = entry
+    return identity
+
+
+def _median(values):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    middle = len(ordered) // 2
+    return ordered[middle] if len(ordered) % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+
+def _group_throughput(archives):
+    """按 (格式, 解压程序) 汇总成功解压的吞吐量，{(格式, 解压程序): 字节/秒}"""
+    totals = {}
+    for archive in archives:
+        if archive['success'] and archive['seconds'] > 0:
+            total = totals.setdefault((archive['format'], archive['backend']), [0, 0.0])
+            total[0] += archive['size']
+            total[1] += archive['seconds']
+    return {key: size / seconds for key, (size, seconds) in totals.items() if seconds > 0}
+
+
+def corpus_profile(archives):
+    """语料特征：各格式的字节占比和总字节数"""
+    by_format = {}
+    for archive in archives:
+        by_format[archive['format']] = by_format.get(archive['format'], 0) + archive['size']
+    total = sum(by_format.values())
+    shares = {fmt: size / total for fmt, size in by_format.items()} if total else {}
+    return shares, total
+
+
+def similarity(profile_a, profile_b):
+    """两份语料的相似度（0~1）：各格式字节占比的重合部分，总大小相差超过MAX_SIZE_RATIO倍时为0"""
+    shares_a, total_a = profile_a
+    shares_b, total_b = profile_b
+    if not total_a or not total_b or max(total_a, total_b) / min(total_a, total_b) > MAX_SIZE_RATIO:
+        return 0.0
+    return sum(min(shares_a.get(fmt, 0.0), shares_b.get(fmt, 0.0)) for fmt in set(shares_a) | set(shares_b))
+
+
+class RunHistory:
+    """历史运行数据库（线程安全）"""
+
+    def __init__(self, db_path, max_runs=DEFAULT_MAX_RUNS):
+        self.db_path = db_path
+        self.max_runs = int(max_runs)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+
+    def record_run(self, folder, summary, archives, config_hash='', backends=None, settings=None, error=None):
+        """保存一次运行，返回运行编号
+
+        summary: RunMetrics.summary() 的结果
+        archives: RunMetrics.archive_records() 的结果
+        """
+        succeeded = sum(1 for archive in archives if archive['success'])
+        archive_bytes = sum(archive['size'] for archive in archives if archive['success'])
+        info = host_info()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    'INSERT INTO runs (started_at, finished_at, folder, host, host_info, config_hash, backends, settings, '
+                    'archives, succeeded, failed, archive_bytes, elapsed, bytes_per_second, stages, error) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (summary['started_at'], summary['finished_at'], os.path.abspath(folder), info['host'],
+                     json.dumps(info), config_hash, json.dumps(backends or {}, ensure_ascii=False),
+                     json.dumps(settings or {}, ensure_ascii=False), len(archives), succeeded,
+                     len(archives) - succeeded, archive_bytes, summary['elapsed_seconds'],
+                     summary['overall_bytes_per_second'], json.dumps(summary['stages']), error))
+                run_id = cursor.lastrowid
+                self._conn.executemany(
+                    'INSERT INTO archives (run_id, path, size, uncompressed, format, backend, attempts, success, '
+                    'seconds, bytes_per_second, stages) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    [(run_id, a['path'], a['size'], a['uncompressed'], a['format'] or '', a['backend'] or '',
+                      a['attempts'], int(a['success']), a['seconds'],
+                      a['size'] / a['seconds'] if a['success'] and a['seconds'] > 0 else 0.0,
+                      json.dumps(a['stages'])) for a in archives])
+                self._prune()
+        return run_id
+
+    def _prune(self):
+        """超过保留数量时删除最早的运行（调用方持有锁和事务）"""
+        row = self._conn.execute('SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?', (self.max_runs,)).fetchone()
+        if row is not None:
+            self._conn.execute('DELETE FROM archives WHERE run_id <= ?', (row['id'],))
+            self._conn.execute('DELETE FROM runs WHERE id <= ?', (row['id'],))
+
+    def runs(self, limit=None):
+        """运行列表（新的在前）"""
+        sql = 'SELECT * FROM runs ORDER BY id DESC' + (' LIMIT ?' if limit else '')
+        with self._lock:
+            rows = self._conn.execute(sql, (limit,) if limit else ()).fetchall()
+        return [self._run_dict(row) for row in rows]
+
+    def run(self, run_id):
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM runs WHERE id = ?', (run_id,)).fetchone()
+        return self._run_dict(row) if row is not None else None
+
+    def archives(self, run_id):
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM archives WHERE run_id = ?', (run_id,)).fetchall()
+        return [dict(row, success=bool(row['success']), stages=json.loads(row['stages'])) for row in rows]
+
+    @staticmethod
+    def _run_dict(row):
+        run = dict(row)
+        for key in ('host_info', 'backends', 'settings', 'stages'):
+            run[key] = json.loads(run[key])
+        return run
+
+    def report(self, run_id=None, threshold=DEFAULT_THRESHOLD, baseline_runs=DEFAULT_BASELINE_RUNS):
+        """把一次运行（默认最近一次解压过压缩包的运行）与之前语料相似的运行对比，没有可报告的运行时返回None
+
+        返回 {'run', 'baseline'(对比的运行编号), 'regressions', 'anomalies', 'changes'}
+        """
+        if run_id is None:
+            latest = next((run for run in self.runs() if run['archives']), None)
+        else:
+            latest = self.run(run_id)
+        if latest is None:
+            return None
+        archives = self.archives(latest['id'])
+        profile = corpus_profile(archives)
+
+        baseline = []
+        for run in self.runs():
+            if run['id'] >= latest['id'] or not run['archives']:
+                continue
+            run_archives = self.archives(run['id'])
+            if similarity(profile, corpus_profile(run_archives)) >= MIN_SIMILARITY:
+                baseline.append((run, run_archives))
+                if len(baseline) >= baseline_runs:
+                    break
+
+        report = {'run': latest, 'baseline': [run['id'] for run, _ in baseline],
+                  'regressions': [], 'anomalies': [], 'changes': []}
+        if baseline:
+            report['regressions'] = self._regressions(latest, archives, baseline, threshold)
+            report['changes'] = self._changes(latest, baseline[0][0])
+        report['anomalies'] = self._anomalies(archives, baseline)
+        return report
+
+    @staticmethod
+    def _regressions(latest, archives, baseline, threshold):
+        """[(指标, 基准中位数, 本次, 变化比例)]，只包含退化的指标"""
+        rows = []
+        old = _median([run['bytes_per_second'] for run, _ in baseline if run['bytes_per_second'] > 0])
+        if old and latest['bytes_per_second'] < old * (1 - threshold):
+            rows.append(('throughput', old, latest['bytes_per_second'], latest['bytes_per_second'] / old - 1))
+
+        current = _group_throughput(archives)
+        previous = [_group_throughput(run_archives) for _, run_archives in baseline]
+        for (fmt, backend), value in sorted(current.items()):
+            old = _median([groups[(fmt, backend)] for groups in previous if (fmt, backend) in groups])
+            if old and value < old * (1 - threshold):
+                rows.append((f'throughput[{fmt}/{backend}]', old, value, value / old - 1))
+
+        for stage, stats in sorted(latest['stages'].items()):
+            old = _median([run['stages'][stage]['p95'] for run, _ in baseline if stage in run['stages']])
+            if old and stats['p95'] > old * (1 + threshold) and stats['p95'] - old > MIN_STAGE_DELTA:
+                rows.append((f'{stage}.p95', old, stats['p95'], stats['p95'] / old - 1))
+        return rows
+
+    @staticmethod
+    def _anomalies(archives, baseline):
+        """[(压缩包路径, 原因)]：解压失败，或吞吐量远低于之前同格式、同解压程序的压缩包"""
+        succeeded_before = set()
+        rates = {}
+        for _, run_archives in baseline:
+            for archive in run_archives:
+                if archive['success']:
+                    succeeded_before.add(archive['path'])
+                    if archive['size'] >= MIN_ANOMALY_BYTES and archive['bytes_per_second'] > 0:
+                        rates.setdefault((archive['format'], archive['backend']), []).append(archive['bytes_per_second'])
+        medians = {key: _median(values) for key, values in rates.items()}
+
+        rows = []
+        for archive in archives:
+            if not archive['success']:
+                reason = '解压失败（之前的运行中成功过）' if archive['path'] in succeeded_before else '解压失败'
+                rows.append((archive['path'], f"{reason}，尝试 {archive['attempts']} 次"))
+                continue
+            median = medians.get((archive['format'], archive['backend']))
+            if median and archive['size'] >= MIN_ANOMALY_BYTES and archive['bytes_per_second'] < median / ANOMALY_FACTOR:
+                rows.append((archive['path'],
+                             f"吞吐量 {archive['bytes_per_second'] / 1024 / 1024:.2f}MB/s，同类压缩包历史中位数 "
+                             f"{median / 1024 / 1024:.2f}MB/s（{archive['format']}/{archive['backend']}）"))
+        return rows
+
+    @staticmethod
+    def _changes(latest, previous):
+        """与最近一次相似运行相比，可能影响性能的变化（配置、解压程序、主机）"""
+        changes = []
+        if latest['config_hash'] != previous['config_hash']:
+            changes.append(f"配置文件已变化（对比运行 #{previous['id']}）")
+        for name in sorted(set(latest['backends']) | set(previous['backends'])):
+            old, new = previous['backends'].get(name), latest['backends'].get(name)
+            if old is None:
+                changes.append(f"新增解压程序: {name}")
+            elif new is None:
+                changes.append(f"解压程序不再可用: {name}")
+            elif old != new:
+                changes.append(f"解压程序已更新或替换: {name}（{new.get('path')}）")
+        for key, value in sorted(latest['settings'].items()):
+            if previous['settings'].get(key) != value:
+                changes.append(f"设置 {key}: {previous['settings'].get(key)} -> {value}")
+        for key, value in sorted(latest['host_info'].items()):
+            if previous['host_info'].get(key) != value:
+                changes.append(f"主机 {key}: {previous['host_info'].get(key)} -> {value}")
+        return changes
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def open_run_history(settings, directory, log_callback=None):
+    """按配置文件中history的设置打开历史数据库，未启用或无法打开时返回None"""
+    if not settings.get('enabled', True):
+        return None
+    db_path = settings.get('path') or os.path.join(directory, HISTORY_DB_NAME)
+    try:
+        return RunHistory(db_path, max_runs=settings.get('max_runs', DEFAULT_MAX_RUNS))
+    except (sqlite3.Error, OSError) as e:
+        if log_callback:
+            log_callback(f"⚠️ 无法打开历史运行数据库，本次不记录: {e}")
+        return None
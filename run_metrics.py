@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行指标统计
+功能：记录各处理阶段的耗时、计数器和分布直方图，并在运行结束时导出为JSON和Prometheus文本格式
+"""
+
+import os
+import json
+import time
+import random
+import socket
+import threading
+from contextlib import contextmanager
+
+# 阶段名称（用于日志和导出）
+STAGE_SCAN = 'scan'                    # 目录扫描
+STAGE_CLASSIFY = 'classify'            # 压缩包分类
+STAGE_RENAME = 'rename'                # 修正文件名
+STAGE_PASSWORD_ATTEMPT = 'password_attempt'  # 单次密码尝试（含等待和校验）
+STAGE_BACKEND = 'backend'              # 解压程序进程运行时间
+STAGE_VERIFY = 'verify'                # 解压结果校验
+STAGE_GUI_WAIT = 'gui_wait'            # 等待Bandizip图形界面手动输入
+STAGE_INTEGRITY = 'integrity'          # 解压后的完整性校验（后台进行，与后续解压重叠）
+
+# 耗时直方图的分桶边界（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# 每个直方图最多保留的原始样本数，超出后按蓄水池抽样保留
+MAX_SAMPLES = 10000
+
+
+class Histogram:
+    """简单的直方图：固定分桶计数 + 抽样保留原始值用于计算分位数"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.total = 0.0
+        self.max_value = 0.0
+        self.samples = []
+
+    def observe(self, value):
+        """记录一个观测值"""
+        self.count += 1
+        self.total += value
+        if value > self.max_value:
+            self.max_value = value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            # 蓄水池抽样，保证长时间运行时内存有界
+            index = random.randrange(self.count)
+            if index < MAX_SAMPLES:
+                self.samples[index] = value
+
+    def quantile(self, q):
+        """计算分位数（基于保留的样本）"""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+        return ordered[index]
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': round(self.total, 6),
+            'max': round(self.max_value, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 6),
+            'p95': round(self.quantile(0.95), 6),
+        }
+
+
+class RunMetrics:
+    """单次处理运行的指标集合（线程安全）"""
+
+    def __init__(self, host=None):
+        self.host = host or socket.gethostname()
+        self.started_at = time.time()
+        self.finished_at = None
+        self.counters = {}
+        self.stage_histograms = {}
+        self.value_histograms = {}
+        self._lock = threading.Lock()
+        # 每个线程当前所处的压缩包和阶段（供性能分析采样打标签）
+        self._archives = {}
+        self._stages = {}
+        # 每个线程当前压缩包各阶段的累计耗时，以及已完成的压缩包记录（写入历史数据库）
+        self._archive_stages = {}
+        self.archives = []
+
+    @contextmanager
+    def stage(self, name):
+        """统计代码块耗时的上下文管理器"""
+        thread_id = threading.get_ident()
+        stages = self._stages.setdefault(thread_id, [])
+        stages.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(name, time.perf_counter() - start)
+            stages.pop()
+
+    def set_current_archive(self, archive_name):
+        """记录当前线程正在处理的压缩包（同时重新开始累计该压缩包的阶段耗时）"""
+        thread_id = threading.get_ident()
+        self._archives[thread_id] = archive_name
+        self._archive_stages[thread_id] = {}
+
+    def archive_stages(self):
+        """当前线程正在处理的压缩包到目前为止各阶段的累计耗时 {阶段: 秒}"""
+        return {name: round(seconds, 6) for name, seconds in self._archive_stages.get(threading.get_ident(), {}).items()}
+
+    def current_context(self, thread_id):
+        """返回指定线程当前的 (压缩包, 阶段)"""
+        stages = self._stages.get(thread_id)
+        return self._archives.get(thread_id), (stages[-1] if stages else None)
+
+    def observe_stage(self, name, seconds):
+        """记录某个阶段的一次耗时（秒）"""
+        thread_id = threading.get_ident()
+        if self._archives.get(thread_id) is not None:
+            stages = self._archive_stages[thread_id]
+            stages[name] = stages.get(name, 0.0) + seconds
+        with self._lock:
+            histogram = self.stage_histograms.get(name)
+            if histogram is None:
+                histogram = self.stage_histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    def observe_value(self, name, value, buckets=DEFAULT_BUCKETS):
+        """记录一个非耗时类的观测值（如每个压缩包的密码尝试次数、吞吐量）"""
+        with self._lock:
+            histogram = self.value_histograms.get(name)
+            if histogram is None:
+                histogram = self.value_histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def incr(self, name, value=1):
+        """计数器累加"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_extraction(self, archive_bytes, seconds, attempts, success):
+        """记录一个压缩包的解压结果"""
+        self.incr('archives_total')
+        self.incr('archives_succeeded_total' if success else 'archives_failed_total')
+        self.incr('password_attempts_total', attempts)
+        self.observe_value('attempts_per_archive', attempts, buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+        if success:
+            self.incr('archive_bytes_total', archive_bytes)
+            if seconds > 0:
+                self.observe_value(
+                    'throughput_bytes_per_second',
+                    archive_bytes / seconds,
+                    buckets=(1e5, 1e6, 1e7, 5e7, 1e8, 5e8, 1e9)
+                )
+
+    def record_archive(self, record):
+        """保存一个压缩包的处理记录（路径、大小、格式、解压程序、尝试次数、是否成功、耗时、各阶段耗时）"""
+        with self._lock:
+            self.archives.append(record)
+
+    def archive_records(self):
+        with self._lock:
+            return list(self.archives)
+
+    def finish(self):
+        """标记运行结束"""
+        self.finished_at = time.time()
+
+    def summary(self):
+        """生成指标摘要字典"""
+        with self._lock:
+            finished_at = self.finished_at or time.time()
+            elapsed = finished_at - self.started_at
+            archive_bytes = self.counters.get('archive_bytes_total', 0)
+            return {
+                'host': self.host,
+                'started_at': self.started_at,
+                'finished_at': finished_at,
+                'elapsed_seconds': round(elapsed, 6),
+                'overall_bytes_per_second': round(archive_bytes / elapsed, 3) if elapsed > 0 else 0.0,
+                'counters': dict(self.counters),
+                'stages': {name: h.to_dict() for name, h in self.stage_histograms.items()},
+                'values': {name: h.to_dict() for name, h in self.value_histograms.items()},
+            }
+
+    def export_json(self, path):
+        """导出为JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+
+    def export_prometheus(self, path):
+        """导出为Prometheus文本格式（node_exporter textfile collector可直接读取）"""
+        host = _escape_label(self.host)
+        lines = []
+        summary = self.summary()
+
+        lines.append('# HELP butter_run_elapsed_seconds Wall time of the last processing run.')
+        lines.append('# TYPE butter_run_elapsed_seconds gauge')
+        lines.append(f'butter_run_elapsed_seconds{{host="{host}"}} {summary["elapsed_seconds"]}')
+        lines.append('# HELP butter_run_throughput_bytes_per_second Archive bytes extracted per second of the last run.')
+        lines.append('# TYPE butter_run_throughput_bytes_per_second gauge')
+        lines.append(f'butter_run_throughput_bytes_per_second{{host="{host}"}} {summary["overall_bytes_per_second"]}')
+
+        for name, value in sorted(summary['counters'].items()):
+            metric = f'butter_{name}'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{{host="{host}"}} {value}')
+
+        with self._lock:
+            stage_items = sorted(self.stage_histograms.items())
+            value_items = sorted(self.value_histograms.items())
+
+        lines.append('# HELP butter_stage_duration_seconds Duration of processing stages.')
+        lines.append('# TYPE butter_stage_duration_seconds histogram')
+        for name, histogram in stage_items:
+            lines.extend(_histogram_lines('butter_stage_duration_seconds', histogram, f'host="{host}",stage="{name}"'))
+
+        lines.append('# HELP butter_stage_duration_quantile_seconds Estimated p50/p95 duration of processing stages.')
+        lines.append('# TYPE butter_stage_duration_quantile_seconds gauge')
+        for name, histogram in stage_items:
+            for q in (0.5, 0.95):
+                lines.append(
+                    f'butter_stage_duration_quantile_seconds{{host="{host}",stage="{name}",quantile="{q}"}} '
+                    f'{histogram.quantile(q):.6f}'
+                )
+
+        for name, histogram in value_items:
+            metric = f'butter_{name}'
+            lines.append(f'# TYPE {metric} histogram')
+            lines.extend(_histogram_lines(metric, histogram, f'host="{host}"'))
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+    def export(self, directory, basename='run_metrics'):
+        """同时导出JSON和Prometheus文本文件，返回两个文件路径"""
+        json_path = os.path.join(directory, basename + '.json')
+        prom_path = os.path.join(directory, basename + '.prom')
+        self.export_json(json_path)
+        self.export_prometheus(prom_path)
+        return json_path, prom_path
+
+
+def _histogram_lines(metric, histogram, labels):
+    """生成一个直方图的Prometheus文本行"""
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+        lines.append(f'{metric}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{metric}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+    lines.append(f'{metric}_sum{{{labels}}} {histogram.total:.6f}')
+    lines.append(f'{metric}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def _escape_label(value):
+    """转义Prometheus标签值"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
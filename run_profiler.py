@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行性能分析
+功能：用cProfile和tracemalloc包装一次完整的处理运行，生成.prof文件、内存分配报告，
+以及按当前压缩包和处理阶段标记的调用栈采样
+"""
+
+import os
+import sys
+import time
+import cProfile
+import threading
+import tracemalloc
+
+# 调用栈采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.01
+
+# 每个调用栈最多保留的帧数
+MAX_STACK_DEPTH = 64
+
+
+class StackSampler(threading.Thread):
+    """定时采样目标线程的调用栈，并用当前压缩包和阶段打标签"""
+
+    def __init__(self, target_thread_id, context_provider=None, interval=DEFAULT_SAMPLE_INTERVAL):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.target_thread_id = target_thread_id
+        self.context_provider = context_provider
+        self.interval = interval
+        self.samples = {}  # 折叠后的调用栈 -> 采样次数
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            stack.reverse()
+
+            archive, stage = (None, None)
+            if self.context_provider:
+                try:
+                    archive, stage = self.context_provider(self.target_thread_id)
+                except Exception:
+                    pass
+            tags = [f"archive={archive or '-'}", f"stage={stage or '-'}"]
+            key = ';'.join(tags + stack)
+            self.samples[key] = self.samples.get(key, 0) + 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(timeout=1)
+
+    def write_collapsed(self, path):
+        """以折叠栈格式写出（可直接交给flamegraph.pl或speedscope）"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for key, count in sorted(self.samples.items(), key=lambda item: -item[1]):
+                f.write(f"{key} {count}\n")
+
+
+class RunProfiler:
+    """整次运行的CPU和内存分析器"""
+
+    def __init__(self, output_dir, basename='run_profile', top_n=30,
+                 context_provider=None, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        self.output_dir = output_dir
+        self.basename = basename
+        self.top_n = top_n
+        self.context_provider = context_provider
+        self.sample_interval = sample_interval
+        self.output_files = []
+
+    def run(self, func, *args, **kwargs):
+        """在分析器下执行func，执行完毕后写出分析结果"""
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident(), self.context_provider, self.sample_interval)
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(25)
+        baseline = tracemalloc.take_snapshot()
+        start = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._write_results(profiler, sampler, baseline, snapshot, current, peak, elapsed)
+
+    def _write_results(self, profiler, sampler, baseline, snapshot, current, peak, elapsed):
+        """写出.prof文件、内存分配报告和调用栈采样"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        prof_path = os.path.join(self.output_dir, self.basename + '.prof')
+        alloc_path = os.path.join(self.output_dir, self.basename + '_alloc.txt')
+        stacks_path = os.path.join(self.output_dir, self.basename + '_stacks.txt')
+
+        profiler.dump_stats(prof_path)
+
+        # 过滤掉分析器自身的内存分配
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ]
+        snapshot = snapshot.filter_traces(filters)
+        baseline = baseline.filter_traces(filters)
+        with open(alloc_path, 'w', encoding='utf-8') as f:
+            f.write(f"运行耗时: {elapsed:.3f}s\n")
+            f.write(f"当前跟踪内存: {current / 1024:.1f} KiB, 峰值: {peak / 1024:.1f} KiB\n")
+            f.write(f"调用栈采样数: {sum(sampler.samples.values())}\n\n")
+
+            f.write(f"运行期间新增内存分配 Top {self.top_n}（按代码行）:\n")
+            f.write("-" * 60 + "\n")
+            for stat in snapshot.compare_to(baseline, 'lineno')[:self.top_n]:
+                f.write(f"{stat}\n")
+
+            f.write(f"\n运行结束时仍存活的内存分配 Top {self.top_n}（按调用栈）:\n")
+            f.write("-" * 60 + "\n")
+            for stat in snapshot.statistics('traceback')[:self.top_n]:
+                f.write(f"{stat.count} blocks, {stat.size / 1024:.1f} KiB\n")
+                for line in stat.traceback.format(limit=5):
+                    f.write(f"    {line}\n")
+
+        sampler.write_collapsed(stacks_path)
+        self.output_files = [prof_path, alloc_path, stacks_path]
+        return self.output_files
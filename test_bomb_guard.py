@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压炸弹防护测试
+"""
+
+import os
+
+from bomb_guard import BombGuard, GuardLimits
+from adaptive_timeout import ProgressWatchdog, member_paths, member_baseline
+
+
+def probe(size, entries, archive_size=1000, exact=True):
+    return {'archive_size': archive_size, 'uncompressed_size': size, 'entries': entries, 'exact': exact}
+
+
+def test_header_rejects_job_limits():
+    guard = BombGuard(GuardLimits({'job_bytes': 1000, 'job_entries': 10}))
+    budget, reason = guard.begin('/x/a.zip', probe(2000, 1))
+    assert budget is None and '解压后大小' in reason
+    budget, reason = guard.begin('/x/b.zip', probe(10, 11))
+    assert budget is None and '文件数' in reason
+    assert guard.rejected == 2
+
+
+def test_ratio_only_checked_for_large_outputs():
+    guard = BombGuard(GuardLimits({'max_ratio': 10}))
+    budget, reason = guard.begin('/x/small.zip', probe(1024 * 1024, 1, archive_size=1))
+    assert reason is None
+    guard.finish(budget)
+    budget, reason = guard.begin('/x/big.zip', probe(128 * 1024 ** 2, 1, archive_size=1024 ** 2))
+    assert budget is None and '压缩率' in reason
+
+
+def test_run_entries_counted_from_header_on_success():
+    """解压在第一次采样前结束时按文件头记录的文件数计入本次运行"""
+    guard = BombGuard(GuardLimits({'run_entries': 3}))
+    budget, reason = guard.begin('/x/a.zip', probe(10, 2))
+    assert reason is None
+    budget.succeeded = True
+    guard.finish(budget)
+    assert guard.run_entries == 2
+    budget, reason = guard.begin('/x/b.zip', probe(10, 2))
+    assert budget is None and '将超过上限' in reason
+
+
+def test_final_measure_counts_fast_jobs():
+    """没有文件头信息的格式在解压结束时最后统计一次输出"""
+    guard = BombGuard(GuardLimits({'run_bytes': 100}))
+    budget, _ = guard.begin('/x/a.7z', probe(0, None, exact=False))
+    budget.watch(lambda: (80, 4), lambda: None)
+    budget.unwatch()
+    assert budget.reason is None
+    guard.finish(budget)
+    assert (guard.run_bytes, guard.run_entries) == (80, 4)
+    budget, _ = guard.begin('/x/b.7z', probe(0, None, exact=False))
+    budget.watch(lambda: (30, 1), lambda: None)
+    budget.unwatch()
+    assert budget.reason is not None and '本次运行' in budget.reason
+    guard.finish(budget)
+    assert guard.aborted == 1
+    budget, reason = guard.begin('/x/c.7z', probe(0, None, exact=False))
+    assert budget is None and '已达到上限' in reason
+
+
+def test_streaming_abort_cancels_job():
+    guard = BombGuard(GuardLimits({'job_bytes': 100}))
+    budget, _ = guard.begin('/x/a.7z', probe(0, None, exact=False))
+    cancelled = []
+    budget.watch(lambda: (0, 0), lambda: cancelled.append(True))
+    assert budget.update(num_bytes=500) is not None
+    assert cancelled == [True]
+    budget.unwatch()
+    guard.finish(budget)
+    assert guard.aborted == 1 and guard.run_bytes == 500
+
+
+def test_nesting_depth():
+    guard = BombGuard(GuardLimits({'max_depth': 2}))
+    assert guard.level_of('/in/a.zip') == 1
+    guard.mark_outputs('/in', ['a'], 1)
+    assert guard.level_of('/in/a/inner.zip') == 2
+    guard.mark_outputs('/in/a', ['b'], 2)
+    budget, reason = guard.begin('/in/a/b/deep.zip', probe(1, 1))
+    assert budget is None and '嵌套层数 3' in reason
+    guard.moved('/in/a/b', '/in/a/c')
+    assert guard.level_of('/in/a/c/x.zip') == 3
+
+
+def test_watchdog_counts_only_own_members(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'old.txt').write_text('a')
+    (tmp_path / 'top.txt').write_text('b')
+    members = member_paths(str(tmp_path), [['sub/new.txt', 100], ['top.txt', 50], ['../escape.txt', 1]])
+    assert len(members) == 2
+    watchdog = ProgressWatchdog(str(tmp_path), os.listdir(tmp_path), members, member_baseline(members))
+    assert watchdog.output_stats() == (0, 0)
+    (tmp_path / 'sub' / 'new.txt').write_bytes(b'x' * 100)
+    (tmp_path / 'top.txt').write_bytes(b'y' * 50)
+    # 同一目录中其他任务（如流水线解压的内层压缩包）写出的文件不计入
+    (tmp_path / 'sub' / 'inner_output.bin').write_bytes(b'z' * 1000)
+    (tmp_path / 'other').mkdir()
+    assert watchdog.output_stats() == (150, 2)
+
+
+def test_watchdog_without_members_counts_new_top_level_names(tmp_path):
+    (tmp_path / 'old.txt').write_text('a')
+    watchdog = ProgressWatchdog(str(tmp_path), os.listdir(tmp_path))
+    (tmp_path / 'new').mkdir()
+    (tmp_path / 'new' / 'a.bin').write_bytes(b'x' * 10)
+    (tmp_path / 'b.bin').write_bytes(b'y' * 5)
+    assert watchdog.output_stats() == (15, 2)
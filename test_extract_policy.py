@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压策略测试（规则解析和匹配）
+"""
+
+import pytest
+
+from extract_policy import (ExtractionPolicy, ACTION_STOP, ACTION_SKIP, ACTION_PROCESS, ACTION_EXTRACT,
+                            CLASS_ARCHIVE, CLASS_MALFORMED, CLASS_EXECUTABLE, CLASS_OTHER)
+
+EXTENSIONS = ['.7z', '.zip', '.rar', '.tar', '.gz', '.bz2', '.xz']
+
+
+def is_malformed(filename):
+    lower = filename.lower()
+    return any(ext in lower and not lower.endswith(ext) for ext in EXTENSIONS)
+
+
+def policy(settings=None):
+    return ExtractionPolicy(EXTENSIONS, is_malformed, settings)
+
+
+def summary(files, path='/in/folder', depth=1, settings=None):
+    return policy(settings).summary_of(path, depth, files)
+
+
+def test_classify():
+    p = policy()
+    assert p.classify('setup.EXE') == CLASS_EXECUTABLE
+    assert p.classify('a.zip') == CLASS_ARCHIVE
+    assert p.classify('a.7z删') == CLASS_MALFORMED
+    assert p.classify('notes.txt') == CLASS_OTHER
+
+
+def test_default_rules():
+    p = policy()
+    assert p.decide_folder(summary({'a.zip': 1, 'setup.exe': 1}))[0] == ACTION_STOP
+    assert p.decide_folder(summary({'notes.txt': 1})) == (ACTION_SKIP, '没有压缩包')
+    assert p.decide_folder(summary({'a.zip': 1}))[0] == ACTION_PROCESS
+    crowded = summary({'a.zip': 1, 'b.zip': 1, 'c.txt': 1})
+    assert p.decide_archive(crowded, 'a.zip') == (ACTION_SKIP, '文件夹中有多个文件和压缩包')
+    assert p.decide_archive(summary({'a.zip': 1, 'b.txt': 1, 'c.txt': 1}), 'a.zip')[0] == ACTION_EXTRACT
+    assert p.decide_archive(summary({'a.zip1': 1, 'b.zip': 1, 'c.txt': 1}), 'a.zip1')[0] == ACTION_EXTRACT
+
+
+def test_comparisons_and_units():
+    settings = {'archive_rules': [
+        {'name': '大文件', 'size': '>1MB', 'action': 'skip'},
+        {'name': '浅层', 'depth': '<=1', 'ext': ['.zip', '.7z'], 'action': 'extract'},
+        {'name': '其他', 'files': '!=0', 'action': 'skip'},
+    ]}
+    p = policy(settings)
+    files = {'big.zip': 2 * 1024 ** 2, 'small.zip': 1024, 'x.rar': 10}
+    assert p.decide_archive(summary(files, depth=1), 'big.zip') == (ACTION_SKIP, '大文件')
+    assert p.decide_archive(summary(files, depth=1), 'small.zip') == (ACTION_EXTRACT, '浅层')
+    assert p.decide_archive(summary(files, depth=2), 'small.zip') == (ACTION_SKIP, '其他')
+    assert p.decide_archive(summary(files, depth=1), 'x.rar') == (ACTION_SKIP, '其他')
+
+
+def test_path_folder_ext_and_kind():
+    settings = {
+        'folder_rules': [
+            {'path': '*/media/*', 'folder_ext': ['.iso', '.mkv'], 'action': 'stop'},
+            {'total_size': '>=1GB', 'action': 'skip'},
+        ],
+        'archive_rules': [{'kind': 'normal', 'path': '/in/*/keep.zip', 'action': 'extract'}],
+        'default_archive_action': 'skip',
+    }
+    p = policy(settings)
+    assert p.decide_folder(summary({'a.mkv': 1, 'b.zip': 1}, path='/in/media/x'))[0] == ACTION_STOP
+    assert p.decide_folder(summary({'a.mkv': 1, 'b.zip': 1}, path='/in/other'))[0] == ACTION_PROCESS
+    assert p.decide_folder(summary({'b.zip': 1024 ** 3}))[0] == ACTION_SKIP
+    files = {'keep.zip': 1, 'drop.zip': 1, 'keep.zip1': 1}
+    assert p.decide_archive(summary(files), 'keep.zip')[0] == ACTION_EXTRACT
+    assert p.decide_archive(summary(files), 'drop.zip') == (ACTION_SKIP, '没有匹配的规则')
+    assert p.decide_archive(summary(files), 'keep.zip1')[0] == ACTION_SKIP
+
+
+def test_rule_without_name_uses_conditions_as_reason():
+    p = policy({'archive_rules': [{'archives': 1, 'action': 'extract'}]})
+    assert p.decide_archive(summary({'a.zip': 1}), 'a.zip') == (ACTION_EXTRACT, 'archives=1')
+
+
+@pytest.mark.parametrize('settings', [
+    {'archive_rules': [{'files': 1, 'action': 'explode'}]},
+    {'archive_rules': [{'action': 'extract'}]},
+    {'archive_rules': [{'color': 'red', 'action': 'extract'}]},
+    {'archive_rules': [{'files': 'many', 'action': 'extract'}]},
+    {'archive_rules': [{'files': '2MB', 'action': 'extract'}]},
+    {'archive_rules': [{'kind': 'broken', 'action': 'extract'}]},
+    {'folder_rules': [{'ext': '.zip', 'action': 'stop'}]},
+    {'folder_rules': [{'files': 1, 'action': 'extract'}]},
+    {'default_archive_action': 'maybe'},
+])
+def test_invalid_rules_rejected(settings):
+    with pytest.raises(ValueError):
+        policy(settings)
+
+
+def test_summarize_reads_folder_once(tmp_path):
+    (tmp_path / 'a.zip').write_bytes(b'x' * 10)
+    (tmp_path / 'b.txt').write_bytes(b'y' * 5)
+    (tmp_path / 'sub').mkdir()
+    result = policy().summarize(str(tmp_path), 0)
+    assert result.files == {'a.zip': 10, 'b.txt': 5}
+    assert result.counts[CLASS_ARCHIVE] == 1 and result.total_size == 15
+    assert result.has_archive and result.names(CLASS_MALFORMED) == []
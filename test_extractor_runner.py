@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压程序子进程调度测试（输出分段和出错时结束进程树）
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from extractor_runner import ExtractorJobRunner
+
+
+@pytest.fixture
+def runner():
+    runner = ExtractorJobRunner()
+    yield runner
+    runner.close()
+
+
+def python(code):
+    return [sys.executable, '-c', code]
+
+
+def test_long_output_without_newline_split_on_backspace_and_cr(runner):
+    # 7-Zip的-bsp1进度：用退格覆盖同一行，整个解压过程不换行
+    code = ("import sys\n"
+            "for i in range(101):\n"
+            "    sys.stdout.write('\\b' * 40 + f'{i:3d}% 12 - ' + 'x' * 2000)\n"
+            "sys.stdout.write('\\rEverything is Ok\\r\\n')\n")
+    segments = []
+    result = runner.run(python(code), timeout=30, on_output=lambda name, text: segments.append(text))
+    assert result.returncode == 0 and not result.cancelled
+    assert 'Everything is Ok' in result.stdout and len(result.stdout) > 64 * 1024
+    percents = [s for s in segments if '%' in s]
+    assert len(percents) == 101 and percents[-1].startswith('100%')
+    assert segments[-1].strip() == 'Everything is Ok'
+
+
+def test_output_without_any_separator_is_bounded(runner):
+    segments = []
+    result = runner.run(python("import sys; sys.stdout.write('y' * 300000)"), timeout=30,
+                        on_output=lambda name, text: segments.append(text))
+    assert result.returncode == 0 and len(result.stdout) == 300000
+    assert sum(len(s) for s in segments) == 300000 and max(len(s) for s in segments) <= 2 * 64 * 1024
+
+
+def test_reader_error_kills_process_tree(runner, tmp_path):
+    pid_file = tmp_path / 'pid'
+    code = f"import os, time; open({str(pid_file)!r}, 'w').write(str(os.getpid())); print('x', flush=True); time.sleep(60)"
+
+    async def broken_reader(stream, chunks, on_output, stream_name):
+        await stream.read(1)
+        raise ValueError('Separator is not found, and chunk exceed the limit')
+
+    runner._read_stream = broken_reader
+    start = time.monotonic()
+    with pytest.raises(ValueError):
+        runner.run(python(code), timeout=30)
+    assert time.monotonic() - start < 20
+    pid = int(pid_file.read_text())
+    with pytest.raises(ProcessLookupError):
+        os.kill(pid, 0)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按存储设备限制解压并发测试
+"""
+
+import os
+
+import io_limits
+from io_limits import DeviceLimiter
+from job_scheduler import JobScheduler, ExtractionJob
+
+
+def test_charges_computed_once_at_submit(tmp_path, monkeypatch):
+    archive = tmp_path / 'a.zip'
+    archive.write_bytes(b'x' * 100)
+    limiter = DeviceLimiter({'devices': {str(tmp_path): {'max_jobs': 1}}})
+    scheduler = JobScheduler('fifo', prepare=limiter.prepare)
+    first = ExtractionJob(str(archive), 1000, 0, target=str(tmp_path))
+    second = ExtractionJob(str(archive), 500, 0, target=str(tmp_path))
+    scheduler.submit(first)
+    scheduler.submit(second)
+    dev = os.stat(tmp_path).st_dev
+    assert first.charges == {dev: 1100} and second.charges == {dev: 600}
+
+    # 准入检查在调度器的锁内进行，不再访问文件系统
+    def no_fs(*args, **kwargs):
+        raise AssertionError('准入检查访问了文件系统')
+
+    monkeypatch.setattr(io_limits.os, 'stat', no_fs)
+    monkeypatch.setattr(io_limits.os.path, 'getsize', no_fs)
+    taken = scheduler.get(admit=limiter.try_acquire)
+    assert taken is first
+    # 设备并发已满，第二个任务暂时不能开始
+    assert not limiter.try_acquire(second)
+    limiter.release(taken)
+    scheduler.done(taken)
+    assert scheduler.get(admit=limiter.try_acquire) is second
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+解压任务调度测试（顺序和等待时间上限）
+"""
+
+import threading
+
+import pytest
+
+from job_scheduler import JobScheduler, ExtractionJob
+
+
+def job(path, size=0, depth=0):
+    return ExtractionJob(path, size, depth)
+
+
+def drain(scheduler, admit=None):
+    order = []
+    while True:
+        taken = scheduler.get(admit=admit)
+        if taken is None:
+            return order
+        order.append(taken.path)
+        scheduler.done(taken)
+
+
+def submit_all(scheduler, jobs):
+    for j in jobs:
+        scheduler.submit(j)
+
+
+JOBS = [('/in/a/big.zip', 300, 1), ('/in/small.zip', 10, 0), ('/in/a/b/mid.zip', 100, 2), ('/in/tiny.zip', 1, 0)]
+
+
+@pytest.mark.parametrize('policy, expected', [
+    ('sjf', ['/in/tiny.zip', '/in/small.zip', '/in/a/b/mid.zip', '/in/a/big.zip']),
+    ('shallow', ['/in/tiny.zip', '/in/small.zip', '/in/a/big.zip', '/in/a/b/mid.zip']),
+    ('fifo', ['/in/a/big.zip', '/in/small.zip', '/in/a/b/mid.zip', '/in/tiny.zip']),
+])
+def test_policy_order(policy, expected):
+    scheduler = JobScheduler(policy)
+    submit_all(scheduler, [job(*spec) for spec in JOBS])
+    assert drain(scheduler) == expected
+
+
+def test_priority_rules_first_match_wins():
+    rules = [{'pattern': '*/urgent/*', 'priority': 10}, {'pattern': '*.zip', 'priority': 1}]
+    scheduler = JobScheduler('priority', rules)
+    submit_all(scheduler, [job('/in/x.7z', 1), job('/in/y.zip', 50), job('/in/urgent/z.zip', 99),
+                           job('/in/w.zip', 20)])
+    assert drain(scheduler) == ['/in/urgent/z.zip', '/in/w.zip', '/in/y.zip', '/in/x.7z']
+
+
+def test_best_candidate_uses_policy():
+    scheduler = JobScheduler('sjf')
+    candidates = [job('/in/a.zip', 30), job('/in/b.zip', 5), job('/in/c.zip', 5)]
+    assert scheduler.best(candidates).path == '/in/b.zip'
+    assert JobScheduler('fifo').best(candidates).path == '/in/a.zip'
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        JobScheduler('random')
+
+
+def test_aging_promotes_oldest_job():
+    scheduler = JobScheduler('sjf', max_wait=10)
+    big = job('/in/big.zip', 1000)
+    scheduler.submit(big)
+    submit_all(scheduler, [job('/in/s1.zip', 1), job('/in/s2.zip', 2)])
+    big.submitted_at -= 11
+    assert drain(scheduler) == ['/in/big.zip', '/in/s1.zip', '/in/s2.zip']
+    assert scheduler.promoted == 1
+
+
+def test_aging_disabled_keeps_policy_order():
+    scheduler = JobScheduler('sjf', max_wait=None)
+    big = job('/in/big.zip', 1000)
+    scheduler.submit(big)
+    scheduler.submit(job('/in/s1.zip', 1))
+    big.submitted_at -= 10 ** 6
+    assert drain(scheduler) == ['/in/s1.zip', '/in/big.zip']
+
+
+def test_admission_skips_busy_jobs_without_losing_them():
+    scheduler = JobScheduler('sjf')
+    submit_all(scheduler, [job('/hdd/a.zip', 1), job('/ssd/b.zip', 2), job('/hdd/c.zip', 3)])
+    first = scheduler.get(admit=lambda j: j.path.startswith('/ssd'))
+    assert first.path == '/ssd/b.zip'
+    scheduler.done(first)
+    assert drain(scheduler) == ['/hdd/a.zip', '/hdd/c.zip']
+
+
+def test_get_waits_for_follow_up_jobs_and_close_wakes_workers():
+    scheduler = JobScheduler('fifo')
+    scheduler.submit(job('/in/outer.zip'))
+    outer = scheduler.get()
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(scheduler.get()))
+    waiter.start()
+    # 正在运行的任务提交后续任务后，等待的工作线程拿到它
+    scheduler.submit(job('/in/inner.zip'))
+    scheduler.done(outer)
+    waiter.join(5)
+    assert result[0].path == '/in/inner.zip'
+    idle = threading.Thread(target=lambda: result.append(scheduler.get()))
+    idle.start()
+    scheduler.close()
+    idle.join(5)
+    assert not idle.is_alive() and result[1] is None
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本机任务服务测试（请求校验和取消）
+"""
+
+import json
+import time
+import socket
+import threading
+
+import pytest
+
+from job_service import (JobService, ServiceClient, ServiceError, create_server, MAX_REQUEST_BYTES,
+                         JOB_QUEUED, JOB_RUNNING, JOB_CANCELLED, JOB_SUCCEEDED)
+
+
+class FakeEngine:
+    """只记录调用的引擎：process_folder在release事件之前一直运行，停止后立即返回"""
+
+    def __init__(self):
+        self.log_callback = lambda message: None
+        self.progress_callback = None
+        self.workers = 1
+        self.backends = {}
+        self.stop_processing = False
+        self.has_password = False
+        self.use_bandizip_wait = False
+        self.started = threading.Event()
+        self.gate = threading.Event()
+        self.gate.set()
+        self.release = threading.Event()
+        self.stop_calls = 0
+        self.processed = []
+
+    def request_stop(self):
+        self.stop_calls += 1
+        self.stop_processing = True
+        self.release.set()
+
+    def process_folder(self, folder, cancelled=None):
+        # 与真实引擎相同：开始时重置停止标志，之后检查处理开始前是否已被取消
+        self.gate.wait(10)
+        self.stop_processing = False
+        if cancelled is not None and cancelled():
+            self.stop_processing = True
+            return {'folder': folder, 'stopped': True, 'error': None, 'succeeded': 0, 'failed': 0}
+        self.log_callback(f"开始处理文件夹: {folder}")
+        self.processed.append(folder)
+        self.started.set()
+        self.release.wait(10)
+        self.release.clear()
+        return {'folder': folder, 'stopped': self.stop_processing, 'error': None, 'succeeded': 1, 'failed': 0}
+
+
+@pytest.fixture
+def server(tmp_path):
+    engine = FakeEngine()
+    service = JobService(engine, max_queue=2)
+    socket_path = str(tmp_path / 'service.sock')
+    httpd = create_server(service, socket_path=socket_path)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield service, engine, socket_path
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def raw_request(socket_path, head, body=b''):
+    """发送原始HTTP请求，返回 (状态码, JSON内容)"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(10)
+        sock.connect(socket_path)
+        sock.sendall(head.encode('ascii') + b'\r\n\r\n' + body)
+        sock.shutdown(socket.SHUT_WR)
+        response = b''
+        while True:
+            chunk = sock.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+    header, _, content = response.partition(b'\r\n\r\n')
+    return int(header.split()[1]), json.loads(content)
+
+
+@pytest.mark.parametrize('length', ['abc', '-1', '1e3'])
+def test_invalid_content_length_rejected(server, length):
+    _, _, socket_path = server
+    status, data = raw_request(socket_path, f'POST /jobs HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {length}')
+    assert status == 400 and 'Content-Length' in data['error']
+
+
+def test_oversized_request_rejected(server):
+    _, _, socket_path = server
+    status, _ = raw_request(socket_path, f'POST /jobs HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: {MAX_REQUEST_BYTES + 1}')
+    assert status == 413
+
+
+def test_invalid_body_and_options(server, tmp_path):
+    _, _, socket_path = server
+    status, _ = raw_request(socket_path, 'POST /jobs HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\nContent-Length: 5', b'{nope')
+    assert status == 400
+    client = ServiceClient(socket_path)
+    assert client.request('POST', '/jobs', {})[0] == 400
+    assert client.request('POST', '/jobs', {'folder': str(tmp_path / 'missing')})[0] == 404
+    assert client.request('POST', '/jobs', {'folder': str(tmp_path), 'priority': 'high'})[0] == 400
+    assert client.request('GET', '/jobs/999')[0] == 404
+    assert client.request('DELETE', '/jobs')[0] == 404
+
+
+def test_queue_limit_and_cancel_queued(server, tmp_path):
+    service, _, _ = server
+    first = service.submit({'folder': str(tmp_path)})
+    service.submit({'folder': str(tmp_path)})
+    with pytest.raises(ServiceError) as error:
+        service.submit({'folder': str(tmp_path)})
+    assert error.value.status == 503
+    assert first.state == JOB_QUEUED
+    assert service.cancel(first.job_id).state == JOB_CANCELLED
+    assert service.status()['queued'] == 1
+
+
+def test_cancel_running_job_does_not_stop_next(server, tmp_path):
+    service, engine, _ = server
+    (tmp_path / 'a').mkdir()
+    (tmp_path / 'b').mkdir()
+    service.start()
+    first = service.submit({'folder': str(tmp_path / 'a')})
+    second = service.submit({'folder': str(tmp_path / 'b')})
+    assert engine.started.wait(10)
+    engine.started.clear()
+    service.cancel(first.job_id)
+    assert engine.started.wait(10)
+    # 第一个任务结束后再次取消它不能停止第二个任务
+    service.cancel(first.job_id)
+    assert engine.stop_calls == 1 and not engine.stop_processing
+    engine.release.set()
+    for _ in range(100):
+        if second.state == JOB_SUCCEEDED:
+            break
+        time.sleep(0.05)
+    service.stop()
+    service.join(10)
+    assert first.state == JOB_CANCELLED
+    assert second.state == JOB_SUCCEEDED
+
+
+def test_cancel_before_engine_starts_is_kept(server, tmp_path):
+    """取消请求在引擎重置停止标志之前到达：引擎重置后检查到已取消，不开始处理"""
+    service, engine, _ = server
+    engine.gate.clear()
+    service.start()
+    job = service.submit({'folder': str(tmp_path)})
+    for _ in range(100):
+        if job.state == JOB_RUNNING:
+            break
+        time.sleep(0.05)
+    service.cancel(job.job_id)
+    engine.gate.set()
+    for _ in range(100):
+        if job.state == JOB_CANCELLED:
+            break
+        time.sleep(0.05)
+    assert job.state == JOB_CANCELLED and job.result['stopped']
+    assert engine.processed == []
+    service.stop()
+    service.join(10)
+
+
+@pytest.mark.parametrize('head', [
+    'POST /jobs HTTP/1.1\r\nHost: localhost\r\nContent-Type: text/plain\r\nContent-Length: 2',
+    'POST /jobs HTTP/1.1\r\nHost: localhost\r\nContent-Length: 2',
+])
+def test_post_requires_json_content_type(server, head):
+    _, _, socket_path = server
+    assert raw_request(socket_path, head, b'{}')[0] == 415
+
+
+@pytest.mark.parametrize('host', ['evil.example', 'evil.example:8765', '', '127.0.0.1.evil.example'])
+def test_foreign_host_rejected(server, host):
+    _, _, socket_path = server
+    status, data = raw_request(socket_path, f'GET /status HTTP/1.1\r\nHost: {host}')
+    assert status == 403 and 'Host' in data['error']
+
+
+@pytest.mark.parametrize('host', ['localhost', '127.0.0.1:8765', '[::1]:8765'])
+def test_local_hosts_accepted(server, host):
+    _, _, socket_path = server
+    assert raw_request(socket_path, f'GET /status HTTP/1.1\r\nHost: {host}')[0] == 200
+
+
+def test_create_server_keeps_regular_file(tmp_path):
+    path = tmp_path / 'service.sock'
+    path.write_text('not a socket')
+    with pytest.raises(FileExistsError):
+        create_server(JobService(FakeEngine()), socket_path=str(path))
+    assert path.read_text() == 'not a socket'
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多节点租约测试
+"""
+
+import os
+import time
+import json
+import random
+import multiprocessing
+
+from lease_coordinator import LeaseCoordinator, LEASE_ACQUIRED, LEASE_HELD, LEASE_DONE
+
+TTL = 5.0
+
+
+def make_folder(tmp_path, name='job'):
+    folder = tmp_path / name
+    folder.mkdir()
+    return str(folder)
+
+
+def expire(lease_path, seconds=TTL * 10):
+    past = time.time() - seconds
+    os.utime(lease_path, (past, past))
+
+
+def read_node(lease_path):
+    with open(lease_path, 'r', encoding='utf-8') as f:
+        return json.load(f)['node']
+
+
+def test_claim_held_and_done(tmp_path):
+    folder = make_folder(tmp_path)
+    a = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='a')
+    b = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='b')
+    assert a.claim(folder) == LEASE_ACQUIRED
+    assert b.claim(folder, depth=1) == LEASE_HELD
+    assert b.has_deferred()
+    a.release(folder)
+    finished, expired = b.poll_deferred()
+    assert finished == [(folder, 1)] and expired == []
+    assert b.claim(folder) == LEASE_DONE
+    # 文件夹有变化后需要重新处理
+    open(os.path.join(folder, 'new.zip'), 'w').close()
+    assert b.claim(folder) == LEASE_ACQUIRED
+
+
+def test_expired_lease_taken_over(tmp_path):
+    folder = make_folder(tmp_path)
+    a = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='a')
+    b = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='b')
+    assert a.claim(folder) == LEASE_ACQUIRED
+    lease_path = a.held[folder][0]
+    assert b.claim(folder) == LEASE_HELD
+    assert b.poll_deferred() == ([], [])
+    expire(lease_path)
+    assert b.poll_deferred() == ([], [(folder, 0)])
+    assert b.claim(folder) == LEASE_ACQUIRED
+    assert b.stolen == 1
+    assert read_node(lease_path) == 'b'
+
+
+def test_takeover_backs_off_when_lease_renewed(tmp_path):
+    """判定过期之后原节点更新了心跳：不能改走仍然有效的租约"""
+    folder = make_folder(tmp_path)
+    a = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='a')
+    b = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='b')
+    a.claim(folder)
+    lease_path = a.held[folder][0]
+    expire(lease_path)
+    state = b._lease_state(lease_path)
+    assert b._expired(state)
+    os.utime(lease_path, None)
+    assert not b._take_over(lease_path, folder, state)
+    assert read_node(lease_path) == 'a'
+    assert [name for name in os.listdir(b.lease_dir) if '.stale.' in name] == []
+
+
+def test_takeover_backs_off_when_other_node_took_over(tmp_path):
+    """判定过期之后第三个节点已经接管并写入了新租约：放弃接管并保留它的租约"""
+    folder = make_folder(tmp_path)
+    a = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='a')
+    b = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='b')
+    c = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='c')
+    a.claim(folder)
+    lease_path = a.held[folder][0]
+    expire(lease_path)
+    state = b._lease_state(lease_path)
+    assert c.claim(folder) == LEASE_ACQUIRED
+    assert not b._take_over(lease_path, folder, state)
+    assert read_node(lease_path) == 'c'
+
+
+def test_heartbeat_detects_takeover_and_stops_renewing(tmp_path):
+    """租约被接管后原节点的心跳不能替新节点续期，并通知调用方放弃该文件夹"""
+    folder = make_folder(tmp_path)
+    a = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='a')
+    b = LeaseCoordinator(str(tmp_path), ttl=TTL, node_id='b')
+    lost = []
+    a.on_lost = lost.append
+    a.claim(folder)
+    lease_path, token = a.held[folder]
+    assert a._renew(lease_path, token)
+    expire(lease_path)
+    assert b.claim(folder) == LEASE_ACQUIRED
+    expire(lease_path, TTL * 2)
+    before = os.stat(lease_path).st_mtime_ns
+    a.heartbeat_interval = 0.01
+    a.start_heartbeat()
+    for _ in range(200):
+        if lost:
+            break
+        time.sleep(0.01)
+    a.close()
+    assert lost == [folder] and not a.owns(folder)
+    assert os.stat(lease_path).st_mtime_ns == before
+    # 原节点释放时不会删除新节点的租约
+    assert read_node(lease_path) == 'b' and b.owns(folder)
+
+
+def _contend(root, node_id, rounds, start, end, results):
+    coordinator = LeaseCoordinator(root, ttl=TTL, node_id=node_id)
+    # 模拟较慢的共享目录：判定过期之后隔一段时间才改名，其他节点可能已经在这期间接管
+    expired = coordinator._expired
+    coordinator._expired = lambda state: (expired(state), time.sleep(random.uniform(0, 0.02)))[0]
+    folder = os.path.join(root, 'job')
+    for _ in range(rounds):
+        start.wait()
+        results.put((node_id, coordinator.claim(folder)))
+        with coordinator._lock:
+            coordinator.held.clear()
+        end.wait()
+
+
+def test_expired_lease_contention_has_single_winner(tmp_path):
+    """多个进程同时接管同一份过期租约，每轮只能有一个节点获得"""
+    folder = make_folder(tmp_path)
+    root = str(tmp_path)
+    stale = LeaseCoordinator(root, ttl=TTL, node_id='dead')
+    stale.claim(folder)
+    lease_path = stale.held[folder][0]
+    processes, rounds = 8, 40
+    context = multiprocessing.get_context('spawn')
+    start, end = context.Barrier(processes + 1), context.Barrier(processes + 1)
+    results = context.Queue()
+    workers = [context.Process(target=_contend, args=(root, f'n{i}', rounds, start, end, results))
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    try:
+        for _ in range(rounds):
+            expire(lease_path)
+            start.wait(timeout=60)
+            outcomes = [results.get(timeout=60) for _ in workers]
+            end.wait(timeout=60)
+            winners = [node for node, outcome in outcomes if outcome == LEASE_ACQUIRED]
+            assert len(winners) == 1
+            assert read_node(lease_path) == winners[0]
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+    assert [name for name in os.listdir(stale.lease_dir) if '.stale.' in name] == []
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内置解压程序测试（未压缩zip、tar和CRC校验失败）
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from native_extractor import extract, main, parse_args, EXIT_OK, EXIT_FATAL, EXIT_USAGE
+
+CONTENTS = {
+    'readme.txt': b'hello' * 1000,
+    'sub/data.bin': bytes(range(256)) * 4096,
+    'sub/empty.txt': b'',
+}
+
+
+def make_zip(path, compression=zipfile.ZIP_STORED):
+    with zipfile.ZipFile(path, 'w', compression) as zf:
+        zf.writestr('sub/', '')
+        for name, data in CONTENTS.items():
+            zf.writestr(name, data)
+
+
+def assert_extracted(folder):
+    for name, data in CONTENTS.items():
+        with open(os.path.join(folder, name), 'rb') as f:
+            assert f.read() == data
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_extract_zip(tmp_path, capsys, compression):
+    archive = str(tmp_path / 'a.zip')
+    make_zip(archive, compression)
+    out = str(tmp_path / 'out')
+    assert extract(archive, out) == EXIT_OK
+    assert_extracted(out)
+    printed = capsys.readouterr().out
+    assert 'DONE readme.txt' in printed and 'Everything is Ok' in printed
+
+
+@pytest.mark.parametrize('suffix, mode', [('.tar', 'w'), ('.tar.gz', 'w:gz'), ('.tar.xz', 'w:xz')])
+def test_extract_tar(tmp_path, suffix, mode):
+    archive = str(tmp_path / ('a' + suffix))
+    with tarfile.open(archive, mode) as tf:
+        for name, data in CONTENTS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+        link = tarfile.TarInfo('escape')
+        link.type = tarfile.SYMTYPE
+        link.linkname = '/etc/passwd'
+        tf.addfile(link)
+    out = str(tmp_path / 'out')
+    assert extract(archive, out) == EXIT_OK
+    assert_extracted(out)
+    # 链接不解压
+    assert not os.path.lexists(os.path.join(out, 'escape'))
+
+
+@pytest.mark.parametrize('compression', [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_crc_failure_reported(tmp_path, capsys, compression):
+    archive = tmp_path / 'bad.zip'
+    make_zip(str(archive), compression)
+    raw = bytearray(archive.read_bytes())
+    # 修改数据区中间的一个字节，文件头和目录保持不变
+    if compression == zipfile.ZIP_STORED:
+        offset = raw.index(CONTENTS['sub/data.bin'][:1024]) + 5000
+    else:
+        with zipfile.ZipFile(str(archive)) as zf:
+            entry = zf.getinfo('sub/data.bin')
+        offset = entry.header_offset + zipfile.sizeFileHeader + len(entry.filename) + entry.compress_size // 2
+    raw[offset] ^= 0xFF
+    archive.write_bytes(bytes(raw))
+    assert extract(str(archive), str(tmp_path / 'out')) == EXIT_FATAL
+    assert capsys.readouterr().err.startswith(('CRC Failed', 'Data Error'))
+
+
+def test_stored_zip_crc_mismatch_names_crc(tmp_path, capsys):
+    archive = tmp_path / 'bad.zip'
+    make_zip(str(archive))
+    raw = bytearray(archive.read_bytes())
+    raw[raw.index(b'hellohello') + 3] ^= 0xFF
+    archive.write_bytes(bytes(raw))
+    assert extract(str(archive), str(tmp_path / 'out')) == EXIT_FATAL
+    assert capsys.readouterr().err.startswith('CRC Failed')
+
+
+def test_unsafe_path_and_unknown_format(tmp_path, capsys):
+    archive = str(tmp_path / 'evil.zip')
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('../outside.txt', b'x')
+    assert extract(archive, str(tmp_path / 'out')) == EXIT_FATAL
+    assert not (tmp_path / 'outside.txt').exists()
+    other = tmp_path / 'a.rar'
+    other.write_bytes(b'Rar!')
+    assert extract(str(other), str(tmp_path / 'out')) == EXIT_FATAL
+    assert 'Cannot open the file as archive' in capsys.readouterr().err
+
+
+def test_parse_args_and_main(tmp_path):
+    archive = str(tmp_path / 'a.zip')
+    make_zip(archive)
+    out = str(tmp_path / 'out')
+    assert parse_args(['x', '-y', '-aoa', '-p:secret', f'-o:{out}', archive]) == (archive, out, 'secret')
+    assert parse_args(['x', archive]) == (archive, str(tmp_path), '')
+    assert parse_args(['l', archive]) is None
+    assert parse_args(['x', '-zz', archive]) is None
+    assert main(['x']) == EXIT_USAGE
+    assert main(['x', '-y', f'-o:{out}', archive]) == EXIT_OK
+    assert_extracted(out)
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理进度和剩余时间测试
+"""
+
+from progress_tracker import ProgressTracker, format_progress
+from extract_backends import SevenZipBackend, NativeBackend
+
+
+def test_seven_zip_progress_segments():
+    backend = SevenZipBackend('7z')
+    assert backend.parse_progress('\b\b\b\b 45% 12 - dir/100%.jpg\b') == 0.45
+    assert backend.parse_progress('  7%') == 0.07
+    assert backend.parse_progress('Extracting 10% then 60%') == 0.6
+    assert backend.parse_progress('Everything is Ok\r') is None
+    assert NativeBackend('x').parse_progress('PROGRESS 50 200\n') == 0.25
+
+
+def test_eta_provisional_while_folders_open():
+    tracker = ProgressTracker()
+    tracker.open_folder()
+    tracker.add('a.zip', 100)
+    tracker.add('b.zip', 100)
+    tracker.start('a.zip')
+    tracker.finish('a.zip', True)
+    snapshot = tracker.snapshot()
+    assert snapshot['eta_provisional']
+    snapshot['eta_seconds'] = 90
+    assert '剩余时间 ≥1:30' in format_progress(snapshot)
+    tracker.close_folder()
+    snapshot = tracker.snapshot()
+    assert not snapshot['eta_provisional']
+    snapshot['eta_seconds'] = 90
+    assert '剩余时间 1:30' in format_progress(snapshot)
+    assert snapshot['archives_done'] == 1 and snapshot['fraction'] == 0.5
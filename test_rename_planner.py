@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件名修正方案和改名日志测试
+"""
+
+import os
+
+from rename_planner import RenameJournal, corrected_name, plan_renames
+
+EXTENSIONS = ['.7z', '.zip', '.rar', '.tar', '.gz', '.bz2', '.xz']
+
+
+def test_corrected_name():
+    assert corrected_name('data.7z删', EXTENSIONS) == 'data.7z'
+    assert corrected_name('data.zip.part', EXTENSIONS) == 'data.zip'
+    assert corrected_name('DATA.ZIP_', EXTENSIONS) == 'DATA.zip'
+    assert corrected_name('data.zip', EXTENSIONS) == 'data.zip'
+
+
+def test_plan_resolves_collisions_in_memory():
+    snapshot = ['a.7z', 'a.7z删', 'a.7z_', 'a.7z~', 'a_1.7z', 'b.zip1']
+    plan = plan_renames(snapshot, ['a.7z删', 'a.7z_', 'a.7z~', 'b.zip1', 'c.zip'], EXTENSIONS)
+    assert plan == [('a.7z删', 'a_2.7z'), ('a.7z_', 'a_3.7z'), ('a.7z~', 'a_4.7z'), ('b.zip1', 'b.zip')]
+    targets = [new for _, new in plan]
+    assert len(set(targets)) == len(targets) and not set(targets) & set(snapshot)
+
+
+def test_plan_collisions_ignore_case_where_filesystem_does():
+    plan = plan_renames(['A.ZIP', 'a.zip1'], ['a.zip1'], EXTENSIONS)
+    expected = 'a_1.zip' if os.path.normcase('A') == os.path.normcase('a') else 'a.zip'
+    assert plan == [('a.zip1', expected)]
+
+
+def rename(journal, folder, old, new):
+    os.rename(os.path.join(folder, old), os.path.join(folder, new))
+    journal.record(folder, old, new)
+
+
+def test_undo_reverses_one_run(tmp_path):
+    folder = str(tmp_path)
+    for name in ('a.zip1', 'b.7z删', 'c.rar~'):
+        (tmp_path / name).write_text(name)
+    journal = RenameJournal(str(tmp_path / 'journal.jsonl'))
+    first_run = journal.run_id
+    rename(journal, folder, 'a.zip1', 'a.zip')
+    rename(journal, folder, 'b.7z删', 'b.7z')
+    journal.new_run()
+    second_run = journal.run_id
+    rename(journal, folder, 'c.rar~', 'c.rar')
+    assert journal.runs() == [(first_run, 2), (second_run, 1)]
+
+    assert journal.undo(first_run) == (2, 0)
+    assert sorted(os.listdir(folder)) == ['a.zip1', 'b.7z删', 'c.rar', 'journal.jsonl']
+    assert journal.runs() == [(second_run, 1)]
+    # 已撤销的改名不会重复撤销
+    assert journal.undo(first_run) == (0, 0)
+
+
+def test_undo_skips_when_original_name_taken(tmp_path):
+    folder = str(tmp_path)
+    (tmp_path / 'a.zip1').write_text('old')
+    journal = RenameJournal(str(tmp_path / 'journal.jsonl'))
+    rename(journal, folder, 'a.zip1', 'a.zip')
+    (tmp_path / 'a.zip1').write_text('new file with the old name')
+    messages = []
+    assert journal.undo(journal.run_id, log_callback=messages.append) == (0, 1)
+    assert (tmp_path / 'a.zip').read_text() == 'old'
+    assert messages
+
+
+def test_run_ids_unique_within_a_second(tmp_path):
+    journal = RenameJournal(str(tmp_path / 'journal.jsonl'))
+    run_ids = {journal.run_id}
+    for _ in range(5):
+        journal.new_run()
+        run_ids.add(journal.run_id)
+    assert len(run_ids) == 6
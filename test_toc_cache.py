@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包目录缓存测试（失效和按最近使用淘汰）
+"""
+
+import os
+import itertools
+
+import pytest
+
+import toc_cache
+from toc_cache import TocCache, open_toc_cache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """每次读取时间都前进1秒，最近使用顺序与调用顺序一致"""
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(toc_cache.time, 'time', lambda: float(next(ticks)))
+
+
+def make_archives(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f'a{i}.zip'
+        path.write_bytes(b'PK' + bytes([i]) * 10)
+        paths.append(str(path))
+    return paths
+
+
+def test_hit_and_invalidation(tmp_path):
+    cache = TocCache(str(tmp_path / 'toc.sqlite'))
+    path, = make_archives(tmp_path, 1)
+    assert cache.get(path) is None
+    cache.put(path, {'format': 'zip', 'entries': 2})
+    assert cache.get(path) == {'format': 'zip', 'entries': 2}
+    assert (cache.hits, cache.misses) == (1, 1)
+    # 大小变化
+    with open(path, 'ab') as f:
+        f.write(b'more')
+    assert cache.get(path) is None
+    cache.put(path, {'format': 'zip', 'entries': 3})
+    # 只有修改时间变化
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    assert cache.get(path) is None
+    assert cache.get(str(tmp_path / 'missing.zip')) is None
+
+
+def test_head_hash_detects_same_size_replacement(tmp_path):
+    cache = TocCache(str(tmp_path / 'toc.sqlite'), use_head_hash=True)
+    path, = make_archives(tmp_path, 1)
+    cache.put(path, {'format': 'zip'})
+    st = os.stat(path)
+    with open(path, 'r+b') as f:
+        f.write(b'XX')
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+    assert cache.get(path) is None
+
+
+def test_count_limit_evicts_least_recently_used(tmp_path):
+    cache = TocCache(str(tmp_path / 'toc.sqlite'), max_archives=10)
+    paths = make_archives(tmp_path, 11)
+    for path in paths[:10]:
+        cache.put(path, {'name': path})
+    # 最早写入的两个压缩包最近被读取过，应当保留
+    assert cache.get(paths[0]) and cache.get(paths[1])
+    cache.put(paths[10], {'name': paths[10]})
+    kept = [path for path in paths if cache.get(path) is not None]
+    assert len(kept) <= 9
+    assert paths[0] in kept and paths[1] in kept and paths[10] in kept
+    assert paths[2] not in kept
+
+
+def test_byte_limit_evicts(tmp_path):
+    cache = TocCache(str(tmp_path / 'toc.sqlite'), max_bytes=1000)
+    paths = make_archives(tmp_path, 5)
+    for path in paths:
+        cache.put(path, {'members': 'x' * 300})
+    stats = cache.stats()
+    assert stats['bytes'] <= 1000 and stats['archives'] < 5
+    assert cache.get(paths[-1]) is not None and cache.get(paths[0]) is None
+
+
+
+def test_oversized_entry_not_cached(tmp_path):
+    """单个记录超过容量上限时不缓存，也不会把已有的缓存全部淘汰"""
+    cache = TocCache(str(tmp_path / 'toc.sqlite'), max_bytes=1000)
+    paths = make_archives(tmp_path, 3)
+    cache.put(paths[0], {'members': 'x' * 300})
+    cache.put(paths[1], {'members': 'x' * 300})
+    cache.put(paths[2], {'members': 'x' * 2000})
+    assert cache.get(paths[2]) is None
+    assert cache.get(paths[0]) is not None and cache.get(paths[1]) is not None
+    assert cache.stats()['archives'] == 2
+
+
+def test_hits_written_in_batches(tmp_path):
+    """命中只记录在内存中，关闭或写入次数达到上限时才写入数据库"""
+    db_path = str(tmp_path / 'toc.sqlite')
+    cache = TocCache(db_path)
+    path, = make_archives(tmp_path, 1)
+    cache.put(path, {'n': 1})
+    for _ in range(3):
+        assert cache.get(path) == {'n': 1}
+    hits = "SELECT hits FROM toc"
+    assert cache._conn.execute(hits).fetchone() == (0,)
+    cache.close()
+    assert TocCache(db_path)._conn.execute(hits).fetchone() == (3,)
+
+
+def test_running_totals_follow_replace_and_discard(tmp_path):
+    cache = TocCache(str(tmp_path / 'toc.sqlite'))
+    first, second = make_archives(tmp_path, 2)
+    cache.put(first, {'n': 'x' * 10})
+    cache.put(first, {'n': 'x' * 50})
+    cache.put(second, {'n': 1})
+    cache.discard(second)
+    cache.discard(second)
+    stats = cache.stats()
+    assert (cache._count, cache._bytes) == (stats['archives'], stats['bytes']) == (1, len('{"n": "' + 'x' * 50 + '"}'))
+
+
+def test_discard_clear_and_persistence(tmp_path):
+    db_path = str(tmp_path / 'toc.sqlite')
+    cache = TocCache(db_path)
+    first, second = make_archives(tmp_path, 2)
+    cache.put(first, {'n': 1})
+    cache.put(second, {'n': 2})
+    cache.discard(first)
+    assert cache.get(first) is None
+    cache.close()
+    reopened = TocCache(db_path)
+    assert reopened.get(second) == {'n': 2}
+    reopened.clear()
+    assert reopened.stats()['archives'] == 0
+
+
+def test_open_toc_cache_settings(tmp_path):
+    assert open_toc_cache({'enabled': False}, str(tmp_path)) is None
+    cache = open_toc_cache({'max_archives': 5, 'max_mb': 1}, str(tmp_path))
+    assert cache.db_path == os.path.join(str(tmp_path), toc_cache.TOC_DB_NAME)
+    assert (cache.max_archives, cache.max_bytes) == (5, 1024 * 1024)
+    messages = []
+    assert open_toc_cache({'path': str(tmp_path / 'missing' / 'toc.sqlite')}, str(tmp_path),
+                          log_callback=messages.append) is None
+    assert messages
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩包目录缓存
+功能：把探测到的压缩包信息（格式、条目列表、每个条目的大小/CRC/是否加密、解压后大小）保存到本地SQLite数据库，
+以 路径+大小+修改时间（可选加上文件头哈希）识别同一个压缩包；重新扫描和中断后继续处理时直接读取缓存，
+不必再次打开体积很大的压缩包。超出数量或容量上限时按最近使用时间淘汰
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 缓存数据库文件名（放在输出目录）
+TOC_DB_NAME = 'archive_toc.sqlite'
+
+# 最多缓存的压缩包数
+DEFAULT_MAX_ARCHIVES = 20000
+
+# 缓存内容的总大小上限（字节，按保存的JSON长度计算）
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# 启用文件头哈希时读取的字节数（防止同一秒内被替换成大小相同的另一个文件）
+HEAD_HASH_BYTES = 64 * 1024
+
+# 超过上限时一次淘汰到上限的该比例，避免每次写入都触发淘汰
+EVICT_TARGET = 0.9
+
+# 命中时只在内存中记录最近使用时间，积累到该数量或超过该间隔（秒）时一次写入数据库（关闭和淘汰前也会写入）
+TOUCH_FLUSH_COUNT = 256
+TOUCH_FLUSH_SECONDS = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS toc (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    head_hash TEXT NOT NULL,
+    info TEXT NOT NULL,
+    bytes INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS toc_last_used ON toc (last_used);
+"""
+
+
+def head_hash(path, length=HEAD_HASH_BYTES):
+    """文件开头部分的SHA-1"""
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+class TocCache:
+    """压缩包目录缓存（线程安全，解压工作线程共用一个连接）"""
+
+    def __init__(self, db_path, max_archives=DEFAULT_MAX_ARCHIVES, max_bytes=DEFAULT_MAX_BYTES,
+                 use_head_hash=False):
+        self.db_path = db_path
+        self.max_archives = int(max_archives)
+        self.max_bytes = int(max_bytes)
+        self.use_head_hash = use_head_hash
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}  # 路径 -> (最近使用时间, 命中次数)，尚未写入数据库
+        self._flushed_at = time.monotonic()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=10)
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+        # 记录数和总大小的累计值（写入时增减，不必每次扫描整个表；淘汰时重新统计）
+        self._count, self._bytes = self._totals()
+
+    def _totals(self):
+        return self._conn.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM toc').fetchone()
+
+    def identity(self, path):
+        """压缩包的识别信息 (绝对路径, 大小, 修改时间, 文件头哈希)"""
+        st = os.stat(path)
+        digest = head_hash(path) if self.use_head_hash else ''
+        return os.path.abspath(path), st.st_size, st.st_mtime_ns, digest
+
+    def get(self, path):
+        """返回缓存的探测结果，没有缓存或压缩包已变化时返回None"""
+        try:
+            key, size, mtime_ns, digest = self.identity(path)
+        except OSError:
+            return None
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    'SELECT size, mtime_ns, head_hash, info FROM toc WHERE path = ?', (key,)).fetchone()
+                if row is None or tuple(row[:3]) != (size, mtime_ns, digest):
+                    self.misses += 1
+                    return None
+            except sqlite3.Error:
+                # 数据库被其他进程锁定或损坏时按未命中处理
+                self.misses += 1
+                return None
+            self.hits += 1
+            _, hits = self._touched.get(key, (None, 0))
+            self._touched[key] = (time.time(), hits + 1)
+            if len(self._touched) >= TOUCH_FLUSH_COUNT or time.monotonic() - self._flushed_at >= TOUCH_FLUSH_SECONDS:
+                try:
+                    with self._conn:
+                        self._flush_touched()
+                except sqlite3.Error:
+                    pass
+        return json.loads(row[3])
+
+    def _flush_touched(self):
+        """把内存中记录的最近使用时间和命中次数写入数据库（调用方持有锁和事务）"""
+        touched, self._touched = self._touched, {}
+        self._flushed_at = time.monotonic()
+        if touched:
+            self._conn.executemany('UPDATE toc SET last_used = ?, hits = hits + ? WHERE path = ?',
+                                   [(last_used, hits, key) for key, (last_used, hits) in touched.items()])
+
+    def flush(self):
+        """立即写入尚未保存的最近使用时间"""
+        with self._lock:
+            try:
+                with self._conn:
+                    self._flush_touched()
+            except sqlite3.Error:
+                pass
+
+    def put(self, path, info):
+        """保存探测结果（替换同一路径的旧记录）"""
+        try:
+            key, size, mtime_ns, digest = self.identity(path)
+        except OSError:
+            return
+        data = json.dumps(info, ensure_ascii=False)
+        if len(data) > self.max_bytes * EVICT_TARGET:
+            # 单个记录超过淘汰后保留的容量时不缓存（否则淘汰会清空整个缓存）
+            self.discard(path)
+            return
+        with self._lock:
+            try:
+                with self._conn:
+                    old = self._conn.execute('SELECT bytes FROM toc WHERE path = ?', (key,)).fetchone()
+                    self._conn.execute(
+                        'INSERT OR REPLACE INTO toc (path, size, mtime_ns, head_hash, info, bytes, last_used, hits) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, 0)',
+                        (key, size, mtime_ns, digest, data, len(data), time.time()))
+                    self._touched.pop(key, None)
+                    if old is None:
+                        self._count += 1
+                        self._bytes += len(data)
+                    else:
+                        self._bytes += len(data) - old[0]
+                    if self._count > self.max_archives or self._bytes > self.max_bytes:
+                        self._evict()
+            except sqlite3.Error:
+                # 事务已回滚，累计值以数据库为准
+                self._count, self._bytes = self._totals()
+
+    def _evict(self):
+        """超过数量或容量上限时删除最久未使用的记录（调用方持有锁和事务）"""
+        # 先写入内存中的最近使用时间，并重新统计（其他进程可能也在使用同一个数据库）
+        self._flush_touched()
+        self._count, self._bytes = self._totals()
+        if self._count <= self.max_archives and self._bytes <= self.max_bytes:
+            return
+        keep_count = int(self.max_archives * EVICT_TARGET)
+        keep_bytes = int(self.max_bytes * EVICT_TARGET)
+        kept = kept_bytes = 0
+        cutoff = None
+        for last_used, size in self._conn.execute('SELECT last_used, bytes FROM toc ORDER BY last_used DESC'):
+            if kept + 1 > keep_count or kept_bytes + size > keep_bytes:
+                cutoff = last_used
+                break
+            kept += 1
+            kept_bytes += size
+        if cutoff is not None:
+            self._conn.execute('DELETE FROM toc WHERE last_used <= ?', (cutoff,))
+            self._count, self._bytes = self._totals()
+
+    def discard(self, path):
+        key = os.path.abspath(path)
+        with self._lock:
+            with self._conn:
+                row = self._conn.execute('SELECT bytes FROM toc WHERE path = ?', (key,)).fetchone()
+                if row is not None:
+                    self._conn.execute('DELETE FROM toc WHERE path = ?', (key,))
+                    self._count -= 1
+                    self._bytes -= row[0]
+            self._touched.pop(key, None)
+
+    def stats(self):
+        """缓存的压缩包数、占用字节数和数据库文件大小"""
+        with self._lock:
+            count, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM toc').fetchone()
+        try:
+            file_size = os.path.getsize(self.db_path)
+        except OSError:
+            file_size = 0
+        return {'archives': count, 'bytes': total, 'file_size': file_size,
+                'max_archives': self.max_archives, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM toc')
+            self._conn.execute('VACUUM')
+            self._touched = {}
+            self._count = self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            try:
+                with self._conn:
+                    self._flush_touched()
+            except sqlite3.Error:
+                pass
+            self._conn.close()
+
+
+def open_toc_cache(settings, directory, log_callback=None):
+    """按配置文件中toc_cache的设置打开缓存，未启用或无法打开时返回None"""
+    if not settings.get('enabled', True):
+        return None
+    db_path = settings.get('path') or os.path.join(directory, TOC_DB_NAME)
+    try:
+        return TocCache(db_path,
+                        max_archives=settings.get('max_archives', DEFAULT_MAX_ARCHIVES),
+                        max_bytes=int(settings.get('max_mb', DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024),
+                        use_head_hash=settings.get('head_hash', False))
+    except (sqlite3.Error, OSError) as e:
+        if log_callback:
+            log_callback(f"⚠️ 无法打开压缩包目录缓存，本次不使用缓存: {e}")
+        return None
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文件夹遍历保护
+功能：按 (设备号, inode) 记录本次运行已进入的文件夹，符号链接/目录联接形成的循环、
+硬链接或重复挂载（bind mount）到多个位置的同一个目录只处理一次；硬链接到多个位置的同一个压缩包也只解压一次。
+符号链接按策略处理：跟随、只跟随指向处理目录内部的链接、不跟随
+"""
+
+import os
+import threading
+
+# 符号链接策略
+SYMLINK_FOLLOW = 'follow'  # 跟随（已访问过的目标不会重复进入）
+SYMLINK_WITHIN = 'within'  # 只跟随目标在处理目录内的链接
+SYMLINK_SKIP = 'skip'      # 不进入符号链接指向的文件夹
+SYMLINK_POLICIES = (SYMLINK_FOLLOW, SYMLINK_WITHIN, SYMLINK_SKIP)
+
+DEFAULT_SYMLINK_POLICY = SYMLINK_FOLLOW
+
+# 进入文件夹的检查结果
+ENTER_OK = 'ok'
+ENTER_VISITED = 'visited'    # 已经进入过（循环或重复的目录）
+ENTER_LINK = 'link'          # 符号链接策略不允许
+ENTER_ERROR = 'error'        # 无法读取文件夹信息
+
+
+def is_link(path):
+    """符号链接或Windows目录联接"""
+    if os.path.islink(path):
+        return True
+    isjunction = getattr(os.path, 'isjunction', None)  # Python 3.12+
+    return bool(isjunction and isjunction(path))
+
+
+def _identity(st):
+    """把 (设备号, inode) 合成一个整数，比元组占用更少的内存；文件系统不提供inode时返回None"""
+    if not st.st_ino:
+        return None
+    return (st.st_dev << 64) | st.st_ino
+
+
+class TreeGuard:
+    """一次运行中的文件夹和压缩包去重（线程安全）"""
+
+    def __init__(self, root, symlink_policy=DEFAULT_SYMLINK_POLICY):
+        if symlink_policy not in SYMLINK_POLICIES:
+            raise ValueError(f"未知的符号链接策略: {symlink_policy}")
+        self.root = os.path.realpath(root)
+        self.symlink_policy = symlink_policy
+        self.skipped_links = 0
+        self.skipped_visited = 0
+        self.skipped_files = 0
+        self._dirs = set()
+        self._files = {}  # 硬链接压缩包的 inode -> 第一次遇到的路径
+        self._lock = threading.Lock()
+
+    def _within_root(self, path):
+        target = os.path.realpath(path)
+        return target == self.root or target.startswith(self.root.rstrip(os.sep) + os.sep)
+
+    def enter(self, path):
+        """检查是否可以进入文件夹，可以时记录为已访问，返回 ENTER_* 之一"""
+        if is_link(path):
+            if self.symlink_policy == SYMLINK_SKIP or (
+                    self.symlink_policy == SYMLINK_WITHIN and not self._within_root(path)):
+                with self._lock:
+                    self.skipped_links += 1
+                return ENTER_LINK
+        try:
+            identity = _identity(os.stat(path))
+        except OSError:
+            return ENTER_ERROR
+        if identity is None:
+            return ENTER_OK
+        with self._lock:
+            if identity in self._dirs:
+                self.skipped_visited += 1
+                return ENTER_VISITED
+            self._dirs.add(identity)
+        return ENTER_OK
+
+    def claim_file(self, path):
+        """硬链接的压缩包在本次运行中只处理一次：同一inode已由其他路径处理时返回False"""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return True
+        if st.st_nlink < 2:
+            return True
+        identity = _identity(st)
+        if identity is None:
+            return True
+        path = os.path.abspath(path)
+        with self._lock:
+            first = self._files.setdefault(identity, path)
+            if first != path:
+                self.skipped_files += 1
+                return False
+        return True